@@ -0,0 +1,43 @@
+import multiprocessing
+import os
+
+from prometheus_client import multiprocess
+
+# ASGI=True serves asgi.py with uvicorn workers, wsgi.py with threads otherwise
+if os.environ.get("ASGI", "False") == "True":
+    wsgi_app = "social_media_api_service.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "social_media_api_service.wsgi:application"
+    worker_class = "gthread"
+    threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+bind = "0.0.0.0:8000"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+# Recycle workers now and then to bound memory growth
+max_requests = 10000
+max_requests_jitter = 1000
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+
+def on_starting(server):
+    # Fail fast on a misconfigured deployment, before forking the workers
+    import django
+    from django.core.management import call_command
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_media_api_service.settings")
+    django.setup()
+    call_command("check", deploy=True, databases=["default"], fail_level="ERROR")
+
+    # Forked workers must open their own connections
+    from django.db import connections
+
+    connections.close_all()
+
+
+def child_exit(server, worker):
+    # Drop the live gauges of a dead worker from the shared metrics directory
+    multiprocess.mark_process_dead(worker.pid)
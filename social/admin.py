@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Post, Comment, Profile
+from .models import Post, Comment, Profile, PostIngestJob
 
 
 class ProfileAdmin(admin.ModelAdmin):
@@ -10,3 +10,4 @@ class ProfileAdmin(admin.ModelAdmin):
 admin.site.register(Profile, ProfileAdmin)
 admin.site.register(Post)
 admin.site.register(Comment)
+admin.site.register(PostIngestJob)
@@ -0,0 +1,495 @@
+"""
+Synthetic social graphs and an in-process benchmark of the API routes,
+used by the generate_social_graph and benchmark_api commands.
+"""
+import itertools
+import json
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, reverse
+from django.utils.text import slugify
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from taggit.models import Tag
+
+from social_media_api_service.throttling import unlimited_settings
+
+from . import counters
+from .models import Comment, FeedEntry, Follow, Like, Post, PostTag, Profile
+
+# Password of the users registering and logging in during the benchmark
+PASSWORD = "benchmark-password"
+
+FIRST_NAMES = [
+    "Anna", "Bohdan", "Chloe", "Dmytro", "Emma", "Felix", "Greta", "Hugo",
+    "Iryna", "Jonas", "Kateryna", "Liam", "Maria", "Nazar", "Olga", "Pavlo",
+]
+LAST_NAMES = [
+    "Bondar", "Garcia", "Hoffmann", "Kovalenko", "Martin", "Novak", "Rossi",
+    "Shevchenko", "Smith", "Tkachenko", "Weber", "Wilson",
+]
+WORDS = [
+    "morning", "coffee", "travel", "sunset", "code", "music", "city", "friends",
+    "weekend", "book", "coast", "mountain", "release", "family", "garden",
+    "concert", "recipe", "match", "project", "idea", "photo", "river", "night",
+]
+TAGS = [
+    "life", "travel", "food", "tech", "music", "sport", "art", "nature",
+    "python", "django", "photo", "news", "books", "cats", "dogs", "fun",
+]
+
+GRAPH_DEFAULTS = {
+    "posts_per_user": 5,
+    "follows_per_user": 20,
+    "likes_per_post": 10,
+    "comments_per_post": 3,
+    "reply_depth": 3,
+}
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _heavy_tail(rng, mean):
+    """Pareto distributed count with the given mean (alpha 1.5)"""
+    return int(rng.paretovariate(1.5) * mean / 3)
+
+
+def _weighted_sample(rng, cum_weights, k, exclude):
+    """Up to ``k`` distinct indexes drawn by weight, never ``exclude``"""
+    population = range(len(cum_weights))
+    chosen = set()
+    for _ in range(3):
+        missing = k - len(chosen)
+        if missing <= 0:
+            break
+        chosen.update(rng.choices(population, cum_weights=cum_weights, k=missing))
+        chosen.discard(exclude)
+    return list(chosen)[:k]
+
+
+def _fill_comment_paths(comments, parents):
+    for comment in comments:
+        parent = parents.get(comment.parent_id)
+        prefix = parent.path if parent is not None else ""
+        comment.path = prefix + str(comment.pk).zfill(Comment.PATH_STEP)
+        comment.depth = parent.depth + 1 if parent is not None else 0
+    Comment.objects.bulk_update(comments, ["path", "depth"], batch_size=1000)
+
+
+def _create_users(rng, users, prefix, seed, password, batch_size):
+    User = get_user_model()
+    password = make_password(password)
+    user_rows = []
+    for i in range(users):
+        user = User(
+            email=f"{prefix}-{seed}-{i}@example.com",
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            password=password,
+        )
+        user.search_name = user.build_search_name()
+        user_rows.append(user)
+    user_rows = User.objects.bulk_create(user_rows, batch_size=batch_size)
+
+    profiles = Profile.objects.bulk_create(
+        [
+            Profile(user=user, first_name=user.first_name, last_name=user.last_name)
+            for user in user_rows
+        ],
+        batch_size=batch_size,
+    )
+    return user_rows, profiles
+
+
+def _create_posts(rng, user_rows, posts_per_user, batch_size):
+    posts = []
+    for i, user in enumerate(user_rows):
+        for n in range(_heavy_tail(rng, posts_per_user)):
+            posts.append(
+                Post(
+                    user=user,
+                    title=f"{_sentence(rng, 3).capitalize()} #{i}-{n}",
+                    description=_sentence(rng, rng.randint(5, 40)),
+                )
+            )
+    return Post.objects.bulk_create(posts, batch_size=batch_size)
+
+
+def _tag_posts(rng, posts, batch_size):
+    Tag.objects.bulk_create(
+        [Tag(name=name, slug=slugify(name)) for name in TAGS],
+        ignore_conflicts=True,
+    )
+    tags = list(Tag.objects.filter(name__in=TAGS).order_by("name"))
+    tag_weights = [1 / (rank + 1) for rank in range(len(tags))]
+    post_tags = []
+    for post in posts:
+        for tag in set(rng.choices(tags, weights=tag_weights, k=rng.randint(0, 3))):
+            post_tags.append(PostTag(tag=tag, content_object=post))
+    return PostTag.objects.bulk_create(post_tags, batch_size=batch_size)
+
+
+def _create_comments(rng, posts, user_rows, comments_per_post, reply_depth, batch_size):
+    comments = []
+    for post in posts:
+        for _ in range(_heavy_tail(rng, comments_per_post)):
+            comments.append(
+                Comment(
+                    post=post,
+                    user=rng.choice(user_rows),
+                    text=_sentence(rng, rng.randint(3, 20)),
+                )
+            )
+    level = Comment.objects.bulk_create(comments, batch_size=batch_size)
+    _fill_comment_paths(level, {})
+    count = len(level)
+
+    for _ in range(reply_depth):
+        replies = []
+        for parent in level:
+            if rng.random() >= 0.3:
+                continue
+            for _ in range(rng.randint(1, 3)):
+                replies.append(
+                    Comment(
+                        post_id=parent.post_id,
+                        user=rng.choice(user_rows),
+                        text=_sentence(rng, rng.randint(3, 20)),
+                        is_reply=True,
+                        parent=parent,
+                    )
+                )
+        replies = Comment.objects.bulk_create(replies, batch_size=batch_size)
+        _fill_comment_paths(replies, {parent.pk: parent for parent in level})
+        count += len(replies)
+        level = replies
+    return count
+
+
+def _fill_feeds(posts, user_rows, following, author_index, batch_size):
+    """
+    Push the latest posts of every followed author into the feeds, except
+    for authors above the fan-out threshold, which are read on the fly
+    """
+    followers_count = [0] * len(user_rows)
+    for targets in following:
+        for j in targets:
+            followers_count[j] += 1
+    latest_posts = {}
+    for post in sorted(posts, key=lambda post: -post.pk):
+        author_posts = latest_posts.setdefault(author_index[post.user_id], [])
+        if len(author_posts) < settings.FEED_BACKFILL_SIZE:
+            author_posts.append(post.pk)
+
+    feed_entries = []
+    for i, targets in enumerate(following):
+        for j in targets:
+            if followers_count[j] >= settings.FEED_FANOUT_THRESHOLD:
+                continue
+            feed_entries.extend(
+                FeedEntry(owner=user_rows[i], post_id=post_id, author=user_rows[j])
+                for post_id in latest_posts.get(j, [])
+            )
+    return FeedEntry.objects.bulk_create(feed_entries, batch_size=batch_size)
+
+
+def generate_graph(
+    users,
+    posts_per_user=GRAPH_DEFAULTS["posts_per_user"],
+    follows_per_user=GRAPH_DEFAULTS["follows_per_user"],
+    likes_per_post=GRAPH_DEFAULTS["likes_per_post"],
+    comments_per_post=GRAPH_DEFAULTS["comments_per_post"],
+    reply_depth=GRAPH_DEFAULTS["reply_depth"],
+    seed=0,
+    prefix="bench",
+    password="benchmark",
+    batch_size=1000,
+):
+    """
+    Bulk insert a reproducible social graph: ``users`` users with profiles,
+    followers and likes drawn from a power law (a few authors get most of
+    them), posts with hashtags, nested comments and the follow feed.
+    Returns the number of rows created per model.
+    """
+    rng = random.Random(seed)
+    user_rows, profiles = _create_users(rng, users, prefix, seed, password, batch_size)
+
+    # Popularity decides who gets followed and liked
+    popularity = [rng.paretovariate(1.2) for _ in range(users)]
+    cum_popularity = list(itertools.accumulate(popularity))
+
+    follows = []
+    following = [[] for _ in range(users)]
+    for i in range(users):
+        count = min(_heavy_tail(rng, follows_per_user), users - 1)
+        for j in _weighted_sample(rng, cum_popularity, count, i):
+            follows.append(Follow(follower=user_rows[i], profile=profiles[j]))
+            following[i].append(j)
+    Follow.objects.bulk_create(follows, batch_size=batch_size)
+
+    posts = _create_posts(rng, user_rows, posts_per_user, batch_size)
+    author_index = {user.pk: i for i, user in enumerate(user_rows)}
+    post_tags = _tag_posts(rng, posts, batch_size)
+
+    likes = []
+    for post in posts:
+        author = author_index[post.user_id]
+        count = min(_heavy_tail(rng, likes_per_post * popularity[author]), users - 1)
+        for i in _weighted_sample(rng, cum_popularity, count, author):
+            likes.append(Like(user=user_rows[i], post=post))
+    Like.objects.bulk_create(likes, batch_size=batch_size)
+
+    comment_count = _create_comments(
+        rng, posts, user_rows, comments_per_post, reply_depth, batch_size
+    )
+    feed_entries = _fill_feeds(posts, user_rows, following, author_index, batch_size)
+
+    counters.recount()
+
+    return {
+        "users": len(user_rows),
+        "follows": len(follows),
+        "posts": len(posts),
+        "tags": len(post_tags),
+        "likes": len(likes),
+        "comments": comment_count,
+        "feed_entries": len(feed_entries),
+    }
+
+
+def data_sizes():
+    return {
+        "users": get_user_model().objects.count(),
+        "follows": Follow.objects.count(),
+        "posts": Post.objects.count(),
+        "likes": Like.objects.count(),
+        "comments": Comment.objects.count(),
+        "feed_entries": FeedEntry.objects.count(),
+    }
+
+
+class Samples:
+    """
+    The benchmark user (the one following most profiles, so with the
+    heaviest feed) and worst-case objects for detail routes. Logins use
+    a user created here with a known password, so samples are only taken
+    in a transaction that is rolled back.
+    """
+
+    def __init__(self):
+        User = get_user_model()
+        self.user = (
+            User.objects.filter(profile__isnull=False)
+            .order_by("-profile__following_count", "pk")
+            .first()
+        )
+        if self.user is None:
+            raise ValueError("No user with a profile to run the benchmark as")
+
+        self.post = Post.objects.order_by("-likes_count", "-comments_count").first()
+        self.feed_post = (
+            FeedEntry.objects.filter(owner=self.user).order_by("-post").first()
+        )
+        self.liked_post = Like.objects.filter(user=self.user).first()
+        self.other_profile = (
+            Profile.objects.exclude(user=self.user).order_by("-followers_count").first()
+        )
+        self.other_post_ids = list(
+            Post.objects.exclude(user=self.user).values_list("pk", flat=True)[:10]
+        )
+        self.other_profile_ids = list(
+            Profile.objects.exclude(user=self.user).values_list("pk", flat=True)[:10]
+        )
+        self.comment = Comment.objects.filter(parent__isnull=True).order_by("-id").first()
+        self.login_user = User.objects.create_user(
+            email="benchmark-login@example.invalid", password=PASSWORD
+        )
+        self.counter = itertools.count()
+
+    def pk(self, basename):
+        """Object to use in the detail routes of a router basename"""
+        objects = {
+            "posts": self.post,
+            "ifollow": self.feed_post and self.feed_post.post,
+            "ilike": self.liked_post and self.liked_post.post,
+            "profiles": self.other_profile,
+            "comments": self.comment,
+        }
+        obj = objects.get(basename)
+        return obj.pk if obj is not None else None
+
+    def unique(self):
+        return next(self.counter)
+
+    def payload(self, route):
+        """Request body for POST routes, None if the route is not benchmarked"""
+        n = self.unique()
+        payloads = {
+            "social:posts-list": lambda: {
+                "title": f"Benchmark post {n}",
+                "description": "Benchmark",
+                "hashtags": ["benchmark,load"],
+            },
+            "social:posts-toggle-like": lambda: {"like": alternate(n, "LU")},
+            "social:posts-bulk-toggle-like": lambda: {
+                "items": [
+                    {"id": pk, "like": alternate(n, "LU")} for pk in self.other_post_ids
+                ]
+            },
+            "social:posts-add-comment": lambda: {"text": f"Benchmark comment {n}"},
+            "social:profiles-toggle-follow": lambda: {"follow": alternate(n, "FU")},
+            "social:profiles-bulk-toggle-follow": lambda: {
+                "items": [
+                    {"id": pk, "follow": alternate(n, "FU")}
+                    for pk in self.other_profile_ids
+                ]
+            },
+            "social:comments-reply": lambda: {"reply": "Benchmark", "text": "Benchmark"},
+            "users:create": lambda: {
+                "email": f"benchmark-{n}@example.com",
+                "password": PASSWORD,
+                "first_name": "Benchmark",
+                "last_name": f"User {n}",
+            },
+            "users:token_obtain_pair": lambda: {
+                "email": self.login_user.email,
+                "password": PASSWORD,
+            },
+            "users:token_refresh": lambda: {
+                "refresh": str(RefreshToken.for_user(self.user))
+            },
+            "users:token_verify": lambda: {
+                "token": str(RefreshToken.for_user(self.user).access_token)
+            },
+            "users:logout": lambda: {
+                "refresh_token": str(RefreshToken.for_user(self.user))
+            },
+        }
+        build = payloads.get(route)
+        return build() if build is not None else None
+
+
+def alternate(n, values):
+    """Alternate between values so that toggles really change state"""
+    return values[n % len(values)]
+
+
+def routes(samples):
+    """Every route of social.urls and users.urls as (name, method, path)"""
+    from social import urls as social_urls
+    from users import urls as users_urls
+
+    for module in [social_urls, users_urls]:
+        for pattern in module.urlpatterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name:
+                continue
+            kwarg_names = set(pattern.pattern.regex.groupindex)
+            if "format" in kwarg_names:
+                continue
+
+            name = f"{module.app_name}:{pattern.name}"
+            kwargs = {}
+            if "pk" in kwarg_names:
+                kwargs["pk"] = samples.pk(pattern.name.split("-")[0])
+            missing = [key for key in kwarg_names if kwargs.get(key) is None]
+
+            callback = pattern.callback
+            actions = getattr(callback, "actions", None)
+            if actions is not None:
+                methods = list(actions)
+            else:
+                methods = [
+                    method
+                    for method in ["get", "post"]
+                    if hasattr(callback.view_class, method)
+                ]
+
+            for method in methods:
+                if method not in ["get", "post"]:
+                    continue
+                if missing:
+                    yield name, method, None
+                else:
+                    yield name, method, reverse(name, kwargs=kwargs)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def benchmark_routes(requests=20, warm_cache=False):
+    """
+    Request every route ``requests`` times as the sample user and return
+    latency percentiles (ms), queries per request and response statuses
+    """
+    samples = Samples()
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(samples.user).access_token}"
+    )
+
+    timeout = settings.RESPONSE_CACHE_TIMEOUT if warm_cache else 0
+    results = []
+    with override_settings(
+        RESPONSE_CACHE_TIMEOUT=timeout,
+        QUERY_BUDGET_STRICT=False,
+        **unlimited_settings(),
+    ):
+        for name, method, path in routes(samples):
+            result = {"route": name, "method": method.upper(), "path": path}
+            if path is None or (method == "post" and samples.payload(name) is None):
+                result["skipped"] = "no sample object or request body"
+                results.append(result)
+                continue
+
+            latencies = []
+            queries = []
+            statuses = {}
+            # The first request warms up imports and connections
+            for i in range(requests + 1):
+                data = samples.payload(name) if method == "post" else None
+                with CaptureQueriesContext(connection) as context:
+                    start = time.perf_counter()
+                    response = getattr(client, method)(path, data, format="json")
+                    latencies.append((time.perf_counter() - start) * 1000)
+                queries.append(len(context))
+                if i:
+                    statuses[response.status_code] = (
+                        statuses.get(response.status_code, 0) + 1
+                    )
+
+            latencies, queries = latencies[1:], queries[1:]
+            result.update(
+                {
+                    "requests": requests,
+                    "statuses": {str(code): n for code, n in statuses.items()},
+                    "p50_ms": round(percentile(latencies, 0.5), 2),
+                    "p90_ms": round(percentile(latencies, 0.9), 2),
+                    "p99_ms": round(percentile(latencies, 0.99), 2),
+                    "mean_ms": round(statistics.mean(latencies), 2),
+                    "queries_mean": round(statistics.mean(queries), 2),
+                    "queries_max": max(queries),
+                }
+            )
+            results.append(result)
+
+    return results
+
+
+def dump(report, path=None):
+    data = json.dumps(report, indent=2)
+    if path is None:
+        return data
+    with open(path, "w") as file:
+        file.write(data + "\n")
+    return path
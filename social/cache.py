@@ -0,0 +1,65 @@
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _version_key(name):
+    return f"social:version:{name}"
+
+
+def _new_version(key):
+    """
+    Start the version of a missing (expired or evicted) key from the
+    current time in nanoseconds, far above any version reached since an
+    earlier start, so it never points back to entries cached before
+    """
+    version = time.time_ns()
+    if cache.add(key, version, timeout=settings.CACHE_VERSION_TIMEOUT):
+        return version
+    return cache.get(key, version)
+
+
+def get_versions(*names):
+    """Current versions of the given names"""
+    keys = [_version_key(name) for name in names]
+    stored = cache.get_many(keys)
+    return [stored[key] if key in stored else _new_version(key) for key in keys]
+
+
+def bump(*names):
+    """
+    Invalidate everything cached under the given names, e.g. ``"post"``
+    for post lists or ``"post:12"`` for the detail of post 12.
+    Version keys expire after CACHE_VERSION_TIMEOUT, which only costs
+    cache misses.
+    """
+    for name in names:
+        key = _version_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            _new_version(key)
+
+
+def response_key(request, names):
+    versions = ".".join(str(version) for version in get_versions(*names))
+    url = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+    return f"social:response:{'.'.join(names)}:{versions}:{url}"
+
+
+def get_response_data(key):
+    return cache.get(key)
+
+
+def set_response_data(key, data):
+    cache.set(key, data, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+
+
+# Async views run these in the default thread pool, off the thread running
+# the ORM calls of the request, so that cache round trips overlap with queries
+aresponse_key = sync_to_async(response_key, thread_sensitive=False)
+aget_response_data = sync_to_async(get_response_data, thread_sensitive=False)
+aset_response_data = sync_to_async(set_response_data, thread_sensitive=False)
@@ -0,0 +1,36 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Like, Post, Profile
+
+
+def adjust(model, pk, **deltas):
+    """Atomically add the given deltas to counter columns of one row"""
+    model.objects.filter(pk=pk).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def _count(queryset, column, outer="pk"):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{column: OuterRef(outer)})
+            .order_by()
+            .values(column)
+            .annotate(total=Count("*"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def recount():
+    """Recompute all counters from the relation tables"""
+    Post.objects.update(
+        likes_count=_count(Like.objects, "post"),
+        comments_count=_count(Comment.objects, "post"),
+    )
+    Profile.objects.update(
+        followers_count=_count(Follow.objects, "profile"),
+        following_count=_count(Follow.objects, "follower", outer="user"),
+    )
@@ -0,0 +1,95 @@
+from django.db import connection
+from django.utils import timezone
+
+from .models import Follow, Like
+
+
+def _insert(model, source, target, source_id, target_ids):
+    """
+    INSERT ... ON CONFLICT DO NOTHING of the edges from ``source_id`` to
+    every id of ``target_ids``, in one statement. Returns the target ids
+    of the rows inserted, i.e. of the edges that did not exist yet.
+    """
+    if not target_ids:
+        return set()
+
+    opts = model._meta
+    fields = [opts.get_field(name) for name in (source, target, "created_at")]
+    row = "(%s)" % ", ".join(["%s"] * len(fields))
+    # Sorted, so that concurrent requests take the row locks in the same order
+    target_ids = sorted(set(target_ids))
+    sql = "INSERT INTO %s (%s) VALUES %s ON CONFLICT DO NOTHING RETURNING %s" % (
+        connection.ops.quote_name(opts.db_table),
+        ", ".join(connection.ops.quote_name(field.column) for field in fields),
+        ", ".join([row] * len(target_ids)),
+        connection.ops.quote_name(fields[1].column),
+    )
+    now = timezone.now()
+    params = []
+    for target_id in target_ids:
+        params += [
+            field.get_db_prep_save(value, connection)
+            for field, value in zip(fields, (source_id, target_id, now))
+        ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {target_id for target_id, in cursor.fetchall()}
+
+
+def _delete(model, source, target, source_id, target_ids):
+    """
+    DELETE of the edges from ``source_id`` to every id of ``target_ids``.
+    Returns the target ids of the rows deleted, i.e. of the edges that
+    still existed.
+    """
+    if not target_ids:
+        return set()
+
+    opts = model._meta
+    source_column = connection.ops.quote_name(opts.get_field(source).column)
+    target_column = connection.ops.quote_name(opts.get_field(target).column)
+    target_ids = sorted(set(target_ids))
+    sql = "DELETE FROM %s WHERE %s = %%s AND %s IN (%s) RETURNING %s" % (
+        connection.ops.quote_name(opts.db_table),
+        source_column,
+        target_column,
+        ", ".join(["%s"] * len(target_ids)),
+        target_column,
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [source_id, *target_ids])
+        return {target_id for target_id, in cursor.fetchall()}
+
+
+def like_many(user, post_ids):
+    return _insert(Like, "user", "post", user.pk, post_ids)
+
+
+def unlike_many(user, post_ids):
+    return _delete(Like, "user", "post", user.pk, post_ids)
+
+
+def follow_many(user, profile_ids):
+    return _insert(Follow, "follower", "profile", user.pk, profile_ids)
+
+
+def unfollow_many(user, profile_ids):
+    return _delete(Follow, "follower", "profile", user.pk, profile_ids)
+
+
+def like(user, post):
+    return bool(like_many(user, [post.pk]))
+
+
+def unlike(user, post):
+    return bool(unlike_many(user, [post.pk]))
+
+
+def follow(user, profile):
+    return bool(follow_many(user, [profile.pk]))
+
+
+def unfollow(user, profile):
+    return bool(unfollow_many(user, [profile.pk]))
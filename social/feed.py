@@ -0,0 +1,142 @@
+from django.conf import settings
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import FeedEntry, Follow, Post, Profile
+
+
+def pulled_authors(user):
+    """
+    Followed authors with too many followers to fan out on write.
+    Their posts are merged into the timeline at read time.
+    """
+    return Profile.objects.filter(
+        follower_edges__follower=user,
+        followers_count__gte=settings.FEED_FANOUT_THRESHOLD,
+    ).values("user")
+
+
+def fan_out_post(post):
+    """Push a new post into the timelines of its author's followers"""
+    profile = Profile.objects.filter(user_id=post.user_id).first()
+    if profile is None:
+        return
+
+    if profile.followers_count >= settings.FEED_FANOUT_THRESHOLD:
+        return
+
+    followers = profile.followers.values_list("id", flat=True)
+
+    entries = []
+    for follower_id in followers.iterator(chunk_size=settings.FEED_FANOUT_BATCH_SIZE):
+        entries.append(
+            FeedEntry(owner_id=follower_id, post_id=post.pk, author_id=post.user_id)
+        )
+        if len(entries) >= settings.FEED_FANOUT_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+            entries = []
+
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def follow(user, author):
+    follow_many(user, [author.pk])
+
+
+def _latest_posts(author_ids):
+    """
+    (id, user_id) of the latest posts of every author, read for all the
+    authors at once by ranking the posts of each one
+    """
+    return (
+        Post.objects.filter(user_id__in=author_ids)
+        .annotate(
+            rank=Window(RowNumber(), partition_by=F("user_id"), order_by=F("id").desc())
+        )
+        .filter(rank__lte=settings.FEED_BACKFILL_SIZE)
+        .values_list("id", "user_id")
+    )
+
+
+def follow_many(user, author_ids):
+    """Backfill the latest posts of newly followed authors"""
+    fanned_out = Profile.objects.filter(
+        user_id__in=author_ids,
+        followers_count__lt=settings.FEED_FANOUT_THRESHOLD,
+    ).values("user_id")
+
+    entries = [
+        FeedEntry(owner=user, post_id=post_id, author_id=author_id)
+        for post_id, author_id in _latest_posts(fanned_out)
+    ]
+
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=settings.FEED_FANOUT_BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def unfollow(user, author):
+    unfollow_many(user, [author.pk])
+
+
+def unfollow_many(user, author_ids):
+    FeedEntry.objects.filter(owner=user, author_id__in=author_ids).delete()
+
+
+def fell_under_threshold(author_ids):
+    """
+    Authors of ``author_ids`` whose follower count just fell under the
+    fan-out threshold. Called in the transaction that decremented the
+    counts: its row locks make exactly one of concurrent unfollows see
+    the crossing.
+    """
+    return list(
+        Profile.objects.filter(
+            user_id__in=author_ids,
+            followers_count=settings.FEED_FANOUT_THRESHOLD - 1,
+        ).values_list("user_id", flat=True)
+    )
+
+
+def backfill_followers(author_ids):
+    """
+    Materialize the latest posts of authors into the timelines of all
+    their followers, in the same queries whatever the number of authors.
+    Posts published while an author was over the threshold were only
+    pulled on read, they would leave the timelines once the author is no
+    longer pulled.
+    """
+    post_ids = {}
+    for post_id, author_id in _latest_posts(author_ids):
+        post_ids.setdefault(author_id, []).append(post_id)
+    if not post_ids:
+        return
+
+    follows = Follow.objects.filter(profile__user_id__in=list(post_ids)).values_list(
+        "follower_id", "profile__user_id"
+    )
+    entries = []
+    for follower_id, author_id in follows.iterator(
+        chunk_size=settings.FEED_FANOUT_BATCH_SIZE
+    ):
+        entries.extend(
+            FeedEntry(owner_id=follower_id, post_id=post_id, author_id=author_id)
+            for post_id in post_ids[author_id]
+        )
+        if len(entries) >= settings.FEED_FANOUT_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+            entries = []
+
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def timeline(user, queryset):
+    """Restrict a post queryset to the follow feed of the given user"""
+    condition = Q(feed_entries__owner=user)
+
+    pulled = pulled_authors(user)
+    if not pulled.exists():
+        return queryset.filter(condition)
+
+    condition |= Q(user__in=pulled)
+    return queryset.filter(condition).distinct()
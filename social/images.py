@@ -0,0 +1,159 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+# Formats whose uploads are re-encoded without their metadata, multi
+# picture JPEGs of phone cameras are stored as plain JPEGs
+STRIPPED_FORMATS = {
+    "JPEG": "JPEG", "MPO": "JPEG", "PNG": "PNG", "WEBP": "WEBP", "TIFF": "TIFF"
+}
+
+
+def _flatten(image):
+    """Composite an image with an alpha channel onto a white background"""
+    background = Image.new("RGB", image.size, "white")
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def _encode(image, extension):
+    """Encode without the original metadata, which drops EXIF data"""
+    if image.mode == "RGBA" and FORMATS[extension] == "JPEG":
+        image = _flatten(image)
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        format=FORMATS[extension],
+        quality=settings.IMAGE_VARIANT_QUALITY,
+        optimize=True,
+    )
+    return ContentFile(buffer.getvalue())
+
+
+def strip_metadata(file):
+    """
+    Re-encode an uploaded image without its EXIF data (GPS position,
+    camera, ...) before it is stored, applying the EXIF orientation.
+    Returns ``file`` itself when its format carries no EXIF data.
+    """
+    file.seek(0)
+    with Image.open(file) as image:
+        image_format = STRIPPED_FORMATS.get(image.format)
+        if image_format is None:
+            file.seek(0)
+            return file
+
+        options = {"icc_profile": image.info.get("icc_profile")}
+        if image_format == "JPEG":
+            options["quality"] = 95
+        if getattr(image, "is_animated", False):
+            options["save_all"] = True
+        else:
+            image = ImageOps.exif_transpose(image)
+
+        buffer = BytesIO()
+        image.save(buffer, format=image_format, **options)
+
+    return ContentFile(buffer.getvalue(), name=os.path.basename(file.name))
+
+
+def has_metadata(file):
+    file.seek(0)
+    with Image.open(file) as image:
+        return image.format in STRIPPED_FORMATS and bool(image.getexif())
+
+
+def _resize(image, size, crop):
+    if crop:
+        return ImageOps.fit(image, size, Image.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail(size, Image.LANCZOS)
+    return resized
+
+
+def _delete_variants(storage, variants):
+    for name, variant in variants.items():
+        if name == "source":
+            continue
+        for extension in FORMATS:
+            if variant.get(extension):
+                storage.delete(variant[extension])
+
+
+def process_image(instance):
+    """
+    Write the size variants of ``instance.image`` in every format and
+    record them together with the original dimensions. The row is updated
+    directly, so no save signals fire and counters are left alone.
+    """
+    field = instance.image
+    storage = field.storage
+    root, _ = os.path.splitext(field.name)
+
+    with field.open("rb"), Image.open(field) as original:
+        original = ImageOps.exif_transpose(original)
+        # WebP variants keep the transparency, JPEG ones are put on white
+        mode = "RGBA" if original.has_transparency_data else "RGB"
+        if original.mode != mode:
+            original = original.convert(mode)
+
+        variants = {"source": field.name}
+        for name, options in settings.IMAGE_VARIANTS.items():
+            resized = _resize(original, options["size"], options["crop"])
+            variants[name] = {"width": resized.width, "height": resized.height}
+            for extension in FORMATS:
+                variants[name][extension] = storage.save(
+                    f"{root}-{name}.{extension}", _encode(resized, extension)
+                )
+
+    _delete_variants(storage, instance.image_variants)
+
+    type(instance).objects.filter(pk=instance.pk).update(
+        image_width=original.width,
+        image_height=original.height,
+        image_variants=variants,
+    )
+    instance.image_width = original.width
+    instance.image_height = original.height
+    instance.image_variants = variants
+
+
+def needs_processing(instance):
+    return bool(instance.image) and (
+        instance.image_variants.get("source") != instance.image.name
+    )
+
+
+def variant_url(instance, variant, request=None):
+    """
+    URL of a variant in ``IMAGE_VARIANT_FORMAT``, or of the original image
+    while the variants are not processed yet
+    """
+    if not instance.image:
+        return None
+
+    return stored_variant_url(
+        instance.image.storage,
+        instance.image.name,
+        instance.image_variants,
+        variant,
+        request,
+    )
+
+
+def stored_variant_url(storage, name, variants, variant, request=None):
+    """variant_url from the image name and variants of a ``.values()`` row"""
+    if not name:
+        return None
+
+    if variants.get("source") == name and variant in variants:
+        name = variants[variant][settings.IMAGE_VARIANT_FORMAT]
+    url = storage.url(name)
+
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
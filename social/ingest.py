@@ -0,0 +1,94 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import tags
+from .models import Post, PostIngestJob
+
+logger = logging.getLogger(__name__)
+
+
+def create_job(user, validated_data):
+    """Store a validated post for a worker to create later"""
+    return PostIngestJob.objects.create(
+        user=user,
+        payload={
+            "title": validated_data["title"],
+            "description": validated_data["description"],
+            "hashtags": list(validated_data.get("hashtags", [])),
+        },
+        image=validated_data.get("image"),
+    )
+
+
+def _create_post(job):
+    post = Post.objects.create(
+        user_id=job.user_id,
+        title=job.payload["title"],
+        description=job.payload["description"],
+        image=job.image.name or None,
+    )
+    if job.payload["hashtags"]:
+        tags.set_post_tags(post, job.payload["hashtags"])
+    return post
+
+
+def process_jobs(job_ids):
+    """
+    Create the posts of the given pending jobs. Every job is processed in
+    its own transaction with the job row locked, so running a batch twice
+    or concurrently creates each post only once.
+
+    A job breaking a constraint fails at once. Other errors leave it
+    pending for the "ingest-stale-posts" beat job to retry, until it
+    failed POST_INGEST_MAX_ATTEMPTS times. Either way the batch goes on.
+    """
+    processed = 0
+    for job_id in job_ids:
+        with transaction.atomic():
+            job = (
+                PostIngestJob.objects.select_for_update(skip_locked=True)
+                .filter(pk=job_id, status=PostIngestJob.PENDING)
+                .first()
+            )
+            if job is None:
+                continue
+
+            job.attempts += 1
+            try:
+                with transaction.atomic():
+                    job.post = _create_post(job)
+                job.status = PostIngestJob.DONE
+            except IntegrityError as e:
+                job.status = PostIngestJob.FAILED
+                job.error = "Failed to create post: " + str(e)
+            except Exception as e:
+                logger.exception("Post ingest job %s failed", job.pk)
+                job.error = f"Attempt {job.attempts} failed: {e}"
+                if job.attempts >= settings.POST_INGEST_MAX_ATTEMPTS:
+                    job.status = PostIngestJob.FAILED
+            job.save(
+                update_fields=["post", "status", "error", "attempts", "updated_at"]
+            )
+            processed += 1
+
+    return processed
+
+
+def stale_job_ids():
+    """
+    Pending jobs not attempted for ``POST_INGEST_RETRY_AFTER`` seconds, e.g.
+    because their task message was lost or their last attempt failed,
+    oldest first and at most one batch of them
+    """
+    updated_before = timezone.now() - timedelta(
+        seconds=settings.POST_INGEST_RETRY_AFTER
+    )
+    return list(
+        PostIngestJob.objects.filter(
+            status=PostIngestJob.PENDING, updated_at__lt=updated_before
+        ).values_list("pk", flat=True)[: settings.POST_INGEST_BATCH_SIZE]
+    )
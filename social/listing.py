@@ -0,0 +1,155 @@
+"""
+Compact rendering of list pages.
+
+The list endpoints read their rows with ``.values()`` and build the output
+of PostListSerializer, ProfileListSerializer and CommentListSerializer in
+one pass, without model instances and field objects for every row.
+The serializers still describe these responses in the schema, and
+social/tests/test_listing.py checks that both produce the same data.
+"""
+from abc import ABC, abstractmethod
+
+from taggit.models import Tag
+
+from . import images
+from .models import Comment, Post, Profile
+
+
+class Rows(ABC):
+    """``.values()`` fields of a list page and how to render one row"""
+
+    model = None
+    fields = ()
+
+    def __init__(self, request=None):
+        self.request = request
+
+    def values(self, queryset):
+        return queryset.prefetch_related(None).values(*self.fields)
+
+    def render(self, rows):
+        return [self.render_row(row) for row in rows]
+
+    @abstractmethod
+    def render_row(self, row):
+        """Output of the list serializer for one ``.values()`` row"""
+
+    def image_url(self, row, variant):
+        return images.stored_variant_url(
+            self.model._meta.get_field("image").storage,
+            row["image"],
+            row["image_variants"],
+            variant,
+            self.request,
+        )
+
+
+class PostRows(Rows):
+    model = Post
+    fields = (
+        "id",
+        "user_id",
+        "title",
+        "description",
+        "user__email",
+        "image",
+        "image_variants",
+        "likes_count",
+        "comments_count",
+    )
+
+    def render(self, rows):
+        self.hashtags = self.hashtag_names([row["id"] for row in rows])
+        return super().render(rows)
+
+    @staticmethod
+    def hashtag_names(post_ids):
+        """Sorted tag names per post, as rendered by HashtagListField"""
+        names = {}
+        if not post_ids:
+            return names
+
+        for post_id, name in Tag.objects.filter(
+            post_tags__content_object__in=post_ids
+        ).values_list("post_tags__content_object", "name"):
+            names.setdefault(post_id, []).append(name)
+        return {post_id: sorted(tags) for post_id, tags in names.items()}
+
+    def render_row(self, row):
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "description": row["description"],
+            "user": row["user__email"],
+            "image": self.image_url(row, "thumb"),
+            "hashtags": self.hashtags.get(row["id"], []),
+            "liked_by": f"{row['likes_count']} user(s)",
+            "comments_count": row["comments_count"],
+        }
+
+
+class ProfileRows(Rows):
+    model = Profile
+    fields = (
+        "id",
+        "first_name",
+        "last_name",
+        "user__email",
+        "image",
+        "image_variants",
+        "followers_count",
+        "following_count",
+    )
+
+    def render_row(self, row):
+        return {
+            "id": row["id"],
+            "user": f"{row['first_name']} {row['last_name']} ({row['user__email']})",
+            "image": self.image_url(row, "thumb"),
+            "followers": f"{row['followers_count']} user(s)",
+            "is_following": f"{row['following_count']} user(s)",
+        }
+
+
+class CommentRows(Rows):
+    model = Comment
+    fields = (
+        "id",
+        "post_id",
+        "user_id",
+        "parent_id",
+        "text",
+        "is_reply",
+        "user__email",
+        "user__profile__first_name",
+        "user__profile__last_name",
+        "post__title",
+        "post__user__email",
+        "post__user__profile__first_name",
+        "post__user__profile__last_name",
+        "parent__post__title",
+        "parent__post__user__email",
+        "parent__post__user__profile__first_name",
+        "parent__post__user__profile__last_name",
+    )
+
+    def render_row(self, row):
+        # Replies are shown under the post of their parent
+        post = "parent__post" if row["parent_id"] else "post"
+        return {
+            "id": row["id"],
+            "post": row[f"{post}__title"],
+            "post_author": (
+                f"{row[f'{post}__user__profile__first_name']} "
+                f"{row[f'{post}__user__profile__last_name']} "
+                f"({row[f'{post}__user__email']})"
+            ),
+            "commented_by": (
+                f"{row['user__profile__first_name']} "
+                f"{row['user__profile__last_name']} "
+                f"({row['user__email']})"
+            ),
+            "text": row["text"],
+            "is_reply": row["is_reply"],
+            "parent": row["parent_id"],
+        }
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from social import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure latency percentiles and queries per request of every API route, "
+        "on the current data or on generated graphs of the given sizes. "
+        "Everything runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            help="Comma-separated user counts of graphs to generate (ex. 100,1000), "
+            "the current data is used without it",
+        )
+        parser.add_argument("--requests", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--warm-cache",
+            action="store_true",
+            help="Serve repeated requests from the response cache",
+        )
+        parser.add_argument("--label", default="", help="Stored in the report")
+        parser.add_argument("--output", help="JSON file, printed without it")
+
+    def handle(self, *args, **options):
+        sizes = [None]
+        if options["sizes"]:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+
+        report = {
+            "label": options["label"],
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "requests": options["requests"],
+            "warm_cache": options["warm_cache"],
+            "runs": [],
+        }
+
+        for size in sizes:
+            self.stderr.write(f"Benchmarking {size or 'current'} data...")
+            with transaction.atomic():
+                if size is not None:
+                    benchmark.generate_graph(
+                        size, seed=options["seed"], prefix="benchmark-run"
+                    )
+                report["runs"].append(
+                    {
+                        "size": size,
+                        "data": benchmark.data_sizes(),
+                        "routes": benchmark.benchmark_routes(
+                            options["requests"], options["warm_cache"]
+                        ),
+                    }
+                )
+                transaction.set_rollback(True)
+
+        result = benchmark.dump(report, options["output"])
+        if options["output"]:
+            self.stderr.write(self.style.SUCCESS(f"Benchmark saved to {result}!"))
+        else:
+            self.stdout.write(result)
@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from social import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk insert a reproducible synthetic social graph: users, profiles, "
+        "power-law followers and likes, posts with tags, nested comments"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        for name, default in benchmark.GRAPH_DEFAULTS.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--prefix", default="bench", help="Prefix of the generated emails"
+        )
+
+    def handle(self, *args, **options):
+        prefix = f"{options['prefix']}-{options['seed']}-"
+        if get_user_model().objects.filter(email__startswith=prefix).exists():
+            raise CommandError(
+                f"Users {prefix}* already exist, use another --seed or --prefix"
+            )
+
+        self.stdout.write(f"Generating a social graph of {options['users']} users...")
+
+        with transaction.atomic():
+            created = benchmark.generate_graph(
+                options["users"],
+                seed=options["seed"],
+                prefix=options["prefix"],
+                **{name: options[name] for name in benchmark.GRAPH_DEFAULTS},
+            )
+
+        for name, count in created.items():
+            self.stdout.write(f"  {name}: {count}")
+        self.stdout.write(self.style.SUCCESS("Social graph generated!"))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+UNUSED_INDEXES = """
+    SELECT s.relname, s.indexrelname, pg_size_pretty(pg_relation_size(s.indexrelid))
+    FROM pg_stat_user_indexes s
+    JOIN pg_index i ON i.indexrelid = s.indexrelid
+    WHERE s.idx_scan = 0 AND NOT i.indisunique AND NOT i.indisprimary
+    ORDER BY pg_relation_size(s.indexrelid) DESC
+"""
+
+MISSING_INDEXES = """
+    SELECT relname, seq_scan, seq_tup_read, coalesce(idx_scan, 0), n_live_tup
+    FROM pg_stat_user_tables
+    WHERE seq_scan > coalesce(idx_scan, 0) AND n_live_tup >= %s
+    ORDER BY seq_tup_read DESC
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Report indexes never scanned and large tables read mostly by "
+        "sequential scans, from the PostgreSQL statistics views"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=10000,
+            help="Only report sequential scans on tables with at least this many rows",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("The index report needs PostgreSQL statistics")
+
+        with connection.cursor() as cursor:
+            cursor.execute(UNUSED_INDEXES)
+            unused = cursor.fetchall()
+            cursor.execute(MISSING_INDEXES, [options["min_rows"]])
+            missing = cursor.fetchall()
+
+        self.stdout.write("Unused indexes (never scanned since the last stats reset):")
+        for table, index, size in unused:
+            self.stdout.write(f"  {table}.{index} ({size})")
+        if not unused:
+            self.stdout.write("  none")
+
+        self.stdout.write("Tables read mostly by sequential scans, missing an index?")
+        for table, seq_scan, seq_rows, idx_scan, rows in missing:
+            self.stdout.write(
+                f"  {table}: {seq_scan} seq scans reading {seq_rows} rows, "
+                f"{idx_scan} index scans, {rows} rows"
+            )
+        if not missing:
+            self.stdout.write("  none")
+
+        self.stdout.write(self.style.SUCCESS("Index report done!"))
@@ -0,0 +1,49 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from social import images
+from social.models import Post, Profile
+
+
+class Command(BaseCommand):
+    help = "Create the size variants of post and profile images missing them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--strip-metadata",
+            action="store_true",
+            help="Re-encode the stored originals still carrying EXIF data",
+        )
+
+    def strip_metadata(self, instance):
+        field = instance.image
+        with field.open("rb"):
+            if not images.has_metadata(field.file):
+                return False
+            stripped = images.strip_metadata(field.file)
+
+        # Saved under a new name, the variants follow from the save signals
+        old_name = field.name
+        field.save(os.path.basename(old_name), stripped)
+        field.storage.delete(old_name)
+        return True
+
+    def handle(self, *args, **options):
+        self.stdout.write("Processing images...")
+
+        processed = stripped = 0
+        for model in [Post, Profile]:
+            queryset = model.objects.exclude(image="").exclude(image__isnull=True)
+            for instance in queryset.only("image", "image_variants").iterator():
+                if options["strip_metadata"] and self.strip_metadata(instance):
+                    stripped += 1
+                if images.needs_processing(instance):
+                    images.process_image(instance)
+                    processed += 1
+
+        if options["strip_metadata"]:
+            self.stdout.write(f"{stripped} original(s) stripped of their metadata")
+        self.stdout.write(
+            self.style.SUCCESS(f"{processed} image(s) processed!")
+        )
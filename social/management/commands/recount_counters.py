@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from social import counters
+
+
+class Command(BaseCommand):
+    help = "Recompute like, comment, follower and following counters"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Recounting counters...")
+
+        with transaction.atomic():
+            counters.recount()
+
+        self.stdout.write(
+            self.style.SUCCESS("Counters recounted!")
+        )
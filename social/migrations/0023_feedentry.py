@@ -0,0 +1,95 @@
+# Generated by Django 4.2.10 on 2026-10-17 18:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_feeds(apps, schema_editor):
+    Profile = apps.get_model("social", "Profile")
+    Post = apps.get_model("social", "Post")
+    FeedEntry = apps.get_model("social", "FeedEntry")
+
+    for profile in Profile.objects.exclude(user=None).iterator():
+        followers = list(profile.followers.values_list("id", flat=True))
+        if not followers or len(followers) >= settings.FEED_FANOUT_THRESHOLD:
+            continue
+
+        post_ids = Post.objects.filter(user_id=profile.user_id).order_by(
+            "-id"
+        ).values_list("id", flat=True)[: settings.FEED_BACKFILL_SIZE]
+        FeedEntry.objects.bulk_create(
+            [
+                FeedEntry(owner_id=owner_id, post_id=post_id, author_id=profile.user_id)
+                for owner_id in followers
+                for post_id in post_ids
+            ],
+            batch_size=settings.FEED_FANOUT_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("social", "0022_remove_comment_replies_alter_post_image"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed_entries",
+                        to="social.post",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["owner", "author", "post"],
+                "indexes": [
+                    models.Index(
+                        fields=["owner", "author", "post"],
+                        name="feed_owner_author_post_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="feedentry",
+            constraint=models.UniqueConstraint(
+                fields=("owner", "post"), name="unique_feed_entry"
+            ),
+        ),
+        migrations.RunPython(backfill_feeds, migrations.RunPython.noop),
+    ]
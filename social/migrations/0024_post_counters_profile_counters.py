@@ -0,0 +1,64 @@
+# Generated by Django 4.2.10 on 2026-10-17 18:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, column):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{column: OuterRef("pk")})
+            .order_by()
+            .values(column)
+            .annotate(total=Count("*"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model("social", "Post")
+    Profile = apps.get_model("social", "Profile")
+    Comment = apps.get_model("social", "Comment")
+
+    Post.objects.update(
+        likes_count=_count(Post.liked_by.through.objects, "post"),
+        comments_count=_count(Comment.objects, "post"),
+    )
+    Profile.objects.update(
+        followers_count=_count(Profile.followers.through.objects, "profile"),
+        following_count=_count(Profile.is_following.through.objects, "profile"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social", "0023_feedentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="comments_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="followers_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="following_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 4.2.10 on 2026-10-17 18:31
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+FORWARD_SQL = """
+CREATE FUNCTION social_post_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER social_post_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description, search_vector ON social_post
+    FOR EACH ROW EXECUTE FUNCTION social_post_search_vector_update();
+
+CREATE FUNCTION social_comment_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('english', coalesce(NEW.text, ''));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER social_comment_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF text, search_vector ON social_comment
+    FOR EACH ROW EXECUTE FUNCTION social_comment_search_vector_update();
+
+UPDATE social_post SET title = title;
+UPDATE social_comment SET text = text;
+
+CREATE INDEX social_post_search_vector_idx
+    ON social_post USING gin (search_vector);
+CREATE INDEX social_post_title_trgm_idx
+    ON social_post USING gin (title gin_trgm_ops);
+CREATE INDEX social_post_description_trgm_idx
+    ON social_post USING gin (description gin_trgm_ops);
+CREATE INDEX social_comment_search_vector_idx
+    ON social_comment USING gin (search_vector);
+CREATE INDEX social_comment_text_trgm_idx
+    ON social_comment USING gin (text gin_trgm_ops);
+"""
+
+BACKWARD_SQL = """
+DROP INDEX IF EXISTS social_comment_text_trgm_idx;
+DROP INDEX IF EXISTS social_comment_search_vector_idx;
+DROP INDEX IF EXISTS social_post_description_trgm_idx;
+DROP INDEX IF EXISTS social_post_title_trgm_idx;
+DROP INDEX IF EXISTS social_post_search_vector_idx;
+DROP TRIGGER IF EXISTS social_comment_search_vector_trigger ON social_comment;
+DROP FUNCTION IF EXISTS social_comment_search_vector_update();
+DROP TRIGGER IF EXISTS social_post_search_vector_trigger ON social_post;
+DROP FUNCTION IF EXISTS social_post_search_vector_update();
+"""
+
+
+def create_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(FORWARD_SQL)
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(BACKWARD_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social", "0024_post_counters_profile_counters"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="comment",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
@@ -0,0 +1,217 @@
+# Generated by Django 4.2.10 on 2026-10-17 18:37
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def copy_edges(apps, schema_editor):
+    """Merge the mirrored many-to-many tables into the Like and Follow tables"""
+    Post = apps.get_model("social", "Post")
+    Profile = apps.get_model("social", "Profile")
+    Like = apps.get_model("social", "Like")
+    Follow = apps.get_model("social", "Follow")
+    batch_size = 1000
+
+    likes = {
+        (user_id, post_id)
+        for user_id, post_id in Post.liked_by.through.objects.values_list(
+            "user_id", "post_id"
+        )
+    }
+    likes.update(
+        Profile.i_like.through.objects.exclude(profile__user=None).values_list(
+            "profile__user_id", "post_id"
+        )
+    )
+    Like.objects.bulk_create(
+        [Like(user_id=user_id, post_id=post_id) for user_id, post_id in likes],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+
+    follows = {
+        (user_id, profile_id)
+        for user_id, profile_id in Profile.followers.through.objects.values_list(
+            "user_id", "profile_id"
+        )
+    }
+    follows.update(
+        Profile.is_following.through.objects.exclude(profile__user=None)
+        .filter(user__profile__isnull=False)
+        .values_list("profile__user_id", "user__profile__id")
+    )
+    Follow.objects.bulk_create(
+        [
+            Follow(follower_id=user_id, profile_id=profile_id)
+            for user_id, profile_id in follows
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+
+
+def _count(queryset, column):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{column: OuterRef("pk")})
+            .order_by()
+            .values(column)
+            .annotate(total=Count("*"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def recount(apps, schema_editor):
+    Post = apps.get_model("social", "Post")
+    Profile = apps.get_model("social", "Profile")
+    Like = apps.get_model("social", "Like")
+    Follow = apps.get_model("social", "Follow")
+
+    Post.objects.update(likes_count=_count(Like.objects, "post"))
+    Profile.objects.update(
+        followers_count=_count(Follow.objects, "profile"),
+        following_count=Coalesce(
+            Subquery(
+                Follow.objects.filter(follower_id=OuterRef("user_id"))
+                .order_by()
+                .values("follower_id")
+                .annotate(total=Count("*"))
+                .values("total")
+            ),
+            0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("social", "0025_post_search_vector_comment_search_vector"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Like",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="likes",
+                        to="social.post",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="likes",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="Follow",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "follower",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="following_edges",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "profile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="follower_edges",
+                        to="social.profile",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["id"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="like",
+            constraint=models.UniqueConstraint(
+                fields=("user", "post"), name="unique_like"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="follow",
+            constraint=models.UniqueConstraint(
+                fields=("follower", "profile"), name="unique_follow"
+            ),
+        ),
+        migrations.RunPython(copy_edges, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="profile",
+            name="i_like",
+        ),
+        migrations.RemoveField(
+            model_name="profile",
+            name="is_following",
+        ),
+        migrations.RemoveField(
+            model_name="post",
+            name="liked_by",
+        ),
+        migrations.RemoveField(
+            model_name="profile",
+            name="followers",
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="liked_by",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="posts",
+                through="social.Like",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="profile",
+            name="followers",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="followers_profile",
+                through="social.Follow",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(recount, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.10 on 2026-10-17 18:44
+
+from django.db import migrations, models
+
+PATH_STEP = 10
+
+
+def fill_paths(apps, schema_editor):
+    """Fill the paths level by level, starting with top-level comments"""
+    Comment = apps.get_model("social", "Comment")
+
+    level = Comment.objects.filter(parent__isnull=True)
+    depth = 0
+    while True:
+        comments = [
+            Comment(
+                pk=pk,
+                path=(parent_path or "") + str(pk).zfill(PATH_STEP),
+                depth=depth,
+            )
+            for pk, parent_path in level.values_list("pk", "parent__path")
+        ]
+        if not comments:
+            break
+        Comment.objects.bulk_update(comments, ["path", "depth"], batch_size=1000)
+        level = Comment.objects.filter(
+            path="", parent__depth=depth, parent__path__gt=""
+        )
+        depth += 1
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social", "0028_image_variants"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="depth",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="path",
+            field=models.CharField(default="", editable=False, max_length=1000),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["path"],
+                name="comment_path_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,162 @@
+# Generated by Django 4.2.10 on 2026-10-17 19:03
+
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+import django.db.models.deletion
+import taggit.managers
+
+# When existing posts were tagged is unknown, keep them out of trending
+TAGGED_BEFORE = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _post_items(apps):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    TaggedItem = apps.get_model("taggit", "TaggedItem")
+    return TaggedItem.objects.filter(
+        content_type__in=ContentType.objects.filter(app_label="social", model="post")
+    )
+
+
+def copy_tags(apps, schema_editor):
+    """Move the generic tagged items of posts to PostTag"""
+    Post = apps.get_model("social", "Post")
+    PostTag = apps.get_model("social", "PostTag")
+
+    items = _post_items(apps)
+    PostTag.objects.bulk_create(
+        [
+            PostTag(tag_id=tag_id, content_object_id=post_id)
+            for tag_id, post_id in items.filter(
+                object_id__in=Post.objects.values("pk")
+            ).values_list("tag_id", "object_id")
+        ],
+        batch_size=1000,
+    )
+    PostTag.objects.update(created_at=TAGGED_BEFORE)
+    items.delete()
+
+
+def restore_tags(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    TaggedItem = apps.get_model("taggit", "TaggedItem")
+    PostTag = apps.get_model("social", "PostTag")
+
+    content_type, _ = ContentType.objects.get_or_create(
+        app_label="social", model="post"
+    )
+    TaggedItem.objects.bulk_create(
+        [
+            TaggedItem(tag_id=tag_id, content_type=content_type, object_id=post_id)
+            for tag_id, post_id in PostTag.objects.values_list(
+                "tag_id", "content_object_id"
+            )
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "taggit",
+            "0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx",
+        ),
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("social", "0030_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostTag",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+                (
+                    "content_object",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="post_tags",
+                        to="social.post",
+                    ),
+                ),
+                (
+                    "tag",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="post_tags",
+                        to="taggit.tag",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="post",
+            name="hashtags",
+            field=taggit.managers.TaggableManager(
+                blank=True,
+                help_text="A comma-separated list of tags.",
+                through="social.PostTag",
+                to="taggit.Tag",
+                verbose_name="Tags",
+            ),
+        ),
+        migrations.CreateModel(
+            name="TagTrendBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "tag",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="trend_buckets",
+                        to="taggit.tag",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [models.Index(fields=["hour"], name="tag_trend_hour_idx")],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="tagtrendbucket",
+            constraint=models.UniqueConstraint(
+                fields=("tag", "hour"), name="unique_tag_trend_bucket"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="posttag",
+            index=models.Index(
+                fields=["tag", "content_object"], name="post_tag_tag_post_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="posttag",
+            constraint=models.UniqueConstraint(
+                fields=("content_object", "tag"), name="unique_post_tag"
+            ),
+        ),
+        migrations.RunPython(copy_tags, restore_tags),
+    ]
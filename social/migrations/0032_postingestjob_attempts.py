@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-17 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social", "0031_post_tags"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="postingestjob",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
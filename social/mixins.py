@@ -1,48 +1,371 @@
+import asyncio
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils.decorators import classonlymethod
 from rest_framework import status
 from rest_framework.response import Response
 
+from social_media_api_service.metrics import RESPONSE_CACHE
+
+from . import cache, counters, edges, feed
+from .models import Follow, Like, Post, Profile
+from .tasks import backfill_followers
+
+
+def _backfill_feeds(author_ids):
+    """Materialize the posts of authors no longer merged into timelines on read"""
+    author_ids = feed.fell_under_threshold(author_ids)
+    if not author_ids:
+        return
+    if settings.FEED_FANOUT_ASYNC:
+        transaction.on_commit(partial(backfill_followers.delay, author_ids))
+    else:
+        feed.backfill_followers(author_ids)
+
 
 class ToggleFollowMixin:
     def toggle_follow_common(self, request, instance):
         profile = instance.user.profile
 
         if request.method == "POST" and request.user.profile != profile:
-            follow_status = request.data.get("follow", "")
-            if follow_status == "U":
-                profile.followers.remove(request.user)
-                request.user.profile.is_following.remove(profile.user)
-            if follow_status == "F":
-                profile.followers.add(request.user)
-                request.user.profile.is_following.add(profile.user)
-
-            profile.save()
-
             serializer = self.get_serializer(instance=profile, data=request.data)
             serializer.is_valid(raise_exception=True)
-            serializer.save()
+            follow_status = serializer.validated_data.get("follow")
+
+            with transaction.atomic():
+                delta = 0
+                if follow_status == "U":
+                    delta = -edges.unfollow(request.user, profile)
+                if follow_status == "F":
+                    delta = int(edges.follow(request.user, profile))
+
+                updates = {}
+                if delta:
+                    updates["followers_count"] = F("followers_count") + delta
+                if follow_status is not None:
+                    updates["follow"] = profile.follow = follow_status
+                if updates:
+                    Profile.objects.filter(pk=profile.pk).update(**updates)
+
+                if delta:
+                    counters.adjust(
+                        Profile, request.user.profile.pk, following_count=delta
+                    )
+                    if delta > 0:
+                        feed.follow(request.user, profile.user)
+                    else:
+                        feed.unfollow(request.user, profile.user)
+                        _backfill_feeds([profile.user_id])
+
+            if delta:
+                cache.bump(
+                    "profile",
+                    f"profile:{profile.pk}",
+                    f"profile:{request.user.profile.pk}",
+                )
 
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response({"error": "Invalid method"}, status=status.HTTP_400_BAD_REQUEST)
 
+    def bulk_toggle_follow_common(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data["items"]
 
-class ToggleLikeMixin:
-    def toggle_like_common(self, request, post):
-        if request.method == "POST" and request.user.profile != post.user.profile:
-            like_status = request.data.get("like", "")
-            if like_status == "U":
-                post.liked_by.remove(request.user)
-                request.user.profile.i_like.remove(post)
-            if like_status in ["L", "D"]:
-                post.liked_by.add(request.user)
-                request.user.profile.i_like.add(post)
+        user = request.user
+        own_profile = user.profile
+
+        with transaction.atomic():
+            profiles = Profile.objects.in_bulk([item["id"] for item in items])
+            initial = set(
+                Follow.objects.filter(
+                    follower=user, profile_id__in=profiles
+                ).values_list("profile_id", flat=True)
+            )
+            following = set(initial)
+
+            results = []
+            statuses = {}
+            for item in items:
+                profile = profiles.get(item["id"])
+                result = {"id": item["id"], "follow": item["follow"]}
+                if profile is None:
+                    result["error"] = "Not found"
+                elif profile.pk == own_profile.pk or profile.user_id is None:
+                    result["error"] = "Invalid profile"
+                elif item["follow"] == "F":
+                    result["changed"] = profile.pk not in following
+                    following.add(profile.pk)
+                    statuses[profile.pk] = item["follow"]
+                else:
+                    result["changed"] = profile.pk in following
+                    following.discard(profile.pk)
+                    statuses[profile.pk] = item["follow"]
+                results.append(result)
+
+            # Counters move by the edges actually written, concurrent
+            # requests may have changed them since ``initial`` was read
+            wanted = {pk for pk, value in statuses.items() if value == "F"}
+            added = edges.follow_many(user, wanted)
+            removed = edges.unfollow_many(user, set(statuses) - wanted)
 
-            post.save()
+            Profile.objects.filter(pk__in=added).update(
+                followers_count=F("followers_count") + 1
+            )
+            Profile.objects.filter(pk__in=removed).update(
+                followers_count=F("followers_count") - 1
+            )
+            counters.adjust(
+                Profile, own_profile.pk, following_count=len(added) - len(removed)
+            )
+            for follow_status in ["F", "U"]:
+                pks = [pk for pk, value in statuses.items() if value == follow_status]
+                Profile.objects.filter(pk__in=pks).update(follow=follow_status)
 
+            feed.follow_many(user, [profiles[pk].user_id for pk in added])
+            feed.unfollow_many(user, [profiles[pk].user_id for pk in removed])
+            _backfill_feeds([profiles[pk].user_id for pk in removed])
+
+        cache.bump(
+            "profile",
+            f"profile:{own_profile.pk}",
+            *[f"profile:{pk}" for pk in statuses],
+        )
+
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+class ToggleLikeMixin:
+    def toggle_like_common(self, request, post):
+        if request.method == "POST" and request.user.pk != post.user_id:
             serializer = self.get_serializer(instance=post, data=request.data)
             serializer.is_valid(raise_exception=True)
-            serializer.save()
+            like_status = serializer.validated_data.get("like")
+
+            with transaction.atomic():
+                delta = 0
+                if like_status == "U":
+                    delta = -edges.unlike(request.user, post)
+                if like_status in ["L", "D"]:
+                    delta = int(edges.like(request.user, post))
+
+                updates = {}
+                if delta:
+                    updates["likes_count"] = F("likes_count") + delta
+                if like_status is not None:
+                    updates["like"] = post.like = like_status
+                if updates:
+                    Post.objects.filter(pk=post.pk).update(**updates)
+
+            if delta:
+                cache.bump("post", f"post:{post.pk}")
 
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response({"error": "Invalid method"}, status=status.HTTP_400_BAD_REQUEST)
+
+    def bulk_toggle_like_common(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data["items"]
+
+        user = request.user
+
+        with transaction.atomic():
+            posts = Post.objects.in_bulk([item["id"] for item in items])
+            initial = set(
+                Like.objects.filter(user=user, post_id__in=posts).values_list(
+                    "post_id", flat=True
+                )
+            )
+            liked = set(initial)
+
+            results = []
+            statuses = {}
+            for item in items:
+                post = posts.get(item["id"])
+                result = {"id": item["id"], "like": item["like"]}
+                if post is None:
+                    result["error"] = "Not found"
+                elif post.user_id == user.pk:
+                    result["error"] = "Invalid post"
+                elif item["like"] in ["L", "D"]:
+                    result["changed"] = post.pk not in liked
+                    liked.add(post.pk)
+                    statuses[post.pk] = item["like"]
+                else:
+                    result["changed"] = post.pk in liked
+                    liked.discard(post.pk)
+                    statuses[post.pk] = item["like"]
+                results.append(result)
+
+            # Counters move by the edges actually written, concurrent
+            # requests may have changed them since ``initial`` was read
+            wanted = {pk for pk, value in statuses.items() if value in ["L", "D"]}
+            added = edges.like_many(user, wanted)
+            removed = edges.unlike_many(user, set(statuses) - wanted)
+
+            Post.objects.filter(pk__in=added).update(
+                likes_count=F("likes_count") + 1
+            )
+            Post.objects.filter(pk__in=removed).update(
+                likes_count=F("likes_count") - 1
+            )
+            for like_status in ["L", "D", "U"]:
+                pks = [pk for pk, value in statuses.items() if value == like_status]
+                Post.objects.filter(pk__in=pks).update(like=like_status)
+
+        cache.bump("post", *[f"post:{pk}" for pk in statuses])
+
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+class CachedResponseMixin:
+    """
+    Serves list and retrieve responses from the cache. Entries are keyed
+    on the version of ``cache_name`` (lists) or of the object (details),
+    which model signals and write actions bump to invalidate them.
+    """
+
+    cache_name = None
+
+    def _versioned_name(self, pk):
+        return self.cache_name if pk is None else f"{self.cache_name}:{pk}"
+
+    def cached_response(self, request, get_response, pk=None):
+        if self.cache_name is None:
+            return get_response()
+
+        key = cache.response_key(request, [self._versioned_name(pk)])
+        data = cache.get_response_data(key)
+        if data is not None:
+            RESPONSE_CACHE.labels(self.cache_name, "hit").inc()
+            return Response(data)
+        RESPONSE_CACHE.labels(self.cache_name, "miss").inc()
+
+        response = get_response()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set_response_data(key, response.data)
+        return response
+
+    async def acache_lookup(self, request):
+        """Key and cached data of the current request, (None, None) when uncached"""
+        if self.cache_name is None:
+            return None, None
+
+        pk = self.kwargs.get("pk")
+        key = await cache.aresponse_key(request, [self._versioned_name(pk)])
+        return key, await cache.aget_response_data(key)
+
+    async def acached_response(self, lookup, get_response):
+        """
+        Async cached_response taking the result of acache_lookup,
+        ``get_response`` runs in the ORM thread on a miss
+        """
+        key, data = lookup
+        if key is None:
+            return await sync_to_async(get_response)()
+
+        if data is not None:
+            RESPONSE_CACHE.labels(self.cache_name, "hit").inc()
+            return Response(data)
+        RESPONSE_CACHE.labels(self.cache_name, "miss").inc()
+
+        response = await sync_to_async(get_response)()
+        if response.status_code == status.HTTP_200_OK:
+            await cache.aset_response_data(key, response.data)
+        return response
+
+
+class CompactListMixin:
+    """
+    Lists with the ``.values()`` rows of ``list_rows_class``, see social.listing,
+    instead of instantiating the list serializer for every row
+    """
+
+    list_rows_class = None
+
+    def compact_list(self, request, *args, **kwargs):
+        rows = self.list_rows_class(request)
+        queryset = rows.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(rows.render(page))
+        return Response(rows.render(queryset))
+
+
+class AsyncActionsMixin:
+    """
+    Under ASGI, serves the viewset actions listed in ``async_actions``
+    with their ``a<action>(request, lookup, ...)`` coroutine, ``lookup``
+    being the response cache lookup of CachedResponseMixin.
+
+    The token's user is read while the response cache is looked up, and
+    throttling runs off the ORM thread, so a cache hit costs one query and
+    no thread is held while it waits on the cache. The other actions keep
+    the sync DRF dispatch. Must come before the DRF viewset in the bases.
+    """
+
+    async_actions = ()
+
+    @classonlymethod
+    def as_view(cls, actions=None, **initkwargs):
+        view = super().as_view(actions, **initkwargs)
+        if not settings.ASGI or not set(actions.values()) & set(cls.async_actions):
+            return view
+
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            action = actions.get(request.method.lower())
+            if action not in cls.async_actions:
+                return await sync_view(request, *args, **kwargs)
+
+            self = cls(**initkwargs)
+            self.action_map = actions
+            for method, name in actions.items():
+                setattr(self, method, getattr(self, name))
+            self.request = request
+            return await self.adispatch(request, *args, **kwargs)
+
+        async_view.__name__ = view.__name__
+        async_view.__doc__ = view.__doc__
+        async_view.cls = cls
+        async_view.initkwargs = initkwargs
+        async_view.actions = actions
+        async_view.csrf_exempt = True
+        return async_view
+
+    async def ainitial(self, request, *args, **kwargs):
+        # Reading the token's user needs the ORM, the rest only the cache
+        await sync_to_async(self.perform_authentication)(request)
+        await sync_to_async(self.initial, thread_sensitive=False)(
+            request, *args, **kwargs
+        )
+
+    async def adispatch(self, request, *args, **kwargs):
+        """APIView.dispatch awaiting the async handler of the action"""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            _, lookup = await asyncio.gather(
+                self.ainitial(request, *args, **kwargs),
+                self.acache_lookup(request),
+            )
+            handler = getattr(self, f"a{self.action}")
+            response = await handler(request, lookup, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
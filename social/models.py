@@ -2,9 +2,50 @@ import uuid
 import os
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import F, Q, Value
+from django.db.models.functions import MD5, Concat, Substr
 from django.utils.text import slugify
 from taggit.managers import TaggableManager
+from taggit.models import Tag, TaggedItemBase
+
+
+class CountersModel(models.Model):
+    """
+    Model with counter columns maintained by atomic F() updates.
+    Regular saves of an existing row leave the counters untouched,
+    so they can't overwrite them with stale in-memory values.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
+
+
+class ImageVariantsModel(models.Model):
+    """
+    Model whose ``image`` is resized and re-encoded in the background,
+    see social.images. The variants are recorded as
+    ``{"source": name, "thumb": {"webp": name, "jpeg": name, ...}, ...}``.
+    """
+
+    image_width = models.PositiveIntegerField(null=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, editable=False)
+    image_variants = models.JSONField(default=dict, editable=False)
+
+    class Meta:
+        abstract = True
 
 
 def profile_picture_file_path(instance, filename):
@@ -14,7 +55,7 @@ def profile_picture_file_path(instance, filename):
     return os.path.join("uploads/profile/", filename)
 
 
-class Profile(models.Model):
+class Profile(CountersModel, ImageVariantsModel):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
         related_name="profile",
@@ -32,10 +73,10 @@ class Profile(models.Model):
         upload_to=profile_picture_file_path
     )
     followers = models.ManyToManyField(
-        get_user_model(), blank=True, related_name="followers_profile"
-    )
-    is_following = models.ManyToManyField(
-        get_user_model(), blank=True, related_name="is_following_profile"
+        get_user_model(),
+        blank=True,
+        through="Follow",
+        related_name="followers_profile",
     )
     FOLLOW_CHOICES = (
         ("F", "Follow"),
@@ -43,9 +84,47 @@ class Profile(models.Model):
     )
     follow = models.CharField(max_length=1, choices=FOLLOW_CHOICES, blank=True)
 
-    i_like = models.ManyToManyField(
-        "Post", blank=True, related_name="posts_i_like"
-    )
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+    counter_fields = ("followers_count", "following_count")
+
+    # Shown with the posts and comments of the user
+    displayed_fields = ("first_name", "last_name", "image")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_displayed = instance.displayed_values()
+        return instance
+
+    def displayed_values(self):
+        """Current values of the loaded (not deferred) displayed fields"""
+        values = {}
+        for name in self.displayed_fields:
+            if name in self.__dict__:
+                value = getattr(self, name)
+                values[name] = value.name if name == "image" else value
+        return values
+
+    def displayed_changed(self, names=displayed_fields):
+        """Whether displayed fields changed since the profile was loaded"""
+        loaded = getattr(self, "loaded_displayed", None)
+        if loaded is None:
+            return True
+        values = self.displayed_values()
+        return any(loaded.get(name) != values.get(name) for name in names)
+
+    @property
+    def is_following(self):
+        """Users followed by the owner of this profile"""
+        return get_user_model().objects.filter(
+            profile__follower_edges__follower_id=self.user_id
+        )
+
+    @property
+    def i_like(self):
+        """Posts liked by the owner of this profile"""
+        return Post.objects.filter(likes__user_id=self.user_id)
 
     @property
     def full_name(self):
@@ -65,18 +144,18 @@ def post_picture_file_path(instance, filename):
     return os.path.join("uploads/posts/", filename)
 
 
-class Post(models.Model):
+class Post(CountersModel, ImageVariantsModel):
     title = models.CharField(max_length=255)
     description = models.TextField()
     user = models.ForeignKey(
-        settings.AUTH_USER_MODEL, on_delete=models.PROTECT
+        settings.AUTH_USER_MODEL, on_delete=models.PROTECT, db_index=False
     )
     image = models.ImageField(
         null=True,
         blank=True,
         upload_to=post_picture_file_path,
     )
-    hashtags = TaggableManager(blank=True)
+    hashtags = TaggableManager(blank=True, through="PostTag")
     follow = models.CharField(
         max_length=1,
         choices=Profile.FOLLOW_CHOICES,
@@ -90,28 +169,90 @@ class Post(models.Model):
     )
     like = models.CharField(max_length=1, choices=LIKE_CHOICES, default="U")
     liked_by = models.ManyToManyField(
-        get_user_model(), blank=True, related_name="posts"
+        get_user_model(), blank=True, through="Like", related_name="posts"
     )
 
     comments = models.ManyToManyField("Comment", blank=True, related_name="posts")
 
-    @property
-    def comments_count(self):
-        return self.post_comments.count()
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    counter_fields = ("likes_count", "comments_count")
+
+    # Maintained by a database trigger on PostgreSQL, see social.search
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def __str__(self):
         return f"{self.title} ({self.user})"
 
     class Meta:
-        unique_together = ["title", "description"]
         ordering = ["user", "id"]
+        constraints = [
+            # A btree over the whole description would be huge, its hash is not
+            models.UniqueConstraint(
+                "title",
+                MD5("description"),
+                name="unique_post_title_description_md5",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "id"], name="post_user_id_idx"),
+        ]
+
+
+class PostTag(TaggedItemBase):
+    """
+    Through model of Post.hashtags, with real foreign keys instead of
+    taggit's generic content type and object id, see social.tags
+    """
+
+    tag = models.ForeignKey(
+        Tag, on_delete=models.CASCADE, related_name="post_tags", db_index=False
+    )
+    content_object = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="post_tags", db_index=False
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_object", "tag"], name="unique_post_tag"
+            ),
+        ]
+        indexes = [
+            # Tag filters read the posts of a tag from the index only
+            models.Index(
+                fields=["tag", "content_object"], name="post_tag_tag_post_idx"
+            ),
+        ]
+
+
+class TagTrendBucket(models.Model):
+    """Posts tagged with a tag per hour, summed over a window by social.tags"""
+
+    tag = models.ForeignKey(
+        Tag, on_delete=models.CASCADE, related_name="trend_buckets", db_index=False
+    )
+    hour = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tag", "hour"], name="unique_tag_trend_bucket"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["hour"], name="tag_trend_hour_idx"),
+        ]
 
 
 class Comment(models.Model):
     text = models.TextField()
     post = models.ForeignKey(
         Post, on_delete=models.PROTECT,
-        related_name="post_comments"
+        related_name="post_comments",
+        db_index=False
     )
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -126,8 +267,264 @@ class Comment(models.Model):
         related_name="comments"
     )
 
+    # Maintained by a database trigger on PostgreSQL, see social.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Materialized path: the zero-padded ids of the ancestors and of the
+    # comment itself, so a subtree is one prefix range on an index
+    PATH_STEP = 10
+    path = models.CharField(max_length=1000, editable=False, default="")
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Deepest reply whose path fits the column
+    MAX_DEPTH = path.max_length // PATH_STEP - 1
+
     def __str__(self):
         return self.text
 
+    def build_path(self):
+        segment = str(self.pk).zfill(self.PATH_STEP)
+        if self.parent_id is None:
+            return segment
+        return self.parent.path + segment
+
+    def path_is_current(self):
+        """Whether ``path`` still matches ``parent`` without loading it"""
+        if not self.path:
+            return False
+        parent_path = self.path[:-self.PATH_STEP]
+        if self.parent_id is None:
+            return not parent_path
+        return parent_path[-self.PATH_STEP:] == str(self.parent_id).zfill(
+            self.PATH_STEP
+        )
+
+    def subtree(self, max_depth=None):
+        """Descendants in thread order, at most ``max_depth`` levels down"""
+        queryset = Comment.objects.filter(
+            path__startswith=self.path, depth__gt=self.depth
+        )
+        if max_depth is not None:
+            queryset = queryset.filter(depth__lte=self.depth + max_depth)
+        return queryset.order_by("path")
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if self.path_is_current():
+            return
+
+        old_path = self.path
+        path = self.build_path()
+        depth = len(path) // self.PATH_STEP - 1
+
+        if old_path:
+            # Moved to another parent: rewrite the whole subtree
+            Comment.objects.filter(path__startswith=old_path).update(
+                path=Concat(Value(path), Substr("path", len(old_path) + 1)),
+                depth=F("depth") + depth - self.depth,
+            )
+        else:
+            Comment.objects.filter(pk=self.pk).update(path=path, depth=depth)
+        self.path = path
+        self.depth = depth
+
+    def detach_replies(self):
+        """
+        Rewrite the subtrees of the replies as top-level threads, before
+        deleting this comment sets their parent to NULL. Returns the ids
+        of the rewritten comments.
+        """
+        # Read from the database: deleting an ancestor in the same
+        # delete() may have rewritten the path already
+        current = (
+            Comment.objects.filter(pk=self.pk).values_list("path", "depth").first()
+        )
+        if current is None:
+            return []
+
+        path, depth = current
+        descendants = Comment.objects.filter(path__startswith=path, depth__gt=depth)
+        pks = list(descendants.values_list("pk", flat=True))
+        if pks:
+            descendants.update(
+                path=Substr("path", len(path) + 1), depth=F("depth") - depth - 1
+            )
+        return pks
+
     class Meta:
         ordering = ["post", "user", "id"]
+        indexes = [
+            models.Index(
+                fields=["post", "user", "id"], name="comment_post_user_id_idx"
+            ),
+            models.Index(
+                fields=["post", "id"],
+                name="comment_post_top_level_idx",
+                condition=Q(parent__isnull=True),
+            ),
+            models.Index(
+                fields=["path"],
+                name="comment_path_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ]
+
+
+class Like(models.Model):
+    """Single source of truth for likes, see Post.liked_by and Profile.i_like"""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="likes",
+        db_index=False
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE,
+        related_name="likes",
+        db_index=False
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user} likes {self.post}"
+
+    class Meta:
+        ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "post"], name="unique_like"),
+        ]
+        indexes = [
+            models.Index(fields=["post", "id"], name="like_post_id_idx"),
+        ]
+
+
+class Follow(models.Model):
+    """
+    Single source of truth for follows,
+    see Profile.followers and Profile.is_following
+    """
+
+    follower = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="following_edges",
+        db_index=False
+    )
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE,
+        related_name="follower_edges",
+        db_index=False
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.follower} follows {self.profile}"
+
+    class Meta:
+        ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["follower", "profile"], name="unique_follow"
+            ),
+        ]
+        indexes = [
+            # Covers the fan-out of new posts to followers
+            models.Index(
+                fields=["profile", "follower"], name="follow_profile_follower_idx"
+            ),
+        ]
+
+
+def ingest_picture_file_path(instance, filename):
+    _, extension = os.path.splitext(filename)
+    filename = f"{slugify(instance.payload['title'])}-{uuid.uuid4()}{extension}"
+
+    return os.path.join("uploads/posts/", filename)
+
+
+class PostIngestJob(models.Model):
+    """Post accepted by the API and created later by a Celery worker"""
+
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "Pending"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="post_ingest_jobs"
+    )
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default=PENDING)
+    payload = models.JSONField()
+    image = models.ImageField(
+        null=True,
+        blank=True,
+        upload_to=ingest_picture_file_path,
+    )
+    post = models.OneToOneField(
+        Post,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="ingest_job"
+    )
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.payload.get('title')} ({self.status})"
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(
+                fields=["status", "created_at"],
+                name="ingest_status_created_idx",
+            ),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Post materialized into the timeline of one of its author's followers"""
+
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        db_index=False
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE,
+        related_name="feed_entries"
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.post} -> {self.owner}"
+
+    class Meta:
+        ordering = ["owner", "author", "post"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "post"], name="unique_feed_entry"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["owner", "author", "post"],
+                name="feed_owner_author_post_idx",
+            ),
+        ]
@@ -0,0 +1,244 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination keyed on the queryset ordering.
+
+    Every page is read with a range condition on the ordering columns
+    of the last row of the previous page instead of an OFFSET, so page N
+    costs the same as page 1. Cursors are opaque base64 strings.
+    Pages keep the ``count`` of the limit/offset responses, one COUNT
+    query. Clients that still send ``offset`` get the old limit/offset
+    pages.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    legacy_query_param = "offset"
+    legacy_class = LimitOffsetPagination
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.legacy = None
+        self.ordering = self.get_ordering(queryset)
+
+        if self.ordering is None or self.legacy_query_param in request.query_params:
+            self.legacy = self.legacy_class()
+            return self.legacy.paginate_queryset(queryset, request, view)
+
+        self.model = queryset.model
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        position, reverse = self.decode_cursor(request)
+        self.count = queryset.count()
+        return self._paginate(queryset, position, reverse)
+
+    def paginate_first_page(self, queryset, base_url):
+        """
+        First page of ``queryset`` with links pointing to ``base_url``,
+        for embedding a paginated sub-resource into another response
+        """
+        self.legacy = None
+        self.count = None
+        self.ordering = self.get_ordering(queryset)
+        self.model = queryset.model
+        self.base_url = base_url
+        return self._paginate(queryset, None, False)
+
+    def _paginate(self, queryset, position, reverse):
+        order_by = [self._invert(name) if reverse else name for name in self.ordering]
+        queryset = queryset.order_by(*order_by)
+        if position is not None:
+            queryset = queryset.filter(self._keyset_filter(position, reverse))
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+
+        response = OrderedDict(
+            [
+                ("next", self.get_next_link()),
+                ("previous", self.get_previous_link()),
+                ("results", data),
+            ]
+        )
+        if self.count is not None:
+            response["count"] = self.count
+            response.move_to_end("count", last=False)
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "count": {"type": "integer", "example": 123},
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": self.legacy_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Legacy offset pagination (deprecated).",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """
+        Return the ordering used as the keyset, closed by the primary key
+        so that it is unique, or None if it cannot be used as a keyset
+        (e.g. ordering by an annotation).
+        """
+        opts = queryset.model._meta
+        ordering = list(queryset.query.order_by or opts.ordering)
+        keyset = []
+
+        for name in ordering:
+            if not isinstance(name, str):
+                return None
+            descending = name.startswith("-")
+            field_name = name.lstrip("-")
+            if field_name == "pk":
+                field_name = opts.pk.name
+            try:
+                field = opts.get_field(field_name)
+            except FieldDoesNotExist:
+                return None
+            if not field.concrete or field.many_to_many:
+                return None
+            keyset.append(f"-{field.name}" if descending else field.name)
+
+        if not any(name.lstrip("-") == opts.pk.name for name in keyset):
+            keyset.append(opts.pk.name)
+
+        return keyset
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[0]), reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            position = cursor["p"]
+            reverse = bool(cursor.get("r"))
+        except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        cursor = {"p": position}
+        if reverse:
+            cursor["r"] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(cursor, cls=DjangoJSONEncoder).encode("ascii")
+        ).decode("ascii")
+
+        url = remove_query_param(self.base_url, self.legacy_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def _invert(name):
+        return name[1:] if name.startswith("-") else f"-{name}"
+
+    def _position(self, obj):
+        position = []
+        for name in self.ordering:
+            field = self.model._meta.get_field(name.lstrip("-"))
+            if isinstance(obj, dict):
+                value = obj.get(field.attname, obj.get(field.name))
+            else:
+                value = getattr(obj, field.attname)
+            position.append(value)
+        return position
+
+    def _keyset_filter(self, position, reverse):
+        """
+        Build ``(a, b, c) > (x, y, z)`` as
+        ``a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)``.
+        """
+        condition = Q()
+        equal = Q()
+        for name, value in zip(self.ordering, position):
+            field_name = name.lstrip("-")
+            descending = name.startswith("-") != reverse
+            lookup = "lt" if descending else "gt"
+            condition |= equal & Q(**{f"{field_name}__{lookup}": value})
+            equal &= Q(**{field_name: value})
+        return condition
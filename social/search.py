@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db import connection
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
+
+# Text search configuration of the search_vector triggers (migration 0025),
+# queries must be parsed with the same one
+CONFIG = "english"
+
+
+def full_text_enabled():
+    """Full-text search needs PostgreSQL, otherwise substring search is used"""
+    return settings.SEARCH_BACKEND == "postgres" and connection.vendor == "postgresql"
+
+
+def _search(queryset, text, fields):
+    """
+    Match ``text`` against the ``search_vector`` column, falling back to
+    trigram word similarity on ``fields`` for partial words, and annotate
+    every row with its ``rank``.
+    """
+    if not full_text_enabled():
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f"{field}__icontains": text})
+        return queryset.filter(condition).annotate(rank=Value(0.0))
+
+    query = SearchQuery(text, config=CONFIG, search_type="websearch")
+    condition = Q(search_vector=query)
+    for field in fields:
+        condition |= Q(**{f"{field}__trigram_word_similar": text})
+
+    similarity = [TrigramWordSimilarity(text, field) for field in fields]
+    if len(similarity) > 1:
+        similarity = [Greatest(*similarity)]
+
+    return queryset.filter(condition).annotate(
+        rank=SearchRank(F("search_vector"), query) + similarity[0]
+    )
+
+
+def search_posts(queryset, text):
+    return _search(queryset, text, ["title", "description"])
+
+
+def search_comments(queryset, text):
+    return _search(queryset, text, ["text"])
+
+
+def order_by_relevance(queryset):
+    """Most relevant first; expects a queryset returned by a search function"""
+    return queryset.order_by("-rank", "-id")
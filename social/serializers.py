@@ -1,7 +1,14 @@
+from django.conf import settings
+from django.db.models import Max, Value
+from django.db.models.functions import MD5
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 from taggit.serializers import TaggitSerializer, TagListSerializerField
 
-from .models import Post, Profile, Comment
+from . import images
+from .models import Like, Post, PostIngestJob, Profile, Comment
+from .pagination import KeysetPagination
+from .tags import set_post_tags
 
 
 def populate_comment_data(query):
@@ -13,20 +20,100 @@ def populate_comment_data(query):
                 "text": comment.text,
                 "user": str(comment.user),
                 "is_reply": comment.is_reply,
-                "parent": comment.parent.id if comment.parent else None,
+                "parent": comment.parent_id,
+                "depth": comment.depth,
             }
         )
 
     return comment_data
 
 
+def post_comments(post, parent=None):
+    """Top-level comments of a post, or the replies to ``parent``"""
+    return post.post_comments.filter(parent=parent).select_related(
+        "user"
+    ).order_by("id")
+
+
+def post_likes(post):
+    return Like.objects.filter(post=post).select_related(
+        "user__profile"
+    ).order_by("id")
+
+
+def populate_liker_data(post, likes):
+    return [
+        (f"{like.user.profile.first_name} "
+         f"{like.user.profile.last_name} ({like.user.email}): {post.like}")
+        for like in likes
+    ]
+
+
+class ImageVariantField(serializers.Field):
+    """URL of one processed size variant of the object's image"""
+
+    def __init__(self, variant, **kwargs):
+        self.variant = variant
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, obj):
+        return images.variant_url(obj, self.variant, self.context.get("request"))
+
+
+class HashtagListField(TagListSerializerField):
+    """
+    Tag names in alphabetical order, the order of taggit's prefetch is
+    undefined. Sorted in Python, ordering the prefetched tags is a query
+    """
+
+    def to_representation(self, value):
+        if not isinstance(value, list):
+            value = sorted(tag.name for tag in value.all())
+        return super().to_representation(value)
+
+
 class PostSerializer(TaggitSerializer, serializers.ModelSerializer):
     user = serializers.CharField(read_only=True, source="user.email")
-    hashtags = TagListSerializerField(required=False)
+    hashtags = HashtagListField(required=False)
 
     def validate_hashtags(self, hashtags):
         return [tag.strip() for tag in hashtags[0].split(",")]
 
+    def _save_tags(self, tag_object, tags):
+        """Hashtags in a fixed number of queries, see social.tags"""
+        if "hashtags" in tags:
+            set_post_tags(tag_object, tags["hashtags"])
+        return tag_object
+
+    def validate(self, attrs):
+        """
+        Enforce unique_post_title_description_md5 before saving,
+        DRF does not build validators for expression constraints
+        """
+        if "title" not in attrs and "description" not in attrs:
+            # Action serializers (likes, follows) and partial updates of
+            # other fields
+            return attrs
+
+        title = attrs.get("title", getattr(self.instance, "title", None))
+        description = attrs.get(
+            "description", getattr(self.instance, "description", None)
+        )
+        # On the hash, like the constraint, so that its index is used
+        duplicates = Post.objects.alias(description_md5=MD5("description")).filter(
+            title=title, description_md5=MD5(Value(description))
+        )
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError(
+                "The fields title, description must make a unique set.",
+                code="unique",
+            )
+        return attrs
+
     class Meta:
         model = Post
         fields = [
@@ -39,11 +126,26 @@ class PostSerializer(TaggitSerializer, serializers.ModelSerializer):
         ]
 
 
+class PostIngestJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PostIngestJob
+        fields = [
+            "id",
+            "status",
+            "post",
+            "error",
+            "attempts",
+            "created_at",
+            "updated_at",
+        ]
+
+
 class PostListSerializer(PostSerializer):
+    image = ImageVariantField("thumb")
     liked_by = serializers.SerializerMethodField(read_only=True)
 
     def get_liked_by(self, obj):
-        return f"{len(obj.liked_by.all())} user(s)"
+        return f"{obj.likes_count} user(s)"
 
     class Meta:
         model = Post
@@ -57,25 +159,53 @@ class PostListSerializer(PostSerializer):
             "liked_by",
             "comments_count",
         ]
+        read_only_fields = ["comments_count"]
 
 
 class PostDetailSerializer(PostListSerializer):
+    """
+    Embeds the first page of top-level comments and likers,
+    the next pages are served by the posts-comments and posts-likers routes
+    """
+
+    image = ImageVariantField("large")
     comments = serializers.SerializerMethodField(read_only=True)
+    comments_next = serializers.SerializerMethodField(read_only=True)
     liked_by = serializers.SerializerMethodField(read_only=True)
+    liked_by_next = serializers.SerializerMethodField(read_only=True)
+
+    def _first_page(self, obj, route, queryset):
+        if not hasattr(self, "_first_pages"):
+            self._first_pages = {}
+
+        key = (obj.pk, route)
+        if key not in self._first_pages:
+            paginator = KeysetPagination()
+            url = reverse(
+                f"social:posts-{route}",
+                kwargs={"pk": obj.pk},
+                request=self.context.get("request"),
+            )
+            page = paginator.paginate_first_page(queryset, url)
+            self._first_pages[key] = (page, paginator.get_next_link())
+        return self._first_pages[key]
 
     def get_liked_by(self, obj):
-        return [
-            (f"{member.profile.first_name} "
-             f"{member.profile.last_name} ({member.email}): {obj.like}")
-            for member in obj.liked_by.select_related("profile")
-        ]
+        likes, _ = self._first_page(obj, "likers", post_likes(obj))
+        return populate_liker_data(obj, likes)
+
+    def get_liked_by_next(self, obj):
+        _, next_link = self._first_page(obj, "likers", post_likes(obj))
+        return next_link
 
     def get_comments(self, obj):
-        comments = obj.post_comments.select_related(
-            "user", "post", "parent"
-        ).prefetch_related("user", "parent")
+        comments, _ = self._first_page(obj, "comments", post_comments(obj))
         return populate_comment_data(comments)
 
+    def get_comments_next(self, obj):
+        _, next_link = self._first_page(obj, "comments", post_comments(obj))
+        return next_link
+
     class Meta:
         model = Post
         fields = [
@@ -84,12 +214,21 @@ class PostDetailSerializer(PostListSerializer):
             "description",
             "user",
             "image",
+            "image_width",
+            "image_height",
             "hashtags",
             "comments",
+            "comments_next",
             "liked_by",
+            "liked_by_next",
         ]
 
 
+class TrendingTagSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    posts = serializers.IntegerField()
+
+
 class ProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = Profile
@@ -98,14 +237,15 @@ class ProfileSerializer(serializers.ModelSerializer):
 
 class ProfileListSerializer(ProfileSerializer):
     user = serializers.SerializerMethodField(read_only=True)
+    image = ImageVariantField("thumb")
     followers = serializers.SerializerMethodField(read_only=True)
     is_following = serializers.SerializerMethodField(read_only=True)
 
     def get_followers(self, obj):
-        return f"{obj.followers.count()} user(s)"
+        return f"{obj.followers_count} user(s)"
 
     def get_is_following(self, obj):
-        return f"{obj.is_following.count()} user(s)"
+        return f"{obj.following_count} user(s)"
 
     def get_user(self, obj):
         return f"{obj.first_name} {obj.last_name} ({obj.user.email})"
@@ -116,6 +256,7 @@ class ProfileListSerializer(ProfileSerializer):
 
 
 class ProfileDetailSerializer(ProfileSerializer):
+    image = ImageVariantField("large")
     followers = serializers.SerializerMethodField(read_only=True)
     is_following = serializers.SerializerMethodField(read_only=True)
 
@@ -132,7 +273,7 @@ class ProfileDetailSerializer(ProfileSerializer):
                 f"{member.profile.last_name} "
                 f"({member.profile.user.email})"
             )
-            for member in obj.is_following.all()
+            for member in obj.is_following.select_related("profile")
         ]
 
     class Meta:
@@ -144,6 +285,8 @@ class ProfileDetailSerializer(ProfileSerializer):
             "last_name",
             "bio",
             "image",
+            "image_width",
+            "image_height",
             "is_following",
             "followers",
         ]
@@ -167,7 +310,49 @@ class LikePostActionSerializer(PostSerializer):
         fields = ["id", "like"]
 
 
+class BulkLikeItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    like = serializers.ChoiceField(choices=Post.LIKE_CHOICES)
+
+
+class BulkLikeActionSerializer(serializers.Serializer):
+    items = BulkLikeItemSerializer(
+        many=True, allow_empty=False, max_length=settings.BULK_TOGGLE_MAX_ITEMS
+    )
+
+
+class BulkFollowItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    follow = serializers.ChoiceField(choices=Profile.FOLLOW_CHOICES)
+
+
+class BulkFollowActionSerializer(serializers.Serializer):
+    items = BulkFollowItemSerializer(
+        many=True, allow_empty=False, max_length=settings.BULK_TOGGLE_MAX_ITEMS
+    )
+
+
 class CommentSerializer(serializers.ModelSerializer):
+    def validate_parent(self, parent):
+        if (
+            parent is not None
+            and self.instance is not None
+            and parent.path.startswith(self.instance.path)
+        ):
+            raise serializers.ValidationError(
+                "A comment cannot be moved under itself or its replies."
+            )
+        if parent is not None:
+            height = 0
+            if self.instance is not None:
+                deepest = self.instance.subtree().aggregate(depth=Max("depth"))
+                height = (deepest["depth"] or self.instance.depth) - self.instance.depth
+            if parent.depth + 1 + height > Comment.MAX_DEPTH:
+                raise serializers.ValidationError(
+                    f"Replies are limited to {Comment.MAX_DEPTH} levels."
+                )
+        return parent
+
     class Meta:
         model = Comment
         fields = ["id", "post", "user", "text", "is_reply", "parent"]
@@ -211,11 +396,8 @@ class CommentDetailSerializer(CommentListSerializer):
     replies = serializers.SerializerMethodField(read_only=True)
 
     def get_replies(self, obj):
-        comments = (
-            obj.comments.filter(is_reply=True)
-            .select_related("user", "post", "parent")
-            .prefetch_related("user", "parent")
-        )
+        """Replies down to ``depth`` levels (1 by default), in thread order"""
+        comments = obj.subtree(self.context.get("depth", 1)).select_related("user")
         return populate_comment_data(comments)
 
     class Meta:
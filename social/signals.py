@@ -0,0 +1,111 @@
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import cache, feed, images, tags
+from .models import Comment, Post, PostIngestJob, Profile
+from .tasks import fan_out_post, process_image
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if not created:
+        return
+
+    if settings.FEED_FANOUT_ASYNC:
+        transaction.on_commit(lambda: fan_out_post.delay(instance.pk))
+    else:
+        feed.fan_out_post(instance)
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Profile)
+@receiver(pre_save, sender=PostIngestJob)
+def strip_image_metadata(sender, instance, **kwargs):
+    # Only new uploads, before the image field writes them to the storage
+    if instance.image and not instance.image._committed:
+        instance.image = images.strip_metadata(instance.image.file)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Profile)
+def process_new_image(sender, instance, **kwargs):
+    if not images.needs_processing(instance):
+        return
+
+    if settings.IMAGE_PROCESSING_ASYNC:
+        args = (instance._meta.label, instance.pk, instance.image.name)
+        transaction.on_commit(lambda: process_image.delay(*args))
+    else:
+        images.process_image(instance)
+
+
+def bump_on_commit(*names):
+    # Bumped before the commit, a concurrent request could still read the
+    # old rows and cache them under the new versions
+    transaction.on_commit(partial(cache.bump, *names))
+
+
+@receiver([post_save, post_delete], sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    bump_on_commit("post", f"post:{instance.pk}")
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_comment(sender, instance, **kwargs):
+    names = ["comment", f"comment:{instance.pk}", "post", f"post:{instance.post_id}"]
+    # Every ancestor embeds this comment in its replies. Comment.save only
+    # writes the path of new or moved comments after this signal, so the
+    # ancestors of both the stored and the new path are invalidated
+    paths = {instance.path}
+    if not instance.path_is_current():
+        paths.add(instance.build_path())
+    step = Comment.PATH_STEP
+    for path in paths:
+        for start in range(0, len(path) - step, step):
+            names.append(f"comment:{int(path[start:start + step])}")
+    if instance.parent_id:
+        names.append(f"comment:{instance.parent_id}")
+    bump_on_commit(*set(names))
+
+
+@receiver(pre_delete, sender=Post)
+def forget_post_tags(sender, instance, **kwargs):
+    tags.forget_post_tags(instance.post_tags.all())
+
+
+@receiver(pre_delete, sender=Comment)
+def detach_replies(sender, instance, **kwargs):
+    # The replies become top-level comments, their depth changes
+    pks = instance.detach_replies()
+    bump_on_commit(*[f"comment:{pk}" for pk in pks])
+
+
+@receiver(post_save, sender=Profile)
+def sync_user_names(sender, instance, created, **kwargs):
+    # The ?user= filters search the names of the user, a new profile
+    # has them already
+    if not created and instance.displayed_changed(("first_name", "last_name")):
+        get_user_model().objects.filter(pk=instance.user_id).update(
+            first_name=instance.first_name, last_name=instance.last_name
+        )
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_profile(sender, instance, created, **kwargs):
+    names = ["profile", f"profile:{instance.pk}"]
+    # Posts and comments show the names and picture of their author, a new
+    # profile has no posts or comments yet
+    if not created and instance.displayed_changed():
+        names += ["post", "comment"]
+    instance.loaded_displayed = instance.displayed_values()
+    bump_on_commit(*names)
+
+
+@receiver(post_delete, sender=Profile)
+def invalidate_deleted_profile(sender, instance, **kwargs):
+    bump_on_commit("profile", f"profile:{instance.pk}", "post", "comment")
@@ -0,0 +1,196 @@
+"""
+Hashtag index: tag filters over PostTag and trending tags.
+
+The "update-trending-tags" beat job counts the tags of new posts per
+hour into TagTrendBucket, reading only the PostTag rows created since
+its watermark. Trending tags sum the buckets of the last
+TRENDING_TAGS_WINDOW hours instead of scanning the posts. Removed tags
+and deleted posts are subtracted from the buckets they were counted in.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Greatest, TruncHour, Upper
+from django.utils import timezone
+from taggit.models import Tag
+
+from .models import PostTag, TagTrendBucket
+
+WATERMARK_KEY = "social:trending:watermark"
+LOCK_KEY = "social:trending:lock"
+
+
+def filter_posts(queryset, names, match_all=False):
+    """
+    Posts tagged with any of ``names``, or with all of them with
+    ``match_all``, as a semi-join on the PostTag index without DISTINCT
+    """
+    names = set(names)
+    tagged = PostTag.objects.filter(tag__name__in=names)
+    if match_all:
+        tagged = (
+            tagged.values("content_object")
+            .annotate(matched=Count("tag"))
+            .filter(matched=len(names))
+        )
+    return queryset.filter(pk__in=tagged.values("content_object"))
+
+
+def _case_insensitive():
+    return getattr(settings, "TAGGIT_CASE_INSENSITIVE", False)
+
+
+def _tag_key(name):
+    return name.upper() if _case_insensitive() else name
+
+
+def _find_tags(keys):
+    if _case_insensitive():
+        tags = Tag.objects.annotate(key=Upper("name")).filter(key__in=keys)
+    else:
+        tags = Tag.objects.filter(name__in=keys)
+    return {_tag_key(tag.name): tag for tag in tags}
+
+
+def set_post_tags(post, names):
+    """
+    ``post.hashtags.set(names)`` in a fixed number of queries, taggit gets
+    or creates every tag and every PostTag row one by one
+    """
+    names = {_tag_key(name): name for name in names if name}
+    tags = _find_tags(list(names))
+
+    missing = [name for key, name in names.items() if key not in tags]
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(name=name, slug=Tag().slugify(name)) for name in missing],
+            ignore_conflicts=True,
+        )
+        # Read back by their exact names, the inserted rows have them
+        for tag in Tag.objects.filter(name__in=missing):
+            tags[_tag_key(tag.name)] = tag
+        for name in missing:
+            if _tag_key(name) not in tags:
+                # Created concurrently with another case, or slug already
+                # taken by another tag: taggit finds a free one
+                lookup = "name__iexact" if _case_insensitive() else "name"
+                tags[_tag_key(name)], _ = Tag.objects.get_or_create(
+                    **{lookup: name}, defaults={"name": name}
+                )
+
+    removed = PostTag.objects.filter(content_object=post).exclude(
+        tag__in=tags.values()
+    )
+    forget_post_tags(removed)
+    removed.delete()
+    PostTag.objects.bulk_create(
+        [PostTag(content_object=post, tag=tag) for tag in tags.values()],
+        ignore_conflicts=True,
+    )
+    getattr(post, "_prefetched_objects_cache", {}).pop("hashtags", None)
+
+
+def window_start(now):
+    start = now - timedelta(hours=settings.TRENDING_TAGS_WINDOW)
+    return start.replace(minute=0, second=0, microsecond=0)
+
+
+def _add_to_buckets(counts):
+    counts = {(row["tag_id"], row["hour"]): row["count"] for row in counts}
+    total = sum(counts.values())
+
+    changed = []
+    for bucket in TagTrendBucket.objects.filter(
+        tag_id__in={tag_id for tag_id, _ in counts},
+        hour__in={hour for _, hour in counts},
+    ):
+        count = counts.pop((bucket.tag_id, bucket.hour), None)
+        if count is not None:
+            bucket.count += count
+            changed.append(bucket)
+
+    TagTrendBucket.objects.bulk_update(changed, ["count"])
+    TagTrendBucket.objects.bulk_create(
+        [
+            TagTrendBucket(tag_id=tag_id, hour=hour, count=count)
+            for (tag_id, hour), count in counts.items()
+        ]
+    )
+    return total
+
+
+def forget_post_tags(post_tags):
+    """
+    Subtract PostTag rows about to be deleted from their buckets. Only the
+    rows created before the watermark were counted, the buckets of those
+    that left the window are already gone.
+    """
+    since = cache.get(WATERMARK_KEY)
+    if since is None:
+        return
+
+    counts = (
+        post_tags.filter(created_at__lt=since)
+        .annotate(hour=TruncHour("created_at"))
+        .order_by()
+        .values("tag_id", "hour")
+        .annotate(count=Count("*"))
+    )
+    for row in counts:
+        TagTrendBucket.objects.filter(tag_id=row["tag_id"], hour=row["hour"]).update(
+            count=Greatest(F("count") - row["count"], 0)
+        )
+
+
+def update_trending(now=None):
+    """
+    Count the tags added since the last run into the hourly buckets and
+    drop the buckets that left the window. Tags younger than
+    TRENDING_TAGS_LAG seconds wait for the next run, in case the
+    transaction that added them is still open. Without a watermark
+    (first run, flushed cache) the window is rebuilt from PostTag.
+    Returns the number of tags counted, None if another run holds the lock.
+    """
+    if not cache.add(LOCK_KEY, True, timeout=settings.CELERY_TASK_TIME_LIMIT):
+        return None
+
+    try:
+        now = now or timezone.now()
+        start = window_start(now)
+        until = now - timedelta(seconds=settings.TRENDING_TAGS_LAG)
+        since = cache.get(WATERMARK_KEY)
+
+        with transaction.atomic():
+            if since is None:
+                TagTrendBucket.objects.all().delete()
+                since = start
+            else:
+                TagTrendBucket.objects.filter(hour__lt=start).delete()
+                since = max(since, start)
+
+            counted = _add_to_buckets(
+                PostTag.objects.filter(created_at__gte=since, created_at__lt=until)
+                .annotate(hour=TruncHour("created_at"))
+                .order_by()
+                .values("tag_id", "hour")
+                .annotate(count=Count("*"))
+            )
+
+        cache.set(WATERMARK_KEY, until, timeout=None)
+        return counted
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def trending(limit, now=None):
+    """The most used tags of the window with their number of posts"""
+    return list(
+        TagTrendBucket.objects.filter(hour__gte=window_start(now or timezone.now()))
+        .values(name=F("tag__name"))
+        .annotate(posts=Sum("count"))
+        .filter(posts__gt=0)
+        .order_by("-posts", "name")[:limit]
+    )
@@ -1,22 +1,43 @@
-from django.contrib.auth import get_user_model
 from celery import shared_task
-from django.db import transaction
+from django.apps import apps
+from . import cache, feed, images, ingest, tags
 from .models import Post
 
 
 @shared_task
-def delay_post_creation(user_id, post_data) -> int | Exception:
-    try:
-        with transaction.atomic():
-            user = get_user_model().objects.get(pk=user_id)
-            post = Post.objects.create(
-                user=user,
-                title=post_data["title"],
-                description=post_data["description"],
-                hashtags=post_data["hashtags"],
-                image=post_data.get("image"),
-            )
-            post.save()
-
-    except Exception as e:
-        return str(e)
+def ingest_posts(job_ids) -> int:
+    return ingest.process_jobs(job_ids)
+
+
+@shared_task
+def ingest_stale_posts() -> int:
+    return ingest.process_jobs(ingest.stale_job_ids())
+
+
+@shared_task
+def update_trending_tags() -> int | None:
+    return tags.update_trending()
+
+
+@shared_task
+def fan_out_post(post_id) -> None:
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        feed.fan_out_post(post)
+
+
+@shared_task
+def backfill_followers(author_ids) -> None:
+    feed.backfill_followers(author_ids)
+
+
+@shared_task
+def process_image(model_label, pk, image_name) -> None:
+    instance = apps.get_model(model_label).objects.filter(pk=pk).first()
+    if instance is None or instance.image.name != image_name:
+        return
+
+    if images.needs_processing(instance):
+        images.process_image(instance)
+        name = instance._meta.model_name
+        cache.bump(name, f"{name}:{pk}")
@@ -0,0 +1,92 @@
+from asyncio import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import include, path, resolve
+from rest_framework import routers
+from rest_framework_simplejwt.tokens import AccessToken
+
+from social import urls as social_urls
+from social.models import Post, Profile
+from social.tests.utils import create_user
+
+
+def build_urlpatterns():
+    """The social routes with the views built under ASGI"""
+    router = routers.DefaultRouter()
+    with override_settings(ASGI=True):
+        for prefix, viewset, basename in social_urls.router.registry:
+            router.register(prefix, viewset, basename=basename)
+        urls = router.urls
+    return [path("api/social/", include((urls, "social"), namespace="social"))]
+
+
+urlpatterns = build_urlpatterns()
+
+
+@override_settings(ASGI=True, ROOT_URLCONF=__name__)
+class AsyncActionsTests(TestCase):
+    """The actions of async_actions are served by their coroutine under ASGI"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        cls.post = Post.objects.create(user=cls.user, title="Post", description="Body")
+
+    def setUp(self):
+        cache.clear()
+        self.client = AsyncClient()
+        self.headers = {"authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    def test_async_views(self):
+        profile = f"/api/social/profiles/{self.user.profile.pk}/"
+        self.assertTrue(iscoroutinefunction(resolve(profile).func))
+        self.assertTrue(iscoroutinefunction(resolve("/api/social/posts/").func))
+        # No async action on the route
+        post = f"/api/social/posts/{self.post.pk}/"
+        self.assertFalse(iscoroutinefunction(resolve(post).func))
+
+    async def test_retrieve(self):
+        url = f"/api/social/profiles/{(await self.aprofile()).pk}/"
+
+        response = await self.client.get(url, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["first_name"], "reader")
+
+        # Served from the response cache, the update sends no signal
+        await Profile.objects.filter(user=self.user).aupdate(first_name="Renamed")
+        cached = await self.client.get(url, headers=self.headers)
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(cached.json(), response.json())
+
+    async def test_list(self):
+        response = await self.client.get("/api/social/posts/", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [post["title"] for post in response.json()["results"]], ["Post"]
+        )
+
+    async def test_errors(self):
+        response = await self.client.get(
+            "/api/social/profiles/0/", headers=self.headers
+        )
+        self.assertEqual(response.status_code, 404)
+
+        response = await self.client.get("/api/social/posts/")
+        self.assertEqual(response.status_code, 401)
+
+    async def test_sync_actions(self):
+        # The other methods of the route keep the sync dispatch
+        response = await self.client.post(
+            "/api/social/posts/",
+            {"title": "New", "description": "Body"},
+            content_type="application/json",
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(await Post.objects.filter(title="New").acount(), 1)
+
+    @sync_to_async
+    def aprofile(self):
+        return self.user.profile
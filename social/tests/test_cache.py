@@ -0,0 +1,78 @@
+from django.core.cache import cache as django_cache
+from django.test import SimpleTestCase, TestCase
+
+from social import cache
+from social.models import Post, Profile
+from social.tests.utils import create_user
+
+
+class VersionTests(SimpleTestCase):
+    def setUp(self):
+        django_cache.clear()
+
+    def test_bump_changes_version(self):
+        [before] = cache.get_versions("post:1")
+        self.assertEqual(cache.get_versions("post:1"), [before])
+
+        cache.bump("post:1")
+        [after] = cache.get_versions("post:1")
+        self.assertGreater(after, before)
+        self.assertEqual(cache.get_versions("post:2", "post:1")[1], after)
+
+    def test_lost_version_does_not_repeat(self):
+        seen = set()
+        for _ in range(3):
+            cache.bump("post")
+            seen.update(cache.get_versions("post"))
+            # Expired or evicted
+            django_cache.delete(cache._version_key("post"))
+
+        [version] = cache.get_versions("post")
+        self.assertNotIn(version, seen)
+        self.assertGreater(version, max(seen))
+
+
+class InvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("writer")
+        cls.post = Post.objects.create(user=cls.user, title="Post", description="Body")
+
+    def setUp(self):
+        django_cache.clear()
+
+    def bumped(self, change, *names):
+        """Names whose version ``change`` bumps once committed"""
+        before = cache.get_versions(*names)
+        with self.captureOnCommitCallbacks() as callbacks:
+            change()
+        self.assertEqual(cache.get_versions(*names), before)
+
+        for callback in callbacks:
+            callback()
+        after = cache.get_versions(*names)
+        return {name for name, old, new in zip(names, before, after) if new != old}
+
+    def test_bumped_on_commit(self):
+        self.post.title = "Edited"
+        self.assertEqual(
+            self.bumped(self.post.save, "post", f"post:{self.post.pk}"),
+            {"post", f"post:{self.post.pk}"},
+        )
+
+    def test_new_profile_keeps_posts_and_comments(self):
+        self.assertEqual(
+            self.bumped(lambda: create_user("reader"), "profile", "post", "comment"),
+            {"profile"},
+        )
+
+    def test_profile_change_bumps_posts_when_displayed(self):
+        profile = Profile.objects.get(user=self.user)
+        names = ("profile", "post", "comment")
+
+        profile.bio = "Hello"
+        self.assertEqual(self.bumped(profile.save, *names), {"profile"})
+
+        profile.first_name = "Renamed"
+        self.assertEqual(self.bumped(profile.save, *names), set(names))
+        self.assertEqual(self.bumped(profile.save, *names), {"profile"})
@@ -0,0 +1,175 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from social.models import Comment, Post
+from social.serializers import CommentSerializer
+from social.tests.utils import create_user
+
+
+class CommentTreeTests(TestCase):
+    """
+    Thread of the tests:
+
+        root
+        ├── first
+        │   └── nested
+        └── second
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("writer")
+        cls.post = Post.objects.create(user=cls.user, title="Post", description="")
+        cls.root = cls.comment("root")
+        cls.first = cls.comment("first", cls.root)
+        cls.second = cls.comment("second", cls.root)
+        cls.nested = cls.comment("nested", cls.first)
+
+    @classmethod
+    def comment(cls, text, parent=None):
+        return Comment.objects.create(
+            post=cls.post,
+            user=cls.user,
+            text=text,
+            is_reply=parent is not None,
+            parent=parent,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def replies(self, comment, depth=None):
+        params = {} if depth is None else {"depth": depth}
+        response = self.client.get(f"/api/social/comments/{comment.pk}/", params)
+        self.assertEqual(response.status_code, 200)
+        return [(reply["text"], reply["depth"]) for reply in response.data["replies"]]
+
+    def test_path_and_depth(self):
+        self.assertEqual(self.root.depth, 0)
+        self.assertEqual(self.nested.depth, 2)
+        self.assertEqual(
+            self.nested.path,
+            "".join(str(c.pk).zfill(10) for c in [self.root, self.first, self.nested]),
+        )
+
+    def test_replies_in_thread_order(self):
+        # "nested" was created after "second" but belongs to "first"
+        self.assertEqual(
+            self.replies(self.root, 2), [("first", 1), ("nested", 2), ("second", 1)]
+        )
+
+    def test_depth_limits_levels(self):
+        self.assertEqual(self.replies(self.root), [("first", 1), ("second", 1)])
+        self.assertEqual(self.replies(self.first, 5), [("nested", 2)])
+        self.assertEqual(self.replies(self.nested, 5), [])
+
+    def test_invalid_depth(self):
+        for depth in ["0", "-1", "deep"]:
+            response = self.client.get(
+                f"/api/social/comments/{self.root.pk}/", {"depth": depth}
+            )
+            self.assertEqual(response.status_code, 400, depth)
+            self.assertIn("depth", response.data)
+
+    def test_move_rewrites_subtree(self):
+        self.first.parent = self.second
+        self.first.save()
+
+        self.nested.refresh_from_db()
+        self.assertEqual(self.nested.depth, 3)
+        self.assertTrue(self.nested.path.startswith(self.second.path))
+        self.assertEqual(
+            self.replies(self.root, 3),
+            [("second", 1), ("first", 2), ("nested", 3)],
+        )
+
+    def assertTopLevel(self, comment):
+        comment.refresh_from_db()
+        self.assertIsNone(comment.parent_id)
+        self.assertEqual(comment.depth, 0)
+        self.assertEqual(comment.path, str(comment.pk).zfill(10))
+
+    def test_delete_detaches_replies(self):
+        self.first.delete()
+
+        self.assertTopLevel(self.nested)
+        self.assertEqual(self.replies(self.root, 3), [("second", 1)])
+
+    def test_delete_several_levels(self):
+        reply = self.comment("reply", self.nested)
+        Comment.objects.filter(pk__in=[self.root.pk, self.first.pk]).delete()
+
+        for comment in [self.second, self.nested]:
+            self.assertTopLevel(comment)
+        self.assertEqual(self.replies(self.nested), [("reply", 1)])
+        self.assertEqual(list(self.nested.subtree()), [reply])
+
+    def test_max_depth(self):
+        self.assertEqual(
+            (Comment.MAX_DEPTH + 1) * Comment.PATH_STEP,
+            Comment._meta.get_field("path").max_length,
+        )
+        deepest = self.nested
+        while deepest.depth < Comment.MAX_DEPTH:
+            deepest = self.comment("deeper", deepest)
+
+        response = self.client.post(
+            f"/api/social/comments/{deepest.pk}/reply/",
+            {"reply": "too deep", "text": "too deep"},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("reply", response.data)
+
+        # Moving "second" under "first" fits, "first" under "second" would not
+        serializer = CommentSerializer(
+            self.second, data={"parent": self.first.pk}, partial=True
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer = CommentSerializer(
+            self.first, data={"parent": self.second.pk}, partial=True
+        )
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("parent", serializer.errors)
+
+    def test_cached_ancestors_are_invalidated(self):
+        # Cached with the deep reply embedded
+        self.assertEqual(self.replies(self.root, 3)[1], ("nested", 2))
+
+        # Cache versions are bumped once the changes are committed
+        self.nested.text = "edited"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.nested.save()
+        self.assertEqual(self.replies(self.root, 3)[1], ("edited", 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.comment("deeper", self.nested)
+        self.assertEqual(self.replies(self.root, 3)[2], ("deeper", 3))
+        self.assertEqual(self.replies(self.first, 3)[1], ("deeper", 3))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.nested.delete()
+        self.assertNotIn(("edited", 2), self.replies(self.root, 3))
+
+    def test_cached_ancestors_are_invalidated_on_move(self):
+        self.assertEqual(self.replies(self.first), [("nested", 2)])
+        self.assertEqual(self.replies(self.second), [])
+
+        self.nested.parent = self.second
+        with self.captureOnCommitCallbacks(execute=True):
+            self.nested.save()
+        self.assertEqual(self.replies(self.first), [])
+        self.assertEqual(self.replies(self.second), [("nested", 2)])
+
+    def test_reply_endpoint_invalidates_parent(self):
+        self.assertEqual(self.replies(self.second), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f"/api/social/comments/{self.second.pk}/reply/",
+                {"reply": "answer", "text": "answer"},
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.replies(self.second), [("answer", 2)])
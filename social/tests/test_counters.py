@@ -0,0 +1,78 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from social import edges
+from social.models import Comment, Like, Post, Profile
+from social.tests.utils import create_user
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        cls.author = create_user("author")
+        cls.post = Post.objects.create(user=cls.author, title="Post", description="")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def comments_count(self):
+        response = self.client.get("/api/social/posts/")
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"][0]["comments_count"]
+
+    def add_comment(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                f"/api/social/posts/{self.post.pk}/add-comment/", data
+            )
+
+    def test_add_comment_counted_in_cached_list(self):
+        self.assertEqual(self.comments_count(), 0)
+
+        self.assertEqual(self.add_comment({"text": "Nice"}).status_code, 201)
+        self.assertEqual(self.comments_count(), 1)
+
+    def test_invalid_comment_not_counted(self):
+        self.assertEqual(self.add_comment({}).status_code, 400)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_failed_like_rolls_back_edge(self):
+        with mock.patch.object(
+            QuerySet, "update", side_effect=DatabaseError
+        ), self.assertRaises(DatabaseError):
+            self.client.post(
+                f"/api/social/posts/{self.post.pk}/toggle-like/", {"like": "L"}
+            )
+
+        self.assertFalse(Like.objects.exists())
+
+    def test_recount_counters(self):
+        edges.like(self.user, self.post)
+        edges.follow(self.user, self.author.profile)
+        Comment.objects.create(post=self.post, user=self.user, text="First")
+        Post.objects.update(likes_count=7, comments_count=7)
+        Profile.objects.update(followers_count=7, following_count=7)
+
+        call_command("recount_counters", stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 1))
+        counts = Profile.objects.values_list(
+            "user__email", "followers_count", "following_count"
+        )
+        self.assertEqual(
+            set(counts), {("reader@example.com", 0, 1), ("author@example.com", 1, 0)}
+        )
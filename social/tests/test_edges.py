@@ -0,0 +1,138 @@
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from social import counters, edges
+from social.models import Follow, Like, Post, Profile
+from social.tests.utils import create_user
+
+
+class EdgeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        cls.author = create_user("author")
+        cls.posts = [
+            Post.objects.create(user=cls.author, title=f"Post {i}", description="")
+            for i in range(3)
+        ]
+
+    def test_insert_returns_new_edges(self):
+        first, second, third = [post.pk for post in self.posts]
+
+        self.assertEqual(edges.like_many(self.user, [first, second]), {first, second})
+        self.assertEqual(edges.like_many(self.user, [second, third]), {third})
+        self.assertEqual(Like.objects.filter(user=self.user).count(), 3)
+
+    def test_delete_returns_deleted_edges(self):
+        first, second, third = [post.pk for post in self.posts]
+        edges.like_many(self.user, [first, second])
+
+        self.assertEqual(edges.unlike_many(self.user, [second, third]), {second})
+        self.assertEqual(edges.unlike_many(self.user, [second]), set())
+        self.assertFalse(edges.unlike(self.user, self.posts[1]))
+        self.assertTrue(edges.unlike(self.user, self.posts[0]))
+
+    def test_follow(self):
+        profile = self.author.profile
+        self.assertTrue(edges.follow(self.user, profile))
+        self.assertFalse(edges.follow(self.user, profile))
+        self.assertEqual(edges.unfollow_many(self.user, [profile.pk]), {profile.pk})
+
+
+class BulkToggleCounterTests(TestCase):
+    """Bulk toggles move the counters by the edges actually written"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        cls.author = create_user("author")
+        cls.post = Post.objects.create(user=cls.author, title="Post", description="")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def bulk_like(self, like):
+        response = self.client.post(
+            "/api/social/posts/bulk-toggle-like/",
+            {"items": [{"id": self.post.pk, "like": like}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def bulk_follow(self, follow):
+        response = self.client.post(
+            "/api/social/profiles/bulk-toggle-follow/",
+            {"items": [{"id": self.author.profile.pk, "follow": follow}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def assertLikesCount(self, expected):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, expected)
+        self.assertEqual(Like.objects.filter(post=self.post).count(), expected)
+
+    def stale_read(self, model, column, write):
+        """
+        Let the view read the user's edges, then run ``write`` as a
+        concurrent request would, before the view writes its own edges
+        """
+        filter_edges = model.objects.filter
+
+        def read_then_write(*args, **kwargs):
+            ids = list(filter_edges(*args, **kwargs).values_list(column, flat=True))
+            write()
+            return mock.Mock(values_list=mock.Mock(return_value=ids))
+
+        return mock.patch.object(model.objects, "filter", side_effect=read_then_write)
+
+    def concurrent_like(self):
+        if edges.like(self.user, self.post):
+            counters.adjust(Post, self.post.pk, likes_count=1)
+
+    def concurrent_unlike(self):
+        if edges.unlike(self.user, self.post):
+            counters.adjust(Post, self.post.pk, likes_count=-1)
+
+    def test_like_added_concurrently(self):
+        with self.stale_read(Like, "post_id", self.concurrent_like):
+            self.bulk_like("L")
+
+        self.assertLikesCount(1)
+
+    def test_like_removed_concurrently(self):
+        self.concurrent_like()
+
+        with self.stale_read(Like, "post_id", self.concurrent_unlike):
+            self.bulk_like("U")
+
+        self.assertLikesCount(0)
+
+    def test_follow_added_concurrently(self):
+        def concurrent_follow():
+            if edges.follow(self.user, self.author.profile):
+                counters.adjust(Profile, self.author.profile.pk, followers_count=1)
+                counters.adjust(Profile, self.user.profile.pk, following_count=1)
+
+        with self.stale_read(Follow, "profile_id", concurrent_follow):
+            self.bulk_follow("F")
+
+        self.assertEqual(Profile.objects.get(user=self.author).followers_count, 1)
+        self.assertEqual(Profile.objects.get(user=self.user).following_count, 1)
+
+    def test_repeated_toggles(self):
+        self.bulk_like("L")
+        self.bulk_like("D")
+        self.assertLikesCount(1)
+        self.bulk_like("U")
+        self.bulk_like("U")
+        self.assertLikesCount(0)
+
+        self.bulk_follow("F")
+        self.bulk_follow("F")
+        self.assertEqual(Profile.objects.get(user=self.author).followers_count, 1)
+        self.bulk_follow("U")
+        self.assertEqual(Profile.objects.get(user=self.author).followers_count, 0)
@@ -0,0 +1,67 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from social.models import FeedEntry, Post, Profile
+from social.tests.utils import create_user
+
+
+@override_settings(FEED_FANOUT_THRESHOLD=2, FEED_FANOUT_ASYNC=False)
+class FeedThresholdTests(TestCase):
+    """Posts of authors over the fan-out threshold stay in the timelines"""
+
+    def setUp(self):
+        self.author = create_user("author")
+        self.reader = create_user("reader")
+        self.other = create_user("other")
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def toggle_follow(self, user, follow):
+        response = self.client_for(user).post(
+            f"/api/social/profiles/{self.author.profile.pk}/toggle-follow/",
+            {"follow": follow},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def timeline(self, user):
+        response = self.client_for(user).get("/api/social/ifollow/")
+        return [post["title"] for post in response.json()["results"]]
+
+    def test_fanned_out_under_threshold(self):
+        self.toggle_follow(self.reader, "F")
+        Post.objects.create(user=self.author, title="Small", description="Post")
+
+        self.assertTrue(FeedEntry.objects.filter(owner=self.reader).exists())
+        self.assertEqual(self.timeline(self.reader), ["Small"])
+
+    def test_pulled_posts_kept_when_crossing_under_threshold(self):
+        self.toggle_follow(self.reader, "F")
+        self.toggle_follow(self.other, "F")
+        Post.objects.create(user=self.author, title="Pulled", description="Post")
+
+        self.assertFalse(FeedEntry.objects.filter(owner=self.reader).exists())
+        self.assertEqual(self.timeline(self.reader), ["Pulled"])
+
+        self.toggle_follow(self.other, "U")
+
+        self.assertEqual(Profile.objects.get(user=self.author).followers_count, 1)
+        self.assertEqual(self.timeline(self.reader), ["Pulled"])
+        self.assertEqual(self.timeline(self.other), [])
+
+    def test_bulk_unfollow_crossing_under_threshold(self):
+        self.toggle_follow(self.reader, "F")
+        self.toggle_follow(self.other, "F")
+        Post.objects.create(user=self.author, title="Pulled", description="Post")
+
+        response = self.client_for(self.other).post(
+            "/api/social/profiles/bulk-toggle-follow/",
+            {"items": [{"id": self.author.profile.pk, "follow": "U"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.timeline(self.reader), ["Pulled"])
@@ -0,0 +1,143 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from social import images
+from social.models import Post, Profile
+
+GPS_IFD = 0x8825
+
+
+def jpeg_with_gps(name="photo.jpg"):
+    exif = Image.Exif()
+    exif[0x010F] = "Camera"
+    exif[GPS_IFD] = {1: "N", 2: (48.0, 51.0, 24.0)}
+    buffer = BytesIO()
+    Image.new("RGB", (40, 20), "red").save(buffer, format="JPEG", exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+class ImageMetadataTests(TestCase):
+    """Originals are stored without their EXIF data"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="writer@example.com", password="password"
+        )
+        Profile.objects.create(user=cls.user, first_name="Writer", last_name="Writer")
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertNoExif(self, field):
+        with field.open("rb"), Image.open(field) as image:
+            self.assertEqual(dict(image.getexif()), {})
+
+    def test_post_upload(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                "/api/social/posts/",
+                {"title": "Photo", "description": "Body", "image": jpeg_with_gps()},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 201)
+
+        post = Post.objects.get(title="Photo")
+        self.assertNoExif(post.image)
+        # Resized by a task once the post is committed
+        self.assertEqual(post.image_variants, {})
+        for callback in callbacks:
+            callback()
+
+        post.refresh_from_db()
+        for variant in ["thumb", "large"]:
+            self.assertIn(f"-{variant}.", post.image_variants[variant]["webp"])
+
+    def test_profile_upload(self):
+        profile = self.user.profile
+        profile.image = jpeg_with_gps()
+        profile.save()
+
+        profile.refresh_from_db()
+        self.assertNoExif(profile.image)
+
+    def test_command_strips_stored_originals(self):
+        post = Post.objects.create(user=self.user, title="Old", description="")
+        # Stored before uploads were stripped
+        name = post.image.storage.save("uploads/post/old.jpg", jpeg_with_gps())
+        Post.objects.filter(pk=post.pk).update(image=name)
+
+        call_command("process_images", "--strip-metadata", stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, name)
+        self.assertFalse(post.image.storage.exists(name))
+        self.assertNoExif(post.image)
+        self.assertEqual(post.image_variants["source"], post.image.name)
+
+
+@override_settings(IMAGE_PROCESSING_ASYNC=False)
+class ImageVariantTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="writer@example.com", password="password"
+        )
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def upload(self, image, image_format="PNG"):
+        buffer = BytesIO()
+        image.save(buffer, format=image_format)
+        return Post.objects.create(
+            user=self.user,
+            title="Picture",
+            description=f"{image.mode} picture",
+            image=SimpleUploadedFile("picture.png", buffer.getvalue()),
+        )
+
+    def variant(self, post, extension):
+        with post.image.storage.open(post.image_variants["large"][extension]) as file:
+            with Image.open(file) as image:
+                image.load()
+                return image
+
+    def test_transparency(self):
+        # Transparent on the left, red on the right
+        image = Image.new("RGBA", (40, 20), (0, 0, 0, 0))
+        image.paste((255, 0, 0, 255), (20, 0, 40, 20))
+        for source in [image, image.convert("P")]:
+            post = self.upload(source)
+
+            webp = self.variant(post, "webp").convert("RGBA")
+            self.assertEqual(webp.getpixel((5, 10))[3], 0)
+            self.assertEqual(webp.getpixel((35, 10))[3], 255)
+            jpeg = self.variant(post, "jpeg")
+            self.assertEqual(jpeg.mode, "RGB")
+            self.assertTrue(all(value > 245 for value in jpeg.getpixel((5, 10))))
+
+    def test_opaque(self):
+        post = self.upload(Image.new("RGB", (40, 20), "red"))
+
+        self.assertEqual(self.variant(post, "webp").mode, "RGB")
+        self.assertFalse(images.needs_processing(post))
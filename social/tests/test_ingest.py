@@ -0,0 +1,81 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from social import ingest
+from social.models import Post, PostIngestJob
+
+
+@override_settings(POST_INGEST_MAX_ATTEMPTS=2)
+class ProcessJobsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="writer@example.com", password="password"
+        )
+
+    def create_job(self, title):
+        return ingest.create_job(
+            self.user, {"title": title, "description": "Body", "hashtags": ["cats"]}
+        )
+
+    def test_creates_posts(self):
+        job = self.create_job("Post")
+
+        self.assertEqual(ingest.process_jobs([job.pk]), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, PostIngestJob.DONE)
+        self.assertEqual(job.post.title, "Post")
+        self.assertEqual(list(job.post.hashtags.names()), ["cats"])
+        # Done jobs are not processed again
+        self.assertEqual(ingest.process_jobs([job.pk]), 0)
+
+    def test_error_does_not_stop_the_batch(self):
+        broken, job = self.create_job("Broken"), self.create_job("Post")
+        create_post = ingest._create_post
+
+        def fail_broken(job):
+            post = create_post(job)
+            if job.payload["title"] == "Broken":
+                raise RuntimeError("Storage unavailable")
+            return post
+
+        with mock.patch.object(
+            ingest, "_create_post", side_effect=fail_broken
+        ), self.assertLogs("social.ingest", "ERROR"):
+            self.assertEqual(ingest.process_jobs([broken.pk, job.pk]), 2)
+
+        broken.refresh_from_db()
+        self.assertEqual(broken.status, PostIngestJob.PENDING)
+        self.assertEqual(broken.attempts, 1)
+        self.assertIn("Storage unavailable", broken.error)
+        self.assertIsNone(broken.post)
+        self.assertFalse(Post.objects.filter(title="Broken").exists())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, PostIngestJob.DONE)
+
+    def test_failed_after_max_attempts(self):
+        job = self.create_job("Broken")
+
+        with mock.patch.object(
+            ingest, "_create_post", side_effect=RuntimeError
+        ), self.assertLogs("social.ingest", "ERROR"):
+            ingest.process_jobs([job.pk])
+            ingest.process_jobs([job.pk])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, PostIngestJob.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_stale_jobs_wait_between_attempts(self):
+        job = self.create_job("Post")
+        self.assertEqual(ingest.stale_job_ids(), [])
+
+        PostIngestJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(ingest.stale_job_ids(), [job.pk])
@@ -0,0 +1,120 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient, APIRequestFactory
+
+from social.listing import CommentRows, PostRows, ProfileRows
+from social.models import Comment, Post, Profile
+from social.serializers import (
+    CommentListSerializer,
+    PostListSerializer,
+    ProfileListSerializer,
+)
+from social.views import CommentViewSet, PostViewSet, ProfileViewSet
+
+PROCESSED_IMAGE = {
+    "source": "uploads/posts/cat.jpg",
+    "thumb": {"webp": "uploads/posts/cat-thumb.webp"},
+    "large": {"webp": "uploads/posts/cat-large.webp"},
+}
+
+
+class CompactListTests(TestCase):
+    """The compact list rows render the same data as the list serializers"""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = []
+        for i in range(3):
+            user = get_user_model().objects.create_user(
+                email=f"user{i}@example.com",
+                password="password",
+                first_name=f"First{i}",
+                last_name=f"Last{i}",
+            )
+            Profile.objects.create(
+                user=user, first_name=f"First{i}", last_name=f"Last{i}"
+            )
+            users.append(user)
+        cls.user = users[0]
+
+        posts = []
+        for i, user in enumerate(users * 2):
+            post = Post.objects.create(
+                title=f"Post {i}", description=f"About post {i}", user=user
+            )
+            posts.append(post)
+        posts[0].hashtags.add("cats", "dogs")
+        posts[1].hashtags.add("cats")
+
+        # Set without saving, so no image processing is attempted
+        Post.objects.filter(pk=posts[0].pk).update(
+            image="uploads/posts/cat.jpg", image_variants=PROCESSED_IMAGE
+        )
+        Post.objects.filter(pk=posts[1].pk).update(image="uploads/posts/new.jpg")
+        Profile.objects.filter(user=users[1]).update(
+            image="uploads/profile/me.jpg", followers_count=2, following_count=1
+        )
+        Post.objects.filter(pk=posts[2].pk).update(likes_count=3, comments_count=2)
+
+        comment = Comment.objects.create(post=posts[2], user=users[1], text="Hi")
+        Comment.objects.create(
+            post=posts[2], user=users[0], text="Hi!", is_reply=True, parent=comment
+        )
+        Comment.objects.create(post=posts[3], user=users[2], text="Hello")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.request = APIRequestFactory().get("/")
+
+    def assertSameData(self, rows_class, serializer_class, queryset):
+        expected = serializer_class(
+            queryset, many=True, context={"request": self.request}
+        ).data
+
+        rows = rows_class(self.request)
+        data = rows.render(rows.values(queryset))
+
+        self.assertEqual(data, expected)
+        self.assertEqual([list(row) for row in data], [list(row) for row in expected])
+
+    def test_post_rows(self):
+        self.assertSameData(PostRows, PostListSerializer, PostViewSet.queryset)
+
+    def test_profile_rows(self):
+        self.assertSameData(
+            ProfileRows, ProfileListSerializer, ProfileViewSet.queryset
+        )
+
+    def test_comment_rows(self):
+        self.assertSameData(
+            CommentRows, CommentListSerializer, CommentViewSet.queryset
+        )
+
+    def test_post_list_pages(self):
+        results = []
+        url = "/api/social/posts/?limit=4"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["count"], 6)
+            results += response.json()["results"]
+            url = response.json()["next"]
+
+        expected = PostListSerializer(
+            PostViewSet.queryset,
+            many=True,
+            context={"request": response.wsgi_request},
+        ).data
+        self.assertEqual(results, expected)
+
+    def test_filtered_lists(self):
+        response = self.client.get("/api/social/posts/?tags=dogs")
+        self.assertEqual(
+            [post["title"] for post in response.json()["results"]], ["Post 0"]
+        )
+
+        response = self.client.get("/api/social/comments/?user_id=%d" % self.user.pk)
+        self.assertEqual(
+            [comment["text"] for comment in response.json()["results"]], ["Hi!"]
+        )
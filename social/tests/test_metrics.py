@@ -0,0 +1,37 @@
+from unittest import mock
+
+from django.core.checks import run_checks
+from django.test import SimpleTestCase, override_settings
+
+from social_media_api_service import metrics
+
+
+# Without reaching for the broker
+@mock.patch.object(metrics.CeleryQueueCollector, "collect", return_value=iter(()))
+class MetricsViewTests(SimpleTestCase):
+    @override_settings(DEBUG=True, METRICS_TOKEN=None)
+    def test_open_in_development(self, collect):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"http_request_duration_seconds", response.content)
+
+    @override_settings(DEBUG=False, METRICS_TOKEN=None)
+    def test_refused_without_token_in_production(self, collect):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+    @override_settings(DEBUG=False, METRICS_TOKEN="secret")
+    def test_token(self, collect):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        response = self.client.get(
+            "/metrics", headers={"authorization": "Bearer wrong"}
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(
+            "/metrics", headers={"authorization": "Bearer secret"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_deploy_check_warns_without_token(self, collect):
+        ids = [message.id for message in run_checks(include_deployment_checks=True)]
+        self.assertIn("social_media_api_service.W004", ids)
@@ -0,0 +1,172 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from taggit.models import Tag
+
+from social import tags
+from social.models import Comment, Like, Post
+from social.tests.utils import create_user
+
+
+class UniquePostTests(TestCase):
+    """unique_post_title_description_md5 is reported as a validation error"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("writer")
+        cls.post = Post.objects.create(user=cls.user, title="Post", description="Body")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, title, description):
+        return self.client.post(
+            "/api/social/posts/", {"title": title, "description": description}
+        )
+
+    def test_duplicate_rejected(self):
+        response = self.create("Post", "Body")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["non_field_errors"][0].code, "unique")
+
+        self.assertEqual(self.create("Post", "Other body").status_code, 201)
+
+    def test_update_against_other_posts(self):
+        other = Post.objects.create(user=self.user, title="Other", description="Body")
+        url = f"/api/social/posts/{other.pk}/"
+
+        response = self.client.put(url, {"title": "Post", "description": "Body"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.put(url, {"title": "Other", "description": "Body"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_actions_skip_duplicate_check(self):
+        self.client.force_authenticate(create_user("reader"))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                f"/api/social/posts/{self.post.pk}/toggle-like/", {"like": "L"}
+            )
+        self.assertEqual(response.status_code, 200)
+        duplicate_checks = [
+            query for query in queries if '"social_post"."title" =' in query["sql"]
+        ]
+        self.assertEqual(duplicate_checks, [])
+
+
+class PostTagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = Post.objects.create(
+            user=create_user("writer"), title="Post", description="Body"
+        )
+
+    def test_set_post_tags(self):
+        tags.set_post_tags(self.post, ["Cats", "dogs"])
+        self.assertEqual(sorted(self.post.hashtags.names()), ["Cats", "dogs"])
+
+        # Existing tags are matched case-insensitively, like taggit does
+        tags.set_post_tags(self.post, ["cats", "birds", ""])
+        self.assertEqual(sorted(self.post.hashtags.names()), ["Cats", "birds"])
+        self.assertEqual(Tag.objects.count(), 3)
+
+        tags.set_post_tags(self.post, [])
+        self.assertEqual(list(self.post.hashtags.names()), [])
+
+
+class PostDetailPagesTests(TestCase):
+    """The detail embeds the first pages, the routes serve the next ones"""
+
+    @classmethod
+    def setUpTestData(cls):
+        writer = create_user("writer")
+        cls.post = Post.objects.create(user=writer, title="Post", description="Body")
+        cls.comments = [
+            Comment.objects.create(post=cls.post, user=writer, text=f"Comment {i}")
+            for i in range(12)
+        ]
+        # Replies are not listed with the top-level comments
+        Comment.objects.create(
+            post=cls.post, user=writer, text="Reply", parent=cls.comments[0]
+        )
+        cls.likers = []
+        for i in range(7):
+            user = create_user(f"liker{i}")
+            Like.objects.create(post=cls.post, user=user)
+            cls.likers.append(user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.likers[0])
+
+    def follow(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json()["results"])
+            url = response.json()["next"]
+        return pages
+
+    def test_first_pages(self):
+        response = self.client.get(f"/api/social/posts/{self.post.pk}/")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+
+        self.assertEqual(
+            [comment["text"] for comment in data["comments"]],
+            [f"Comment {i}" for i in range(5)],
+        )
+        self.assertEqual(len(data["liked_by"]), 5)
+        self.assertIn(
+            f"/api/social/posts/{self.post.pk}/comments/?cursor=",
+            data["comments_next"],
+        )
+        self.assertIn(
+            f"/api/social/posts/{self.post.pk}/likers/?cursor=", data["liked_by_next"]
+        )
+
+    def test_follow_next_links(self):
+        data = self.client.get(f"/api/social/posts/{self.post.pk}/").json()
+
+        pages = [data["comments"]] + self.follow(data["comments_next"])
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        self.assertEqual(
+            [comment["id"] for page in pages for comment in page],
+            [comment.pk for comment in self.comments],
+        )
+
+        pages = [data["liked_by"]] + self.follow(data["liked_by_next"])
+        self.assertEqual([len(page) for page in pages], [5, 2])
+        liked_by = [liker for page in pages for liker in page]
+        for liker, user in zip(liked_by, self.likers):
+            self.assertIn(f"({user.email})", liker)
+        self.assertEqual(len(liked_by), len(self.likers))
+
+    def test_single_page(self):
+        post = Post.objects.create(user=self.likers[1], title="Other", description="")
+        Comment.objects.create(post=post, user=self.likers[1], text="Only")
+
+        data = self.client.get(f"/api/social/posts/{post.pk}/").json()
+        self.assertEqual([comment["text"] for comment in data["comments"]], ["Only"])
+        self.assertIsNone(data["comments_next"])
+        self.assertEqual(data["liked_by"], [])
+        self.assertIsNone(data["liked_by_next"])
+
+    def test_routes(self):
+        pages = self.follow(f"/api/social/posts/{self.post.pk}/comments/")
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+
+        pages = self.follow(
+            f"/api/social/posts/{self.post.pk}/comments/?parent={self.comments[0].pk}"
+        )
+        self.assertEqual(
+            [[reply["text"] for reply in page] for page in pages], [["Reply"]]
+        )
+
+        pages = self.follow(f"/api/social/posts/{self.post.pk}/likers/?limit=3")
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
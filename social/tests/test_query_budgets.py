@@ -0,0 +1,160 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from social import edges, ingest
+from social.models import Comment, FeedEntry, Post
+from social.tests.utils import create_user
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    """
+    Every budgeted action stays within its query_budgets on an uncached
+    request, with several rows of each kind so that N+1 queries show up.
+    QueryBudgetMiddleware raises QueryBudgetExceeded otherwise.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        cls.authors = [create_user(f"author{i}") for i in range(3)]
+        cls.posts = []
+        for i, author in enumerate(cls.authors):
+            post = Post.objects.create(
+                user=author, title=f"Post {i}", description="Body"
+            )
+            post.hashtags.set(["cats", "dogs", f"tag{i}"])
+            cls.posts.append(post)
+
+        post = cls.post = cls.posts[0]
+        edges.like_many(cls.user, [post.pk for post in cls.posts])
+        for author in cls.authors[1:]:
+            edges.like(author, post)
+            edges.follow(author, cls.user.profile)
+        cls.comment = Comment.objects.create(post=post, user=cls.user, text="First")
+        for author in cls.authors:
+            Comment.objects.create(
+                post=post, user=author, text="Reply", is_reply=True, parent=cls.comment
+            )
+        call_command("recount_counters", stdout=StringIO())
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertWithinBudget(self, method, url, data=None):
+        with self.subTest(method=method, url=url):
+            response = getattr(self.client, method)(url, data, format="json")
+            self.assertLess(response.status_code, 400, response.data)
+
+    def test_post_reads(self):
+        post = self.post
+        self.assertWithinBudget("get", "/api/social/posts/")
+        self.assertWithinBudget("get", f"/api/social/posts/{post.pk}/")
+        self.assertWithinBudget("get", f"/api/social/posts/{post.pk}/comments/")
+        self.assertWithinBudget("get", f"/api/social/posts/{post.pk}/likers/")
+        self.assertWithinBudget("get", "/api/social/posts/trending-tags/")
+        self.assertWithinBudget("get", "/api/social/ilike/")
+        self.assertWithinBudget("get", "/api/social/ifollow/")
+
+    def test_post_create(self):
+        data = {"title": "New", "description": "Body", "hashtags": ["cats,new,more,x"]}
+        self.assertWithinBudget("post", "/api/social/posts/", data)
+
+    @override_settings(POST_INGEST_ASYNC=True)
+    def test_post_job(self):
+        job = ingest.create_job(self.user, {"title": "Later", "description": "Body"})
+        self.assertWithinBudget("get", f"/api/social/posts/jobs/{job.pk}/")
+
+    def test_post_actions(self):
+        post = self.post
+        self.assertWithinBudget(
+            "post", f"/api/social/posts/{post.pk}/toggle-like/", {"like": "U"}
+        )
+        self.assertWithinBudget(
+            "post",
+            "/api/social/posts/bulk-toggle-like/",
+            {"items": [{"id": post.pk, "like": "L"} for post in self.posts]},
+        )
+        self.assertWithinBudget(
+            "post", f"/api/social/posts/{post.pk}/add-comment/", {"text": "Nice"}
+        )
+
+    def test_profile_reads(self):
+        self.assertWithinBudget("get", "/api/social/profiles/")
+        self.assertWithinBudget(
+            "get", f"/api/social/profiles/{self.user.profile.pk}/"
+        )
+
+    def test_profile_actions(self):
+        profile = self.authors[0].profile
+        self.assertWithinBudget(
+            "post", f"/api/social/profiles/{profile.pk}/toggle-follow/", {"follow": "F"}
+        )
+        for follow in ["F", "U"]:
+            self.assertWithinBudget(
+                "post",
+                "/api/social/profiles/bulk-toggle-follow/",
+                {
+                    "items": [
+                        {"id": author.profile.pk, "follow": follow}
+                        for author in self.authors
+                    ]
+                },
+            )
+
+    def toggle_follow(self, profile, follow):
+        self.assertWithinBudget(
+            "post",
+            f"/api/social/profiles/{profile.pk}/toggle-follow/",
+            {"follow": follow},
+        )
+
+    def bulk_toggle_follow(self, profiles, follow):
+        self.assertWithinBudget(
+            "post",
+            "/api/social/profiles/bulk-toggle-follow/",
+            {"items": [{"id": profile.pk, "follow": follow} for profile in profiles]},
+        )
+
+    def test_profile_unfollow(self):
+        profile = self.authors[0].profile
+        self.toggle_follow(profile, "F")
+        self.toggle_follow(profile, "U")
+
+    @override_settings(FEED_FANOUT_THRESHOLD=2)
+    def test_unfollow_under_fanout_threshold(self):
+        # Both authors get a second follower and are pulled on read, the
+        # unfollows backfill the timelines of their remaining follower
+        profiles = [author.profile for author in self.authors[:2]]
+        edges.follow_many(self.authors[2], [profile.pk for profile in profiles])
+        call_command("recount_counters", stdout=StringIO())
+
+        self.toggle_follow(profiles[0], "F")
+        self.toggle_follow(profiles[0], "U")
+        self.bulk_toggle_follow(profiles, "F")
+        self.bulk_toggle_follow(profiles, "U")
+
+        self.assertEqual(
+            set(
+                FeedEntry.objects.filter(owner=self.authors[2]).values_list(
+                    "post_id", flat=True
+                )
+            ),
+            {self.posts[0].pk, self.posts[1].pk},
+        )
+
+    def test_comments(self):
+        comment = self.comment
+        self.assertWithinBudget("get", "/api/social/comments/")
+        self.assertWithinBudget("get", f"/api/social/comments/{comment.pk}/")
+        self.assertWithinBudget(
+            "post",
+            f"/api/social/comments/{comment.pk}/reply/",
+            {"reply": "Thanks", "text": "Thanks"},
+        )
@@ -0,0 +1,32 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from social import search
+from social.models import Comment, Post
+
+
+@skipUnless(connection.vendor == "postgresql", "Full-text search needs PostgreSQL")
+class FullTextSearchTests(TestCase):
+    """Queries are parsed with the configuration of the search_vector triggers"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user(
+            email="writer@example.com", password="password"
+        )
+        cls.post = Post.objects.create(
+            user=user, title="Morning runs", description="Jogging in parks"
+        )
+        Post.objects.create(user=user, title="Cooking", description="Soup")
+        Comment.objects.create(post=cls.post, user=user, text="Great parks")
+
+    def test_stemmed_post_match(self):
+        posts = search.search_posts(Post.objects.all(), "running park")
+        self.assertEqual(list(posts), [self.post])
+
+    def test_stemmed_comment_match(self):
+        comments = search.search_comments(Comment.objects.all(), "park")
+        self.assertEqual([comment.post for comment in comments], [self.post])
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta, timezone
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from social import tags
+from social.models import Post, PostTag, TagTrendBucket
+from social.tests.utils import create_user
+
+NOW = datetime(2026, 1, 10, 12, 30, tzinfo=timezone.utc)
+
+
+@override_settings(TRENDING_TAGS_WINDOW=24, TRENDING_TAGS_LAG=60)
+class TrendingTagsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user("user")
+        self.posts = 0
+
+    def tag_post(self, names, created_at):
+        self.posts += 1
+        post = Post.objects.create(
+            title=f"Post {self.posts}", description="Body", user=self.user
+        )
+        tags.set_post_tags(post, names)
+        PostTag.objects.filter(content_object=post).update(created_at=created_at)
+        return post
+
+    def buckets(self):
+        return {
+            (bucket.tag.name, bucket.hour.hour): bucket.count
+            for bucket in TagTrendBucket.objects.select_related("tag")
+        }
+
+    def test_counts_per_hour(self):
+        self.tag_post(["cats", "dogs"], NOW - timedelta(hours=2))
+        self.tag_post(["cats"], NOW - timedelta(hours=2, minutes=10))
+        self.tag_post(["cats"], NOW - timedelta(hours=1))
+        # Before the window
+        self.tag_post(["cats"], NOW - timedelta(hours=30))
+
+        self.assertEqual(tags.update_trending(now=NOW), 4)
+        self.assertEqual(
+            self.buckets(), {("cats", 10): 2, ("dogs", 10): 1, ("cats", 11): 1}
+        )
+        self.assertEqual(
+            tags.trending(10, now=NOW),
+            [{"name": "cats", "posts": 3}, {"name": "dogs", "posts": 1}],
+        )
+        self.assertEqual(tags.trending(1, now=NOW), [{"name": "cats", "posts": 3}])
+
+    def test_watermark(self):
+        self.tag_post(["cats"], NOW - timedelta(hours=1))
+        tags.update_trending(now=NOW)
+
+        # Only the tags added since the last run are counted
+        self.tag_post(["cats"], NOW + timedelta(minutes=5))
+        self.assertEqual(tags.update_trending(now=NOW + timedelta(minutes=10)), 1)
+        self.assertEqual(tags.update_trending(now=NOW + timedelta(minutes=20)), 0)
+        self.assertEqual(self.buckets(), {("cats", 11): 1, ("cats", 12): 1})
+
+        # A flushed cache rebuilds the window
+        cache.clear()
+        self.assertEqual(tags.update_trending(now=NOW + timedelta(minutes=30)), 2)
+        self.assertEqual(self.buckets(), {("cats", 11): 1, ("cats", 12): 1})
+
+    def test_window_eviction(self):
+        self.tag_post(["cats"], NOW - timedelta(hours=20))
+        self.tag_post(["dogs"], NOW - timedelta(hours=1))
+        tags.update_trending(now=NOW)
+
+        later = NOW + timedelta(hours=6)
+        tags.update_trending(now=later)
+        self.assertEqual(self.buckets(), {("dogs", 11): 1})
+        self.assertEqual(tags.trending(10, now=later), [{"name": "dogs", "posts": 1}])
+
+    def test_lag(self):
+        self.tag_post(["cats"], NOW - timedelta(seconds=30))
+
+        # Still in the lag, maybe in an open transaction
+        self.assertEqual(tags.update_trending(now=NOW), 0)
+        self.assertEqual(self.buckets(), {})
+
+        self.assertEqual(tags.update_trending(now=NOW + timedelta(seconds=31)), 1)
+        self.assertEqual(self.buckets(), {("cats", 12): 1})
+
+    def test_locked(self):
+        self.tag_post(["cats"], NOW - timedelta(hours=1))
+        cache.add(tags.LOCK_KEY, True)
+
+        self.assertIsNone(tags.update_trending(now=NOW))
+        self.assertEqual(self.buckets(), {})
+
+    def test_removed_tags(self):
+        post = self.tag_post(["cats", "dogs"], NOW - timedelta(hours=1))
+        other = self.tag_post(["cats"], NOW - timedelta(hours=1))
+        tags.update_trending(now=NOW)
+
+        tags.set_post_tags(post, ["cats"])
+        self.assertEqual(self.buckets(), {("cats", 11): 2, ("dogs", 11): 0})
+        self.assertEqual(tags.trending(10, now=NOW), [{"name": "cats", "posts": 2}])
+
+        other.delete()
+        self.assertEqual(self.buckets(), {("cats", 11): 1, ("dogs", 11): 0})
+
+        # Tags not counted yet are not subtracted
+        post = self.tag_post(["birds"], NOW + timedelta(minutes=5))
+        post.delete()
+        tags.update_trending(now=NOW + timedelta(minutes=10))
+        self.assertEqual(self.buckets(), {("cats", 11): 1, ("dogs", 11): 0})
+
+
+class TagFilterTests(TestCase):
+    def setUp(self):
+        user = create_user("user")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+        for title, names in [
+            ("Cats", ["cats"]),
+            ("Dogs", ["dogs"]),
+            ("Both", ["cats", "dogs"]),
+            ("None", []),
+        ]:
+            post = Post.objects.create(title=title, description="Body", user=user)
+            tags.set_post_tags(post, names)
+
+    def titles(self, query):
+        response = self.client.get(f"/api/social/posts/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return sorted(post["title"] for post in response.json()["results"])
+
+    def test_any(self):
+        self.assertEqual(self.titles("tags=cats"), ["Both", "Cats"])
+        self.assertEqual(self.titles("tags=cats,dogs"), ["Both", "Cats", "Dogs"])
+        self.assertEqual(
+            self.titles("tags=cats,dogs&tags_mode=any"), ["Both", "Cats", "Dogs"]
+        )
+        self.assertEqual(self.titles("tags=birds"), [])
+
+    def test_all(self):
+        self.assertEqual(self.titles("tags=cats,dogs&tags_mode=all"), ["Both"])
+        self.assertEqual(self.titles("tags=cats&tags_mode=all"), ["Both", "Cats"])
+        self.assertEqual(self.titles("tags=cats,birds&tags_mode=all"), [])
+
+    def test_invalid_mode(self):
+        response = self.client.get("/api/social/posts/?tags=cats&tags_mode=some")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("tags_mode", response.json())
@@ -0,0 +1,121 @@
+from unittest import skipUnless
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from social.models import Post
+from social.tests.utils import TEST_REDIS_URL, create_user, redis_available
+from social_media_api_service import throttling
+
+
+def rates(**rates):
+    return {
+        "REST_FRAMEWORK": {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": rates}
+    }
+
+
+class ThrottlingTestsMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        cls.post = Post.objects.create(
+            user=create_user("writer"), title="Post", description="Body"
+        )
+
+    def setUp(self):
+        cache.clear()
+        throttling._script.cache_clear()
+        self.addCleanup(throttling._script.cache_clear)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def like(self):
+        return self.client.post(
+            f"/api/social/posts/{self.post.pk}/toggle-like/", {"like": "L"}
+        )
+
+    def assertRateLimit(self, response, limit, remaining):
+        self.assertEqual(response["X-RateLimit-Limit"], str(limit))
+        self.assertEqual(response["X-RateLimit-Remaining"], str(remaining))
+        self.assertTrue(0 < int(response["X-RateLimit-Reset"]) <= 60)
+
+    @override_settings(**rates(read="2/min"))
+    def test_rejects_over_limit_with_headers(self):
+        for remaining in [1, 0]:
+            response = self.client.get("/api/social/profiles/")
+            self.assertEqual(response.status_code, 200)
+            self.assertRateLimit(response, 2, remaining)
+
+        response = self.client.get("/api/social/profiles/")
+        self.assertEqual(response.status_code, 429)
+        self.assertRateLimit(response, 2, 0)
+        self.assertTrue(0 < int(response["Retry-After"]) <= 60)
+
+    @override_settings(**rates(read="2/min", like="1/min"))
+    def test_scopes_are_counted_apart(self):
+        self.assertEqual(self.like().status_code, 200)
+        self.assertEqual(self.like().status_code, 429)
+
+        response = self.client.get("/api/social/profiles/")
+        self.assertEqual(response.status_code, 200)
+        self.assertRateLimit(response, 2, 1)
+
+    @override_settings(**rates(write="5/min", follow="1/min"))
+    def test_follows(self):
+        profile = self.post.user.profile
+        response = self.client.post(f"/api/social/profiles/{profile.pk}/toggle-follow/")
+        self.assertEqual(response.status_code, 200)
+        self.assertRateLimit(response, 1, 0)
+
+        for url in [
+            f"/api/social/profiles/{profile.pk}/toggle-follow/",
+            "/api/social/profiles/bulk-toggle-follow/",
+            f"/api/social/ifollow/{self.post.pk}/toggle-follow/",
+        ]:
+            self.assertEqual(self.client.post(url).status_code, 429)
+
+        data = {"title": "New", "description": "Body"}
+        response = self.client.post("/api/social/posts/", data)
+        self.assertEqual(response.status_code, 201)
+        self.assertRateLimit(response, 5, 4)
+
+    @override_settings(**rates(register="1/min"))
+    def test_anonymous_clients_by_address(self):
+        client = APIClient()
+        self.assertEqual(client.post("/api/users/register/").status_code, 400)
+        self.assertEqual(client.post("/api/users/register/").status_code, 429)
+
+        other = APIClient(REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(other.post("/api/users/register/").status_code, 400)
+
+    def test_sliding_window(self):
+        for _ in range(10):
+            self.assertTrue(throttling.hit("test", "client", 10, 60, now=30)[0])
+        self.assertFalse(throttling.hit("test", "client", 10, 60, now=59)[0])
+
+        # Halfway through the next window, half of the previous one counts
+        allowed = [
+            throttling.hit("test", "client", 10, 60, now=90)[0] for _ in range(6)
+        ]
+        self.assertEqual(allowed, [True] * 5 + [False])
+
+
+@override_settings(THROTTLE_REDIS_URL="")
+class CacheThrottlingTests(ThrottlingTestsMixin, TestCase):
+    pass
+
+
+@skipUnless(redis_available(), f"Needs Redis at {TEST_REDIS_URL}")
+@override_settings(THROTTLE_REDIS_URL=TEST_REDIS_URL)
+class RedisThrottlingTests(ThrottlingTestsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(self.delete_counters, redis.Redis.from_url(TEST_REDIS_URL))
+
+    @staticmethod
+    def delete_counters(client):
+        for key in client.scan_iter("throttle:*"):
+            client.delete(key)
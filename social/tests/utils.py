@@ -0,0 +1,26 @@
+"""Helpers shared by the social and users tests"""
+import os
+
+import redis
+from django.contrib.auth import get_user_model
+
+from social.models import Profile
+
+# Redis used by the tests of the Redis backed features, skipped without it
+TEST_REDIS_URL = os.environ.get("TEST_REDIS_URL", "redis://localhost:6379/15")
+
+
+def redis_available():
+    try:
+        return redis.Redis.from_url(TEST_REDIS_URL).ping()
+    except redis.RedisError:
+        return False
+
+
+def create_user(name):
+    """A user ``<name>@example.com`` with its profile"""
+    user = get_user_model().objects.create_user(
+        email=f"{name}@example.com", password="password"
+    )
+    Profile.objects.create(user=user, first_name=name, last_name=name)
+    return user
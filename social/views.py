@@ -1,15 +1,27 @@
-from django.db import IntegrityError
-from django.db.models import Q
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-
-from .mixins import ToggleFollowMixin, ToggleLikeMixin
-from .models import Post, Profile, Comment
+from rest_framework.reverse import reverse
+
+from . import counters, feed, ingest, listing, search, tags
+from .mixins import (
+    AsyncActionsMixin,
+    CachedResponseMixin,
+    CompactListMixin,
+    ToggleFollowMixin,
+    ToggleLikeMixin,
+)
+from .models import Post, PostIngestJob, Profile, Comment
+from .pagination import KeysetPagination
 from .permissions import (
     IsLoggedIn,
     IsAdminOrIfAuthenticatedReadOnly,
@@ -20,30 +32,61 @@ from .serializers import (
     PostSerializer,
     PostListSerializer,
     PostDetailSerializer,
+    PostIngestJobSerializer,
+    TrendingTagSerializer,
     FollowPostActionSerializer,
     LikePostActionSerializer,
+    BulkLikeActionSerializer,
     ProfileSerializer,
     ProfileListSerializer,
     ProfileDetailSerializer,
     FollowActionSerializer,
+    BulkFollowActionSerializer,
     CommentSerializer,
     CommentCreateSerializer,
     CommentListSerializer,
     CommentDetailSerializer,
-    CommentReplySerializer
+    CommentReplySerializer,
+    populate_comment_data,
+    populate_liker_data,
+    post_comments,
+    post_likes,
 )
 
-from .tasks import delay_post_creation
+from .tasks import ingest_posts
 
 
-class PostViewSet(viewsets.ModelViewSet, ToggleLikeMixin):
-    queryset = Post.objects.select_related("user").prefetch_related(
-        "post_comments",
-        "hashtags",
-        "liked_by",
-    )
+class PostViewSet(
+    AsyncActionsMixin,
+    viewsets.ModelViewSet,
+    ToggleLikeMixin,
+    CachedResponseMixin,
+    CompactListMixin,
+):
+    queryset = Post.objects.select_related("user").prefetch_related("hashtags")
     serializer_class = PostSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    cache_name = "post"
+    async_actions = ("list",)
+    list_rows_class = listing.PostRows
+    query_budgets = {
+        "list": 5,
+        "retrieve": 6,
+        "create": 12,
+        "job": 3,
+        "comments": 5,
+        "likers": 5,
+        "toggle_like": 6,
+        "bulk_toggle_like": 8,
+        "add_comment": 8,
+        "trending_tags": 2,
+    }
+    throttle_scopes = {
+        "toggle_like": "like",
+        "bulk_toggle_like": "like",
+        "add_comment": "comment",
+    }
 
     @action(
         methods=["POST"],
@@ -56,6 +99,16 @@ class PostViewSet(viewsets.ModelViewSet, ToggleLikeMixin):
         post = self.get_object()
         return self.toggle_like_common(request, post)
 
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="bulk-toggle-like",
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk_toggle_like(self, request):
+        """Endpoint for liking and disliking several posts in one request"""
+        return self.bulk_toggle_like_common(request)
+
     @action(
         methods=["POST"],
         detail=True,
@@ -69,16 +122,96 @@ class PostViewSet(viewsets.ModelViewSet, ToggleLikeMixin):
         text = request.data.get("text", "")
 
         if request.method == "POST":
-            comment = Comment.objects.create(post=post, user=user, text=text)
+            # The post cache is bumped once the comment and its count commit
+            with transaction.atomic():
+                comment = Comment.objects.create(post=post, user=user, text=text)
+                counters.adjust(Post, post.pk, comments_count=1)
 
-            serializer = self.get_serializer(comment, data=request.data)
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
+                serializer = self.get_serializer(comment, data=request.data)
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
 
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         return Response({"error": "Invalid method"}, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "parent",
+                type=OpenApiTypes.INT,
+                description="List the replies to a comment (ex. ?parent=2)",
+            ),
+        ]
+    )
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="comments",
+        pagination_class=KeysetPagination,
+        permission_classes=[IsAuthenticated],
+    )
+    def comments(self, request, pk):
+        """Endpoint for paging through the comments of specific post"""
+        return self.cached_response(
+            request, partial(self._comments_page, request), pk=pk
+        )
+
+    def _comments_page(self, request):
+        post = self.get_object()
+        parent = request.query_params.get("parent")
+        if parent:
+            parent = get_object_or_404(
+                post.post_comments, pk=self._param_to_int(parent, "parent")
+            )
+
+        page = self.paginate_queryset(post_comments(post, parent))
+        return self.get_paginated_response(populate_comment_data(page))
+
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="likers",
+        pagination_class=KeysetPagination,
+        permission_classes=[IsAuthenticated],
+    )
+    def likers(self, request, pk):
+        """Endpoint for paging through the users who liked specific post"""
+        return self.cached_response(
+            request, partial(self._likers_page, request), pk=pk
+        )
+
+    def _likers_page(self, request):
+        post = self.get_object()
+        page = self.paginate_queryset(post_likes(post))
+        return self.get_paginated_response(populate_liker_data(post, page))
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "limit",
+                type=OpenApiTypes.INT,
+                description="Number of tags (ex. ?limit=20), "
+                f"{settings.TRENDING_TAGS_LIMIT} by default",
+            ),
+        ]
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="trending-tags",
+        pagination_class=None,
+        permission_classes=[IsAuthenticated],
+    )
+    def trending_tags(self, request):
+        """Endpoint for the most used tags of the last hours"""
+        limit = request.query_params.get("limit")
+        limit = self._param_to_int(limit, "limit") if limit else None
+        limit = min(max(limit or settings.TRENDING_TAGS_LIMIT, 1), 100)
+
+        serializer = self.get_serializer(tags.trending(limit), many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     def get_serializer_class(self):
         if self.action == "list":
             return PostListSerializer
@@ -92,9 +225,18 @@ class PostViewSet(viewsets.ModelViewSet, ToggleLikeMixin):
         if self.action == "toggle_like":
             return LikePostActionSerializer
 
+        if self.action == "bulk_toggle_like":
+            return BulkLikeActionSerializer
+
         if self.action == "add_comment":
             return CommentCreateSerializer
 
+        if self.action == "job":
+            return PostIngestJobSerializer
+
+        if self.action == "trending_tags":
+            return TrendingTagSerializer
+
         return PostSerializer
 
     def get_permissions(self):
@@ -107,6 +249,11 @@ class PostViewSet(viewsets.ModelViewSet, ToggleLikeMixin):
             "toggle_follow",
             "add_comment",
             "toggle_like",
+            "bulk_toggle_like",
+            "job",
+            "comments",
+            "likers",
+            "trending_tags",
         ]:
             return [IsAuthenticated()]
 
@@ -117,60 +264,74 @@ class PostViewSet(viewsets.ModelViewSet, ToggleLikeMixin):
         """Converts a list of string IDs to a list of strings"""
         return [tag.strip() for tag in qs.split(",")]
 
-    # UNCOMMENT IT TO DELAY POST CREATION
-
-    # def create(self, request, *args, **kwargs):
-    #     serializer = self.get_serializer(data=request.data)
-    #     serializer.is_valid(raise_exception=True)
-    #
-    #     try:
-    #         serializer.save(user=request.user)
-    #     except IntegrityError as e:
-    #         return Response(
-    #             {"error": "Failed to create post: " + str(e)},
-    #             status=status.HTTP_400_BAD_REQUEST,
-    #         )
-    #
-    #     task_result = delay_post_creation.apply_async(
-    #         args=[request.user.id, serializer.data], countdown=10
-    #     )
-    #
-    #     if not task_result:
-    #         return Response(
-    #             {"error": "Failed to schedule task"},
-    #             status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-    #         )
-    #
-    #     return Response(
-    #         {"message": "Post creation scheduled"}, status=status.HTTP_202_ACCEPTED
-    #     )
-
-    # COMMENT IT IF YOU USE CELERY
+    @staticmethod
+    def _param_to_int(qs, param="user_id"):
+        """Converts a string ID to an integer"""
+        try:
+            return int(qs)
+        except ValueError:
+            raise ValidationError({param: "A valid integer is required."})
+
+    def create(self, request, *args, **kwargs):
+        if not settings.POST_INGEST_ASYNC:
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        job = ingest.create_job(request.user, serializer.validated_data)
+        transaction.on_commit(lambda: ingest_posts.delay([str(job.pk)]))
+
+        location = reverse(
+            "social:posts-job", kwargs={"job_id": job.pk}, request=request
+        )
+        return Response(
+            PostIngestJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": location},
+        )
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path=r"jobs/(?P<job_id>[0-9a-f-]+)",
+        permission_classes=[IsAuthenticated],
+    )
+    def job(self, request, job_id):
+        """Endpoint for checking the status of a delayed post creation"""
+        job = get_object_or_404(PostIngestJob, pk=job_id, user=request.user)
+        serializer = self.get_serializer(job)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     def get_queryset(self):
         user = self.request.query_params.get("user")
+        user_id = self.request.query_params.get("user_id")
         text = self.request.query_params.get("text")
-        tags = self.request.query_params.get("tags")
+        tag_names = self.request.query_params.get("tags")
+        tags_mode = self.request.query_params.get("tags_mode", "any")
+        ordering = self.request.query_params.get("ordering")
         queryset = self.queryset
 
         if user:
-            queryset = queryset.filter(
-                Q(user__email__icontains=user)
-                | Q(user__first_name__icontains=user)
-                | Q(user__last_name__icontains=user)
-            )
+            queryset = queryset.filter(user__search_name__contains=user.lower())
+        if user_id:
+            queryset = queryset.filter(user_id=self._param_to_int(user_id))
         if text:
-            queryset = queryset.filter(
-                Q(title__icontains=text) | Q(description__icontains=text)
+            queryset = search.search_posts(queryset, text)
+            if ordering == "relevance":
+                queryset = search.order_by_relevance(queryset)
+
+        if tag_names:
+            if tags_mode not in ["any", "all"]:
+                raise ValidationError({"tags_mode": 'Must be "any" or "all".'})
+            queryset = tags.filter_posts(
+                queryset, self._split_params(tag_names), match_all=tags_mode == "all"
             )
 
-        if tags:
-            splitted_tags = self._split_params(tags)
-            queryset = queryset.filter(hashtags__name__in=splitted_tags)
-
-        return queryset.distinct()
+        return queryset
 
     @extend_schema(
         parameters=[
@@ -182,25 +343,78 @@ class PostViewSet(viewsets.ModelViewSet, ToggleLikeMixin):
             OpenApiParameter(
                 "user",
                 type=OpenApiTypes.STR,
-                description="Filter by user (ex. ?user=j)",
+                description="Filter by user name or email (ex. ?user=j)",
+            ),
+            OpenApiParameter(
+                "user_id",
+                type=OpenApiTypes.INT,
+                description="Filter by user id (ex. ?user_id=2)",
             ),
             OpenApiParameter(
                 "tags",
                 type=OpenApiTypes.STR,
                 description="Filter by tags (ex. ?tags=cats,dogs)",
             ),
+            OpenApiParameter(
+                "tags_mode",
+                type=OpenApiTypes.STR,
+                enum=["any", "all"],
+                description="Match posts with any of the tags (default) "
+                "or with all of them (ex. ?tags=cats,dogs&tags_mode=all)",
+            ),
+            OpenApiParameter(
+                "ordering",
+                type=OpenApiTypes.STR,
+                enum=["relevance"],
+                description="Order text search results by relevance "
+                "(ex. ?text=post&ordering=relevance)",
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        return self.cached_response(
+            request, partial(self.compact_list, request, *args, **kwargs)
+        )
+
+    async def alist(self, request, lookup, *args, **kwargs):
+        return await self.acached_response(
+            lookup, partial(self.compact_list, request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request,
+            partial(super().retrieve, request, *args, **kwargs),
+            pk=kwargs["pk"],
+        )
 
 
-class ProfileViewSet(viewsets.ModelViewSet, ToggleFollowMixin):
+class ProfileViewSet(
+    AsyncActionsMixin,
+    viewsets.ModelViewSet,
+    ToggleFollowMixin,
+    CachedResponseMixin,
+    CompactListMixin,
+):
     queryset = Profile.objects.select_related("user").prefetch_related(
-        "followers__profile", "is_following__profile"
+        "followers__profile"
     )
     serializer_class = ProfileSerializer
     permission_classes = (IsAuthenticated,)
+    cache_name = "profile"
+    async_actions = ("retrieve",)
+    list_rows_class = listing.ProfileRows
+    query_budgets = {
+        "list": 4,
+        "retrieve": 6,
+        # Unfollows under the fan-out threshold backfill the timelines
+        "toggle_follow": 12,
+        "bulk_toggle_follow": 13,
+    }
+    throttle_scopes = {
+        "toggle_follow": "follow",
+        "bulk_toggle_follow": "follow",
+    }
 
     @action(
         methods=["POST"],
@@ -213,6 +427,16 @@ class ProfileViewSet(viewsets.ModelViewSet, ToggleFollowMixin):
         profile = get_object_or_404(Profile, pk=pk)
         return self.toggle_follow_common(request, profile)
 
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="bulk-toggle-follow",
+        permission_classes=[IsAuthenticated],
+    )
+    def bulk_toggle_follow(self, request):
+        """Endpoint for following and unfollowing several users in one request"""
+        return self.bulk_toggle_follow_common(request)
+
     def get_serializer_class(self):
         if self.action == "list":
             return ProfileListSerializer
@@ -223,12 +447,15 @@ class ProfileViewSet(viewsets.ModelViewSet, ToggleFollowMixin):
         if self.action == "toggle_follow":
             return FollowActionSerializer
 
+        if self.action == "bulk_toggle_follow":
+            return BulkFollowActionSerializer
+
         return ProfileSerializer
 
     def get_permissions(self):
         if self.action == "update" or self.action == "destroy":
             return [IsLoggedIn()]
-        if self.action in ["toggle_follow", "toggle_like"]:
+        if self.action in ["toggle_follow", "toggle_like", "bulk_toggle_follow"]:
             return [IsAuthenticated()]
         return [IsAuthenticatedReadOnly()]
 
@@ -247,6 +474,9 @@ class ProfileViewSet(viewsets.ModelViewSet, ToggleFollowMixin):
         users = self.request.query_params.get("users")
         queryset = self.queryset
 
+        if self.action == "list":
+            queryset = queryset.prefetch_related(None)
+
         if users:
             users_ids = self._params_to_ints(users)
             queryset = queryset.filter(user__id__in=users_ids)
@@ -263,10 +493,27 @@ class ProfileViewSet(viewsets.ModelViewSet, ToggleFollowMixin):
         ]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        return self.cached_response(
+            request, partial(self.compact_list, request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request,
+            partial(super().retrieve, request, *args, **kwargs),
+            pk=kwargs["pk"],
+        )
+
+    async def aretrieve(self, request, lookup, *args, **kwargs):
+        return await self.acached_response(
+            lookup, partial(super().retrieve, request, *args, **kwargs)
+        )
 
 
 class ILikeViewSet(PostViewSet, ProfileViewSet, ToggleLikeMixin):
+    cache_name = None
+    throttle_scopes = {**PostViewSet.throttle_scopes, **ProfileViewSet.throttle_scopes}
+
     @action(
         methods=["POST"],
         detail=True,
@@ -279,20 +526,17 @@ class ILikeViewSet(PostViewSet, ProfileViewSet, ToggleLikeMixin):
         return self.toggle_like_common(request, post)
 
     def get_queryset(self):
-        profile = Profile.objects.get(user=self.request.user)
-        queryset = (
-            profile.i_like.all()
-        )
-        return queryset
+        return self.queryset.filter(likes__user=self.request.user)
 
 
 class IFollowViewSet(PostViewSet, ToggleFollowMixin):
+    pagination_class = KeysetPagination
+    cache_name = None
+    throttle_scopes = {**PostViewSet.throttle_scopes, "toggle_follow": "follow"}
+
     def get_queryset(self):
         queryset = PostViewSet.get_queryset(self)
-        user = self.request.user.profile
-        following_profiles = user.is_following.all()
-        queryset = queryset.filter(user__in=following_profiles)
-        return queryset
+        return feed.timeline(self.request.user, queryset)
 
     @action(
         methods=["POST"],
@@ -306,7 +550,7 @@ class IFollowViewSet(PostViewSet, ToggleFollowMixin):
         return self.toggle_follow_common(request, post)
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(viewsets.ModelViewSet, CachedResponseMixin, CompactListMixin):
     queryset = Comment.objects.select_related(
         "user__profile",
         "post__user__profile",
@@ -314,6 +558,15 @@ class CommentViewSet(viewsets.ModelViewSet):
     ).prefetch_related("user", "parent")
     serializer_class = CommentSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    cache_name = "comment"
+    list_rows_class = listing.CommentRows
+    query_budgets = {
+        "list": 4,
+        "retrieve": 4,
+        "reply": 7,
+    }
+    throttle_scopes = {"reply": "comment"}
 
     def get_permissions(self):
         if self.action == "update" or self.action == "destroy":
@@ -329,6 +582,11 @@ class CommentViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            counters.adjust(Post, instance.post_id, comments_count=-1)
+
     def get_serializer_class(self):
         if self.action == "list":
             return CommentListSerializer
@@ -341,6 +599,33 @@ class CommentViewSet(viewsets.ModelViewSet):
 
         return CommentSerializer
 
+    @staticmethod
+    def _param_to_int(qs, param="user_id"):
+        """Converts a string ID to an integer"""
+        try:
+            return int(qs)
+        except ValueError:
+            raise ValidationError({param: "A valid integer is required."})
+
+    def _depth_param(self):
+        """Number of reply levels to return with a comment, 1 by default"""
+        depth = self.request.query_params.get("depth")
+        if not depth:
+            return 1
+
+        depth = self._param_to_int(depth, "depth")
+        if depth < 1:
+            raise ValidationError(
+                {"depth": "Ensure this value is greater than or equal to 1."}
+            )
+        return depth
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == "retrieve":
+            context["depth"] = self._depth_param()
+        return context
+
     @action(
         methods=["POST"],
         detail=True,
@@ -354,13 +639,25 @@ class CommentViewSet(viewsets.ModelViewSet):
         reply = request.data.get("reply", "")
 
         if request.method == "POST":
-            comment = Comment.objects.create(
-                post=comment.post, user=user, text=reply, is_reply=True, parent=comment
-            )
-
-            serializer = self.get_serializer(comment, data=request.data)
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
+            if comment.depth >= Comment.MAX_DEPTH:
+                raise ValidationError(
+                    {"reply": f"Replies are limited to {Comment.MAX_DEPTH} levels."}
+                )
+
+            # The post cache is bumped once the reply and its count commit
+            with transaction.atomic():
+                comment = Comment.objects.create(
+                    post=comment.post,
+                    user=user,
+                    text=reply,
+                    is_reply=True,
+                    parent=comment,
+                )
+                counters.adjust(Post, comment.post_id, comments_count=1)
+
+                serializer = self.get_serializer(comment, data=request.data)
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
 
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -368,19 +665,21 @@ class CommentViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.query_params.get("user")
+        user_id = self.request.query_params.get("user_id")
         text = self.request.query_params.get("text")
+        ordering = self.request.query_params.get("ordering")
         queryset = self.queryset
 
         if user:
-            queryset = queryset.filter(
-                Q(user__email__icontains=user)
-                | Q(user__first_name__icontains=user)
-                | Q(user__last_name__icontains=user)
-            )
+            queryset = queryset.filter(user__search_name__contains=user.lower())
+        if user_id:
+            queryset = queryset.filter(user_id=self._param_to_int(user_id))
         if text:
-            queryset = queryset.filter(text__icontains=text)
+            queryset = search.search_comments(queryset, text)
+            if ordering == "relevance":
+                queryset = search.order_by_relevance(queryset)
 
-        return queryset.distinct()
+        return queryset
 
     @extend_schema(
         parameters=[
@@ -389,12 +688,42 @@ class CommentViewSet(viewsets.ModelViewSet):
                 type=OpenApiTypes.STR,
                 description="Filter by comment text (ex. ?text=comm)",
             ),
+            OpenApiParameter(
+                "ordering",
+                type=OpenApiTypes.STR,
+                enum=["relevance"],
+                description="Order text search results by relevance "
+                "(ex. ?text=comm&ordering=relevance)",
+            ),
             OpenApiParameter(
                 "user",
                 type=OpenApiTypes.STR,
-                description="Filter by user (ex. ?user=j)",
-            )
+                description="Filter by user name or email (ex. ?user=j)",
+            ),
+            OpenApiParameter(
+                "user_id",
+                type=OpenApiTypes.INT,
+                description="Filter by user id (ex. ?user_id=2)",
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        return self.cached_response(
+            request, partial(self.compact_list, request, *args, **kwargs)
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "depth",
+                type=OpenApiTypes.INT,
+                description="Levels of replies to return (ex. ?depth=3), 1 by default",
+            ),
+        ]
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request,
+            partial(super().retrieve, request, *args, **kwargs),
+            pk=kwargs["pk"],
+        )
@@ -1,6 +1,8 @@
 import os
 
 from celery import Celery
+from celery.signals import celeryd_after_setup, worker_process_shutdown
+from prometheus_client import multiprocess
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_media_api_service.settings")
@@ -16,6 +18,23 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+# Record task durations, and serve them when the worker runs apart from the API
+from social_media_api_service import metrics  # noqa: E402
+
+
+@celeryd_after_setup.connect
+def start_metrics_server(**kwargs):
+    port = os.environ.get("CELERY_METRICS_PORT")
+    if port:
+        metrics.start_worker_server(int(port))
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid, **kwargs):
+    # Drop the live gauges of a dead prefork child from the metrics directory
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
+
 
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
@@ -0,0 +1,95 @@
+"""
+Deployment self-checks, run by ``manage.py check --deploy`` and by
+gunicorn before it forks its workers.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from django.db import DatabaseError, connections
+
+
+@register(Tags.security, deploy=True)
+def check_deploy_settings(app_configs, **kwargs):
+    errors = []
+    if settings.DEBUG:
+        errors.append(
+            Error(
+                "DEBUG is on.",
+                hint="Set DEBUG=False in the environment.",
+                id="social_media_api_service.E001",
+            )
+        )
+    if not settings.ALLOWED_HOSTS:
+        errors.append(
+            Error(
+                "ALLOWED_HOSTS is empty, every request would be rejected.",
+                hint="Set ALLOWED_HOSTS to a comma-separated list of hosts.",
+                id="social_media_api_service.E002",
+            )
+        )
+    if settings.CACHES["default"]["BACKEND"].endswith("LocMemCache"):
+        errors.append(
+            Error(
+                "The cache is local to each process, workers would serve "
+                "stale responses and keep their own throttling counters.",
+                hint="Set REDIS_CACHE_URL.",
+                id="social_media_api_service.E003",
+            )
+        )
+
+    if (
+        settings.SIMPLE_JWT.get("BLACKLIST_AFTER_ROTATION")
+        and not settings.TOKEN_BLACKLIST_REDIS_URL
+    ):
+        errors.append(
+            Warning(
+                "BLACKLIST_AFTER_ROTATION without the Redis token blacklist, every "
+                "token refresh inserts two rows in the token_blacklist tables.",
+                hint="Set TOKEN_BLACKLIST_REDIS_URL or REDIS_CACHE_URL.",
+                id="social_media_api_service.W003",
+            )
+        )
+
+    if not settings.METRICS_TOKEN:
+        errors.append(
+            Warning(
+                "METRICS_TOKEN is not set, /metrics is refused without DEBUG.",
+                hint="Set METRICS_TOKEN and send it as a bearer token when scraping.",
+                id="social_media_api_service.W004",
+            )
+        )
+
+    database = settings.DATABASES["default"]
+    if not settings.ASGI and database["CONN_MAX_AGE"] == 0:
+        errors.append(
+            Warning(
+                "CONN_MAX_AGE is 0, every request opens a new database connection.",
+                id="social_media_api_service.W001",
+            )
+        )
+    if settings.ASGI and database["CONN_MAX_AGE"] != 0 and not settings.DATABASE_POOLER:
+        errors.append(
+            Warning(
+                "Persistent connections under ASGI are opened per request thread "
+                "and can exhaust the database connections.",
+                hint="Set CONN_MAX_AGE=0 or connect through pgbouncer "
+                "with DATABASE_POOLER=True.",
+                id="social_media_api_service.W002",
+            )
+        )
+    return errors
+
+
+@register(Tags.database)
+def check_database_connection(app_configs, databases=None, **kwargs):
+    errors = []
+    for alias in databases or []:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError as error:
+            errors.append(
+                Error(
+                    f"Cannot connect to the {alias!r} database: {error}",
+                    id="social_media_api_service.E004",
+                )
+            )
+    return errors
@@ -0,0 +1,173 @@
+"""
+Prometheus metrics of the API and of the Celery workers.
+
+With ``PROMETHEUS_MULTIPROC_DIR`` set (required with several gunicorn
+workers), every process writes its samples into that directory and
+``/metrics`` aggregates them, see gunicorn.conf.py for the cleanup hook.
+"""
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency per route",
+    ["route", "method", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries per request and route",
+    ["route"],
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128),
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_duration_seconds",
+    "Database time per request and route",
+    ["route"],
+)
+RESPONSE_CACHE = Counter(
+    "response_cache_requests_total",
+    "Cached list/detail lookups by result (hit or miss)",
+    ["cache", "result"],
+)
+TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Celery task run time by task and final state",
+    ["task", "state"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 1800),
+)
+
+
+def route_name(request):
+    """URL name of the matched route, e.g. posts-list or posts-toggle-like"""
+    match = getattr(request, "resolver_match", None)
+    if match is None or not match.url_name:
+        return "unmatched"
+    return match.url_name
+
+
+class MetricsMiddleware:
+    """Observe latency and database usage of every request per route"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, time.perf_counter() - start)
+        return response
+
+    def observe(self, request, response, duration):
+        route = route_name(request)
+        REQUEST_LATENCY.labels(route, request.method, response.status_code).observe(
+            duration
+        )
+
+        stats = getattr(request, "query_stats", None)
+        if stats is not None:
+            REQUEST_QUERIES.labels(route).observe(stats.count)
+            REQUEST_DB_TIME.labels(route).observe(stats.duration)
+
+
+class CeleryQueueCollector:
+    """Number of messages waiting in the Celery queues, read at scrape time"""
+
+    def __init__(self, queues):
+        self.queues = queues
+
+    def collect(self):
+        from social_media_api_service.celery import app
+
+        metric = GaugeMetricFamily(
+            "celery_queue_length", "Messages waiting in a Celery queue", labels=["queue"]
+        )
+        try:
+            with app.connection_for_read() as connection:
+                channel = connection.default_channel
+                for queue in self.queues:
+                    _, length, _ = channel.queue_declare(queue, passive=True)
+                    metric.add_metric([queue], length)
+        except Exception:  # An unreachable broker must not break the scrape
+            pass
+        yield metric
+
+
+def get_registry():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def metrics_view(request):
+    # Open without a token only in development
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponseForbidden()
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+
+    queues = CollectorRegistry()
+    queues.register(CeleryQueueCollector(settings.METRICS_CELERY_QUEUES))
+    return HttpResponse(
+        generate_latest(get_registry()) + generate_latest(queues),
+        content_type=CONTENT_TYPE_LATEST,
+    )
+
+
+_task_starts = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id, **kwargs):
+    _task_starts[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def observe_task_duration(task_id, task, state=None, **kwargs):
+    start = _task_starts.pop(task_id, None)
+    if start is not None:
+        TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(
+            time.perf_counter() - start
+        )
+
+
+def start_worker_server(port):
+    """
+    Expose the metrics of a Celery worker running apart from the API.
+    Tasks run in the prefork children: with PROMETHEUS_MULTIPROC_DIR set
+    for the worker, this serves what they all recorded, otherwise only
+    a solo or threads pool reports its tasks.
+    """
+    start_http_server(port, registry=get_registry())
@@ -0,0 +1,168 @@
+import logging
+import re
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger("social_media_api_service.queries")
+
+# Collapses "IN (%s, %s, %s)" so that queries differing only in the
+# number of parameters share a shape
+PARAMETER_LIST = re.compile(r"%s(?:\s*,\s*%s)+")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def _execute_wrappers():
+    return connection.execute_wrappers
+
+
+class QueryStats:
+    """Database execute wrapper counting queries, time and SQL shapes"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[PARAMETER_LIST.sub("%s", sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Queries repeating an already executed shape, typical of N+1"""
+        return sum(count - 1 for count in self.shapes.values())
+
+    def repeated_shapes(self, threshold):
+        return [sql for sql, count in self.shapes.items() if count >= threshold]
+
+
+class QueryBudgetMiddleware:
+    """
+    Count the queries of every request and report them in ``Server-Timing``
+    and in the ``social_media_api_service.queries`` log.
+
+    Views declare budgets per action (or per HTTP method for plain API views)
+    in ``query_budgets``. Going over a budget is logged as a warning,
+    or raises ``QueryBudgetExceeded`` with ``QUERY_BUDGET_STRICT``
+    so that tests fail.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = request.query_stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        return self.report(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = request.query_stats = QueryStats()
+        # Connections are per thread: wrap the one of the thread running
+        # the ORM calls of this request
+        wrappers = await sync_to_async(_execute_wrappers)()
+        wrappers.append(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrappers.remove(stats)
+        return self.report(request, response, stats)
+
+    def report(self, request, response, stats):
+        response["Server-Timing"] = (
+            f"db;dur={stats.duration * 1000:.1f}, "
+            f'db-queries;desc="{stats.count}", '
+            f'db-duplicates;desc="{stats.duplicates}"'
+        )
+
+        budget = getattr(request, "query_budget", None)
+        log_data = {
+            "method": request.method,
+            "path": request.path,
+            "view": getattr(request, "query_budget_view", None),
+            "status": response.status_code,
+            "queries": stats.count,
+            "db_ms": round(stats.duration * 1000, 1),
+            "duplicates": stats.duplicates,
+            "budget": budget,
+        }
+        logger.info(
+            "%(method)s %(path)s queries=%(queries)d db_ms=%(db_ms).1f "
+            "duplicates=%(duplicates)d",
+            log_data,
+            extra=log_data,
+        )
+
+        repeated = stats.repeated_shapes(settings.QUERY_DUPLICATE_THRESHOLD)
+        if repeated:
+            logger.warning(
+                "%s %s repeats %d query shape(s), N+1? %s",
+                request.method,
+                request.path,
+                len(repeated),
+                repeated[0],
+                extra=log_data,
+            )
+
+        if budget is not None and stats.count > budget:
+            message = (
+                f"{log_data['view']} ran {stats.count} queries, "
+                f"over its budget of {budget}"
+            )
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message, extra=log_data)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "cls", None)
+        budgets = getattr(view_class, "query_budgets", None)
+        if not budgets:
+            return None
+
+        method = request.method.lower()
+        actions = getattr(view_func, "actions", None) or {}
+        action = actions.get(method, method)
+
+        request.query_budget = budgets.get(action)
+        request.query_budget_view = f"{view_class.__name__}.{action}"
+        return None
+
+
+class RateLimitHeadersMiddleware(MiddlewareMixin):
+    """
+    Report the rate limit of throttled requests, see
+    social_media_api_service.throttling, in the ``X-RateLimit-Limit``,
+    ``X-RateLimit-Remaining`` and ``X-RateLimit-Reset`` (seconds) headers.
+    Rejected requests also get ``Retry-After`` from DRF.
+    """
+
+    def process_response(self, request, response):
+        rate_limit = getattr(request, "rate_limit", None)
+        if rate_limit is not None:
+            response["X-RateLimit-Limit"] = rate_limit.limit
+            response["X-RateLimit-Remaining"] = rate_limit.remaining
+            response["X-RateLimit-Reset"] = rate_limit.reset
+        return response
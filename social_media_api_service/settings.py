@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
@@ -29,9 +30,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.environ["SECRET_KEY"]
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get("DEBUG", "True") == "True"
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [
+    host for host in os.environ.get("ALLOWED_HOSTS", "").split(",") if host
+]
 
 INTERNAL_IPS = [
     "127.0.0.1",
@@ -47,10 +50,10 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework_simplejwt",
     "drf_spectacular",
-    "debug_toolbar",
     "rest_framework_simplejwt.token_blacklist",
     "taggit",
     "django_celery_beat",
@@ -59,8 +62,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "social_media_api_service.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    "social_media_api_service.middleware.RateLimitHeadersMiddleware",
+    "social_media_api_service.middleware.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -69,6 +74,17 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# The debug toolbar is for local development only
+DEBUG_TOOLBAR = DEBUG and os.environ.get("DEBUG_TOOLBAR", "False") == "True"
+
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("social_media_api_service.middleware.QueryBudgetMiddleware")
+        + 1,
+        "debug_toolbar.middleware.DebugToolbarMiddleware",
+    )
+
 ROOT_URLCONF = "social_media_api_service.urls"
 
 TEMPLATES = [
@@ -99,17 +115,59 @@ WSGI_APPLICATION = "social_media_api_service.wsgi.application"
 #         "NAME": BASE_DIR / "db.sqlite3",
 #     }
 # }
+# Connections are kept open for CONN_MAX_AGE seconds and checked before
+# reuse. Under ASGI every request runs in its own thread, so persistent
+# connections are off by default there. With DATABASE_POOLER the
+# connections go through pgbouncer in transaction pooling mode, which
+# cannot keep the server-side cursors of QuerySet.iterator() open.
+ASGI = os.environ.get("ASGI", "False") == "True"
+DATABASE_POOLER = os.environ.get("DATABASE_POOLER", "False") == "True"
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
         "HOST": os.environ["POSTGRES_HOST"],
+        "PORT": os.environ.get("POSTGRES_PORT", "5432"),
         "NAME": os.environ["POSTGRES_DB"],
         "USER": os.environ["POSTGRES_USER"],
         "PASSWORD": os.environ["POSTGRES_PASSWORD"],
+        "CONN_MAX_AGE": int(os.environ.get("CONN_MAX_AGE", 0 if ASGI else 60)),
+        "CONN_HEALTH_CHECKS": True,
+        "DISABLE_SERVER_SIDE_CURSORS": DATABASE_POOLER,
     }
 }
 
 
+# Cache
+# Redis when REDIS_CACHE_URL is set, per-process local memory otherwise
+# (tests, local development). Both evict least recently used entries.
+
+if os.environ.get("REDIS_CACHE_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_CACHE_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+# Seconds a list/detail response stays cached, 0 disables the cache
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_TIMEOUT", 60))
+# Seconds the versions of response cache names live, so that the keys
+# of objects that are no longer changed do not fill the cache
+CACHE_VERSION_TIMEOUT = 24 * 60 * 60
+
+# Seconds the user and profile of a token stay cached after a request
+# loaded them, see users.authentication. 0 reads them on every request
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get("AUTH_USER_CACHE_TIMEOUT", 60))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -134,6 +192,32 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = "users.User"
 
+# Password hashing: new passwords are hashed with PASSWORD_HASHER, "pbkdf2"
+# or "argon2", at the cost set below (Django's defaults). Passwords hashed
+# with another hasher or cost are rehashed when their user logs in.
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "pbkdf2")
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get("PASSWORD_PBKDF2_ITERATIONS", 600000))
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get("PASSWORD_ARGON2_TIME_COST", 2))
+# In KiB
+PASSWORD_ARGON2_MEMORY_COST = int(os.environ.get("PASSWORD_ARGON2_MEMORY_COST", 102400))
+PASSWORD_ARGON2_PARALLELISM = int(os.environ.get("PASSWORD_ARGON2_PARALLELISM", 8))
+
+PASSWORD_HASHER_CLASSES = {
+    "pbkdf2": "users.hashers.PBKDF2PasswordHasher",
+    "argon2": "users.hashers.Argon2PasswordHasher",
+}
+PASSWORD_HASHERS = [
+    PASSWORD_HASHER_CLASSES[PASSWORD_HASHER],
+    *(
+        hasher
+        for name, hasher in PASSWORD_HASHER_CLASSES.items()
+        if name != PASSWORD_HASHER
+    ),
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -160,15 +244,24 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
 REST_FRAMEWORK = {
-    "DEFAULT_CACHE_RESPONSE_TIMEOUT": 0,
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "social_media_api_service.throttling.SlidingWindowThrottle",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "30/day", "user": "300/day"},
+    # Per scope, see social_media_api_service.throttling. The scopes of a
+    # user add up to the former 300/day, no anonymous scope exceeds 30/day
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "30/day",
+        "read": "200/day",
+        "write": "40/day",
+        "like": "30/day",
+        "follow": "10/day",
+        "comment": "20/day",
+        "login": "10/day",
+        "register": "5/day",
+    },
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PAGINATION_CLASS":
         "rest_framework.pagination.LimitOffsetPagination",
@@ -188,12 +281,32 @@ SPECTACULAR_SETTINGS = {
     },
 }
 
+# Refresh token blacklist: looked up in a Redis sorted set, see
+# users.blacklist, in the token_blacklist tables without Redis.
+# The "prune-outstanding-tokens" beat job deletes expired tokens
+# TOKEN_BLACKLIST_BATCH_SIZE rows at a time.
+TOKEN_BLACKLIST_REDIS_URL = os.environ.get(
+    "TOKEN_BLACKLIST_REDIS_URL", os.environ.get("REDIS_CACHE_URL", "")
+)
+TOKEN_BLACKLIST_BATCH_SIZE = 1000
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60 * 24 * 7),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=14),
     "ROTATE_REFRESH_TOKENS": True,
+    # Rotated tokens are only recorded in Redis. Without it, every refresh
+    # would insert two rows, so they stay valid until they expire
+    "BLACKLIST_AFTER_ROTATION": bool(TOKEN_BLACKLIST_REDIS_URL),
+    "TOKEN_OBTAIN_SERIALIZER": "users.tokens.TokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.tokens.TokenRefreshSerializer",
+    "TOKEN_VERIFY_SERIALIZER": "users.tokens.TokenVerifySerializer",
 }
 
+# Rate limiting counters, in the Django cache without Redis
+THROTTLE_REDIS_URL = os.environ.get(
+    "THROTTLE_REDIS_URL", os.environ.get("REDIS_CACHE_URL", "")
+)
+
 TAGGIT_CASE_INSENSITIVE = True
 TAGGIT_TAGS_FROM_STRING = "taggit.utils.parse_tags"
 
@@ -203,3 +316,91 @@ CELERY_RESULT_BACKEND = os.environ["CELERY_RESULT_BACKEND"]
 CELERY_TIMEZONE = "Europe/Kiev"
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
+# Tests run the tasks in their own process, when their transaction commits
+CELERY_TASK_ALWAYS_EAGER = sys.argv[1:2] == ["test"]
+CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_BEAT_SCHEDULE = {
+    "ingest-stale-posts": {
+        "task": "social.tasks.ingest_stale_posts",
+        "schedule": 60,
+    },
+    "update-trending-tags": {
+        "task": "social.tasks.update_trending_tags",
+        "schedule": 5 * 60,
+    },
+    "prune-outstanding-tokens": {
+        "task": "users.tasks.prune_outstanding_tokens",
+        "schedule": 60 * 60,
+    },
+}
+
+# Post creation: with POST_INGEST_ASYNC the API validates new posts and
+# answers 202 with a job, a Celery worker creates the post, its tags and
+# the feed fan-out. Pending jobs not attempted for POST_INGEST_RETRY_AFTER
+# seconds are picked up again by the "ingest-stale-posts" beat job, jobs
+# failing POST_INGEST_MAX_ATTEMPTS times are marked failed.
+POST_INGEST_ASYNC = os.environ.get("POST_INGEST_ASYNC", "False") == "True"
+POST_INGEST_BATCH_SIZE = 100
+POST_INGEST_RETRY_AFTER = 5 * 60
+POST_INGEST_MAX_ATTEMPTS = 5
+
+# Follow feed: posts are fanned out to followers' timelines on write,
+# except for authors with more followers than the threshold, which are
+# merged into the timeline on read.
+FEED_FANOUT_THRESHOLD = int(os.environ.get("FEED_FANOUT_THRESHOLD", 10000))
+FEED_FANOUT_BATCH_SIZE = 1000
+FEED_BACKFILL_SIZE = 100
+FEED_FANOUT_ASYNC = os.environ.get("FEED_FANOUT_ASYNC", "False") == "True"
+
+# Trending tags: the "update-trending-tags" beat job counts new tags per
+# hour, trending sums the last TRENDING_TAGS_WINDOW hours. Tags younger
+# than TRENDING_TAGS_LAG seconds are left to the next run, see social.tags.
+TRENDING_TAGS_WINDOW = 24
+TRENDING_TAGS_LAG = 60
+TRENDING_TAGS_LIMIT = 10
+
+# Text search for posts and comments: "postgres" uses the tsvector columns
+# with ranking and a trigram fallback, "substring" uses icontains filters.
+# The substring mode is always used on databases other than PostgreSQL.
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "postgres")
+
+# Uploaded post and profile images are re-encoded without EXIF data into
+# size variants in every format of social.images, in a Celery worker unless
+# IMAGE_PROCESSING_ASYNC is False. Lists serve "thumb", details serve "large".
+IMAGE_PROCESSING_ASYNC = os.environ.get("IMAGE_PROCESSING_ASYNC", "True") == "True"
+IMAGE_VARIANTS = {
+    "thumb": {"size": (320, 320), "crop": True},
+    "large": {"size": (1280, 1280), "crop": False},
+}
+IMAGE_VARIANT_FORMAT = "webp"
+IMAGE_VARIANT_QUALITY = 85
+
+# Per-request query counting, see social_media_api_service.middleware.
+# Views over their query_budgets are logged, or fail with QUERY_BUDGET_STRICT
+# (meant for tests and development). A query shape repeated
+# QUERY_DUPLICATE_THRESHOLD times in one request is logged as a likely N+1.
+QUERY_BUDGET_STRICT = os.environ.get("QUERY_BUDGET_STRICT", "False") == "True"
+QUERY_DUPLICATE_THRESHOLD = 5
+
+# Prometheus metrics at /metrics, protected by a bearer token when
+# METRICS_TOKEN is set, only served without it when DEBUG is on.
+# Set PROMETHEUS_MULTIPROC_DIR with several workers.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+METRICS_CELERY_QUEUES = ["celery"]
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "social_media_api_service.queries": {
+            "handlers": ["console"],
+            "level": os.environ.get("QUERY_LOG_LEVEL", "WARNING"),
+        },
+    },
+}
+
+# Maximum number of items accepted by the bulk toggle-like/toggle-follow endpoints
+BULK_TOGGLE_MAX_ITEMS = 100
@@ -0,0 +1,168 @@
+"""
+Sliding window rate limiting shared by every worker.
+
+Requests are counted per scope and client (the user, or the address of
+anonymous clients) in fixed windows, the previous window counting in
+proportion to its part still inside the sliding window. A request is one
+Lua script call in Redis (THROTTLE_REDIS_URL), two counters per client
+and scope whatever the rate, so the limit holds across workers. Without
+Redis the counters live in the Django cache.
+
+Rates are ``REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]``, read on every
+request. Views pick their scope with ``throttle_scope`` or per action
+with ``throttle_scopes``, the others count against "read" or "write"
+depending on the method, "anon" for anonymous clients. A scope without
+a rate is not limited. The result is kept in ``request.rate_limit`` for
+RateLimitHeadersMiddleware.
+"""
+import logging
+import math
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+DURATIONS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+RateLimit = namedtuple("RateLimit", ["limit", "remaining", "reset"])
+
+# Counts the request in the current window unless the sliding window
+# is full. KEYS: current and previous window counters,
+# ARGV: previous window weight, limit, counter expiry
+SLIDING_WINDOW = """
+local current = tonumber(redis.call("GET", KEYS[1]) or "0")
+local previous = tonumber(redis.call("GET", KEYS[2]) or "0")
+local allowed = 0
+if previous * tonumber(ARGV[1]) + current < tonumber(ARGV[2]) then
+    allowed = 1
+    current = redis.call("INCR", KEYS[1])
+    redis.call("EXPIRE", KEYS[1], ARGV[3])
+end
+return {allowed, current, previous}
+"""
+
+
+def parse_rate(rate):
+    """(requests, seconds) of a "<requests>/<s|m|h|d>" rate"""
+    requests, period = rate.split("/")
+    return int(requests), DURATIONS[period[0]]
+
+
+def unlimited_settings():
+    """Settings turning rate limiting off, for benchmarks"""
+    return {
+        "REST_FRAMEWORK": {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}}
+    }
+
+
+@lru_cache(maxsize=None)
+def _script():
+    client = redis.Redis.from_url(settings.THROTTLE_REDIS_URL)
+    return client.register_script(SLIDING_WINDOW)
+
+
+def _hit_cache(keys, weight, limit, expiry):
+    counts = cache.get_many(keys)
+    current, previous = counts.get(keys[0], 0), counts.get(keys[1], 0)
+    if previous * weight + current >= limit:
+        return False, current, previous
+
+    cache.add(keys[0], 0, timeout=expiry)
+    try:
+        current = cache.incr(keys[0])
+    except ValueError:
+        # Evicted in between
+        current = 1
+        cache.set(keys[0], current, timeout=expiry)
+    return True, current, previous
+
+
+def hit(scope, ident, limit, duration, now=None):
+    """
+    Count a request of ``ident`` in ``scope`` if it is allowed, returns
+    (allowed, current window count, previous window count, seconds into
+    the current window)
+    """
+    now = time.time() if now is None else now
+    window, elapsed = divmod(now, duration)
+    # The hash tag keeps both counters in the same Redis Cluster slot
+    keys = [
+        f"throttle:{{{scope}:{ident}}}:{int(window)}",
+        f"throttle:{{{scope}:{ident}}}:{int(window) - 1}",
+    ]
+    weight = 1 - elapsed / duration
+    expiry = duration * 2
+
+    if not settings.THROTTLE_REDIS_URL:
+        return (*_hit_cache(keys, weight, limit, expiry), elapsed)
+
+    allowed, current, previous = _script()(
+        keys=keys, args=[repr(weight), limit, expiry]
+    )
+    return bool(allowed), int(current), int(previous), elapsed
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    def get_scope(self, request, view):
+        scopes = getattr(view, "throttle_scopes", {})
+        scope = scopes.get(getattr(view, "action", None)) or getattr(
+            view, "throttle_scope", None
+        )
+        if scope:
+            return scope
+        if not request.user.is_authenticated:
+            return "anon"
+        return "read" if request.method in SAFE_METHODS else "write"
+
+    def get_ident(self, request):
+        if request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{super().get_ident(request)}"
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if not rate:
+            return True
+
+        limit, duration = parse_rate(rate)
+        try:
+            allowed, current, previous, elapsed = hit(
+                scope, self.get_ident(request), limit, duration
+            )
+        except redis.RedisError:
+            # Rather serve unlimited than fail every request
+            logger.warning("Rate limiting is unavailable", exc_info=True)
+            return True
+
+        weight = 1 - elapsed / duration
+        request._request.rate_limit = RateLimit(
+            limit=limit,
+            remaining=max(0, math.floor(limit - previous * weight - current)),
+            reset=math.ceil(duration - elapsed),
+        )
+        if not allowed:
+            self.wait_seconds = self._wait(limit, duration, current, previous, elapsed)
+        return allowed
+
+    @staticmethod
+    def _wait(limit, duration, current, previous, elapsed):
+        """Seconds until the sliding window has room for one more request"""
+        if current >= limit:
+            # Once the current window is over, its count has to slide out
+            wait = duration - elapsed + duration * (1 - limit / current)
+        else:
+            wait = duration * (1 - (limit - current) / previous) - elapsed
+        return max(1, math.ceil(wait))
+
+    def wait(self):
+        return self.wait_seconds
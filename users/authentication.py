@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.functions import MD5, Upper
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+# What authentication, permissions and the views read from request.user.
+# The password hash and the rest of the row stay out of the cache.
+CACHED_FIELDS = (
+    "email",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+    "profile__id",
+    "profile__user_id",
+)
+
+
+def _user_key(user_id):
+    return f"users:auth-user:{user_id}"
+
+
+def forget_user(user_id):
+    """Drop the cached user, the next request of its tokens reads it again"""
+    cache.delete(_user_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication reading the token's user with its profile from
+    the cache, for AUTH_USER_CACHE_TIMEOUT seconds after a request loaded
+    them, so warm requests authenticate without a query.
+    Only CACHED_FIELDS are loaded, with the MD5 of the password hash that
+    CHECK_REVOKE_TOKEN compares. Saving a user forgets it (users.signals),
+    views reading or updating other fields load a fresh copy.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = _user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = (
+                self.user_model.objects.select_related("profile")
+                .only(*CACHED_FIELDS)
+                .annotate(password_md5=Upper(MD5("password")))
+                .filter(**{api_settings.USER_ID_FIELD: user_id})
+                .first()
+            )
+            if user is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cache.set(key, user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != user.password_md5:
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+
+        return user
@@ -0,0 +1,90 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from social.benchmark import percentile
+from social_media_api_service.throttling import unlimited_settings
+
+PASSWORD = "benchmark-password"
+
+
+def hasher_settings(hasher, **cost):
+    """Settings hashing new passwords with ``hasher`` at the given cost"""
+    return {
+        "PASSWORD_HASHER": hasher,
+        "PASSWORD_HASHERS": [
+            settings.PASSWORD_HASHER_CLASSES[hasher],
+            *(
+                path
+                for name, path in settings.PASSWORD_HASHER_CLASSES.items()
+                if name != hasher
+            ),
+        ],
+        **{
+            f"PASSWORD_{hasher.upper()}_{name.upper()}": value
+            for name, value in cost.items()
+        },
+    }
+
+
+def _timed(request, requests):
+    """CPU and wall milliseconds of every call of ``request``, after a warmup"""
+    cpu, wall = [], []
+    statuses = set()
+    for i in range(requests + 1):
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        statuses.add(request(i).status_code)
+        if i:
+            cpu.append((time.process_time() - cpu_start) * 1000)
+            wall.append((time.perf_counter() - wall_start) * 1000)
+    return {
+        "statuses": sorted(statuses),
+        "cpu_ms": round(statistics.mean(cpu), 2),
+        "p50_ms": round(percentile(wall, 0.5), 2),
+        "p90_ms": round(percentile(wall, 0.9), 2),
+    }
+
+
+def benchmark_hasher(hasher, requests=10, **cost):
+    """
+    Register ``requests`` users and log one in ``requests`` times with
+    new passwords hashed by ``hasher``, to be run in a transaction
+    that is rolled back
+    """
+    client = APIClient()
+    run = f"benchmark-{hasher}-{'-'.join(str(value) for value in cost.values())}"
+
+    with override_settings(**hasher_settings(hasher, **cost), **unlimited_settings()):
+        get_user_model().objects.create_user(
+            email=f"{run}@example.com", password=PASSWORD
+        )
+        return {
+            "hasher": hasher,
+            **cost,
+            "register": _timed(
+                lambda i: client.post(
+                    reverse("users:create"),
+                    {
+                        "email": f"{run}-{i}@example.com",
+                        "password": PASSWORD,
+                        "first_name": "Benchmark",
+                        "last_name": "User",
+                    },
+                    format="json",
+                ),
+                requests,
+            ),
+            "login": _timed(
+                lambda i: client.post(
+                    reverse("users:token_obtain_pair"),
+                    {"email": f"{run}@example.com", "password": PASSWORD},
+                    format="json",
+                ),
+                requests,
+            ),
+        }
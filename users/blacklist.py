@@ -0,0 +1,139 @@
+"""
+Refresh token blacklist in a Redis sorted set.
+
+Members are the jti of blacklisted tokens scored by their expiry time,
+so a lookup is one ZSCORE and expired members are dropped by score:
+a jti lives until its token expires. The key itself has no TTL, which
+would let Redis evict it under a volatile-* maxmemory policy.
+
+Tokens blacklisted on logout are also recorded in the token_blacklist
+tables, the durable record: a missing set (Redis restarted, or evicted
+it) is rebuilt from them on first use. Refresh tokens rotated by
+/token/refresh/ are only recorded in the set, which spares two inserts
+per refresh but lets a rotated token be refreshed once more if the set
+is lost before it expires. One process at a time rebuilds the set, the
+lookups made meanwhile read the tables. Without TOKEN_BLACKLIST_REDIS_URL
+lookups use the tables and rotated tokens are not blacklisted.
+"""
+import time
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+KEY = "users:token_blacklist"
+REBUILD_LOCK_KEY = f"{KEY}:rebuilding"
+# Seconds after which the lock of a crashed rebuild is released
+REBUILD_TIMEOUT = 10 * 60
+# Keeps the set alive while no token is blacklisted, so that a missing
+# key always means a lost set
+SENTINEL = "-"
+
+
+def enabled():
+    return bool(settings.TOKEN_BLACKLIST_REDIS_URL)
+
+
+@lru_cache(maxsize=None)
+def _client():
+    return redis.Redis.from_url(settings.TOKEN_BLACKLIST_REDIS_URL)
+
+
+def rebuild():
+    """Merge the unexpired blacklisted tokens of the database into the set"""
+    client = _client()
+    building = f"{KEY}:rebuild:{time.time_ns()}"
+    client.zadd(building, {SENTINEL: float("inf")})
+
+    tokens = BlacklistedToken.objects.filter(
+        token__expires_at__gt=timezone.now()
+    ).values_list("token__jti", "token__expires_at")
+    batch = {}
+    for jti, expires_at in tokens.iterator(
+        chunk_size=settings.TOKEN_BLACKLIST_BATCH_SIZE
+    ):
+        batch[jti] = expires_at.timestamp()
+        if len(batch) == settings.TOKEN_BLACKLIST_BATCH_SIZE:
+            client.zadd(building, batch)
+            batch = {}
+    if batch:
+        client.zadd(building, batch)
+
+    # A union rather than a rename keeps the tokens added meanwhile
+    with client.pipeline() as pipe:
+        pipe.zunionstore(KEY, [KEY, building], aggregate="MAX")
+        pipe.delete(building)
+        pipe.execute()
+
+
+def _rebuild_once(client):
+    """Rebuild the set unless another process is, returns whether it did"""
+    if not client.set(REBUILD_LOCK_KEY, 1, nx=True, ex=REBUILD_TIMEOUT):
+        return False
+    try:
+        rebuild()
+    finally:
+        client.delete(REBUILD_LOCK_KEY)
+    return True
+
+
+def _ensure_set(client):
+    # Tokens added during another process' rebuild are kept by its union
+    if not client.exists(KEY):
+        _rebuild_once(client)
+
+
+def add(jti, exp):
+    """Blacklist ``jti`` until ``exp``, returns False if it already was"""
+    client = _client()
+    _ensure_set(client)
+    return bool(client.zadd(KEY, {jti: exp}, nx=True))
+
+
+def contains(jti):
+    client = _client()
+    with client.pipeline() as pipe:
+        pipe.exists(KEY)
+        pipe.exists(REBUILD_LOCK_KEY)
+        pipe.zscore(KEY, jti)
+        exists, rebuilding, score = pipe.execute()
+
+    if score is not None:
+        return True
+    if exists and not rebuilding:
+        return False
+    if not exists and _rebuild_once(client):
+        return client.zscore(KEY, jti) is not None
+    # Being rebuilt by another process
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def prune(now=None):
+    """
+    Delete the expired outstanding tokens, and their blacklist entries,
+    TOKEN_BLACKLIST_BATCH_SIZE rows at a time. Returns the number of
+    outstanding tokens deleted.
+    """
+    now = now or timezone.now()
+    deleted = 0
+    while True:
+        # Expired tokens are mostly the oldest rows, which come first
+        # in the primary key index
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now)
+            .order_by("pk")
+            .values_list("pk", flat=True)[: settings.TOKEN_BLACKLIST_BATCH_SIZE]
+        )
+        if not ids:
+            break
+        BlacklistedToken.objects.filter(token_id__in=ids).delete()
+        deleted += OutstandingToken.objects.filter(pk__in=ids).delete()[0]
+
+    if enabled():
+        _client().zremrangebyscore(KEY, "-inf", now.timestamp())
+    return deleted
@@ -0,0 +1,118 @@
+"""
+Bulk import of users with their profiles from CSV or JSON Lines files.
+
+Rows are streamed from the file and inserted ``batch_size`` at a time,
+one transaction and two multi-row INSERTs (users, then profiles) per
+batch. Rows have an ``email`` and optional ``first_name``, ``last_name``,
+``bio`` and ``password`` columns.
+
+Emails registered while a batch is imported are skipped by the INSERT
+(ON CONFLICT DO NOTHING), the profiles are created for the users read
+back without one.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from social import cache
+from social.models import Profile
+
+FORMATS = ("csv", "jsonl")
+
+
+def read_rows(file, file_format):
+    """Yield the rows of an open file as dicts, one line at a time"""
+    if file_format == "csv":
+        yield from csv.DictReader(file)
+    else:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _password(value):
+    """
+    Keep passwords already hashed by a configured hasher (e.g. accounts
+    migrated from another Django site), hash the others. Hashing is slow,
+    millions of plain passwords take hours. Empty passwords are unusable.
+    """
+    if not value:
+        return make_password(None)
+    try:
+        identify_hasher(value)
+    except ValueError:
+        return make_password(value)
+    return value
+
+
+def _build_user(row):
+    User = get_user_model()
+    user = User(
+        email=User.objects.normalize_email(row.get("email") or "").strip(),
+        first_name=row.get("first_name") or "",
+        last_name=row.get("last_name") or "",
+        bio=row.get("bio") or "",
+        password=_password(row.get("password")),
+    )
+    user.search_name = user.build_search_name()
+    return user
+
+
+def _valid_email(email):
+    try:
+        get_user_model()._meta.get_field("email").run_validators(email)
+    except ValidationError:
+        return False
+    return True
+
+
+def _import_batch(rows):
+    """Insert the users of new valid emails, returns (created, skipped)"""
+    User = get_user_model()
+    users = {}
+    for row in rows:
+        user = _build_user(row)
+        if user.email and _valid_email(user.email):
+            users.setdefault(user.email, user)
+
+    with transaction.atomic():
+        existing = set(
+            User.objects.filter(email__in=list(users)).values_list("email", flat=True)
+        )
+        users = {email: user for email, user in users.items() if email not in existing}
+        User.objects.bulk_create(list(users.values()), ignore_conflicts=True)
+
+        # The ids are not returned with ignore_conflicts. Users registered
+        # concurrently have their profile, registration is atomic.
+        created = User.objects.filter(
+            email__in=list(users), profile__isnull=True
+        ).values_list("id", "email")
+        Profile.objects.bulk_create(
+            [
+                Profile(
+                    user_id=user_id,
+                    first_name=users[email].first_name,
+                    last_name=users[email].last_name,
+                    bio=users[email].bio,
+                )
+                for user_id, email in created
+            ]
+        )
+    return len(created), len(rows) - len(created)
+
+
+def import_users(rows, batch_size=1000):
+    """
+    Import the users of ``rows``, skipping emails already registered or
+    repeated in a batch and rows without a valid email. Yields the
+    (created, skipped) counts of every batch.
+    """
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield _import_batch(batch)
+    cache.bump("profile")
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from social.benchmark import dump
+from users import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the CPU time and latency of registration and login requests "
+        "at every password hashing setting. Everything runs in a transaction "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pbkdf2",
+            default="600000,260000,100000",
+            help="Comma-separated PBKDF2 iteration counts",
+        )
+        parser.add_argument(
+            "--argon2",
+            default="2:102400:8,2:19456:1,1:47104:1",
+            help="Comma-separated argon2 time_cost:memory_cost(KiB):parallelism",
+        )
+        parser.add_argument("--requests", type=int, default=10)
+        parser.add_argument("--output", help="JSON file, printed without it")
+
+    def _runs(self, options):
+        runs = []
+        for iterations in filter(None, options["pbkdf2"].split(",")):
+            runs.append(("pbkdf2", {"iterations": int(iterations)}))
+
+        for cost in filter(None, options["argon2"].split(",")):
+            try:
+                time_cost, memory_cost, parallelism = map(int, cost.split(":"))
+            except ValueError:
+                raise CommandError(f"Invalid argon2 cost {cost}")
+            runs.append(
+                (
+                    "argon2",
+                    {
+                        "time_cost": time_cost,
+                        "memory_cost": memory_cost,
+                        "parallelism": parallelism,
+                    },
+                )
+            )
+        return runs
+
+    def handle(self, *args, **options):
+        report = {"requests": options["requests"], "runs": []}
+
+        for hasher, cost in self._runs(options):
+            if hasher == "argon2":
+                try:
+                    import argon2  # noqa: F401
+                except ImportError:
+                    self.stderr.write("argon2-cffi is not installed, skipping argon2")
+                    continue
+
+            self.stderr.write(f"Benchmarking {hasher} {cost}...")
+            with transaction.atomic():
+                report["runs"].append(
+                    benchmark.benchmark_hasher(hasher, options["requests"], **cost)
+                )
+                transaction.set_rollback(True)
+
+        result = dump(report, options["output"])
+        if options["output"]:
+            self.stderr.write(self.style.SUCCESS(f"Benchmark saved to {result}!"))
+        else:
+            self.stdout.write(result)
@@ -0,0 +1,54 @@
+import csv
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from users import importing
+
+
+class Command(BaseCommand):
+    help = (
+        "Import users with their profiles from a CSV (with a header row) "
+        "or JSON Lines file, in batches of bulk inserts"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, - for the standard input")
+        parser.add_argument(
+            "--format",
+            choices=importing.FORMATS,
+            help="Format of the file, by default its extension",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or os.path.splitext(path)[1][1:].lower()
+        if file_format not in importing.FORMATS:
+            raise CommandError(
+                f"Unknown format of {path}, use --format {'/'.join(importing.FORMATS)}"
+            )
+
+        self.stdout.write(f"Importing users from {path}...")
+
+        created = skipped = 0
+        try:
+            with (
+                open(path, newline="", encoding="utf-8") if path != "-" else sys.stdin
+            ) as file:
+                rows = importing.read_rows(file, file_format)
+                for batch in importing.import_users(rows, options["batch_size"]):
+                    created += batch[0]
+                    skipped += batch[1]
+                    if options["verbosity"] > 1:
+                        self.stdout.write(f"  {created} created, {skipped} skipped")
+        except (OSError, ValueError, csv.Error, DatabaseError) as error:
+            raise CommandError(
+                f"{error} ({created} users imported before the error)"
+            )
+
+        self.stdout.write(f"  created: {created}")
+        self.stdout.write(f"  skipped: {skipped}")
+        self.stdout.write(self.style.SUCCESS("Users imported!"))
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.10 on 2026-10-17 18:33
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Concat, Lower
+
+
+def fill_search_name(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    User.objects.update(
+        search_name=Lower(
+            Concat("first_name", Value(" "), "last_name", Value(" "), "email")
+        )
+    )
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX users_search_name_trgm_idx "
+            "ON users_user USING gin (search_name gin_trgm_ops)"
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS users_search_name_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0008_alter_user_first_name_alter_user_last_name"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="user",
+            name="search_name",
+            field=models.CharField(default="", editable=False, max_length=1024),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                fields=["search_name"],
+                name="users_search_name_prefix_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+        migrations.RunPython(fill_search_name, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
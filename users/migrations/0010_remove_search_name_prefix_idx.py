@@ -0,0 +1,17 @@
+# Generated by Django 4.2.10 on 2026-10-17 19:39
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0009_user_search_name"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="user",
+            name="users_search_name_prefix_idx",
+        ),
+    ]
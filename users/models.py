@@ -3,10 +3,48 @@ from django.contrib.auth.models import (
     BaseUserManager,
 )
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Lower
 from django.utils.translation import gettext as _
 
+# Fields of User.search_name
+SEARCH_NAME_FIELDS = ("first_name", "last_name", "email")
 
-class UserManager(BaseUserManager):
+
+def search_name_expression(values):
+    """
+    search_name after an UPDATE of ``values``, the fields not in it keep
+    their column. Values are lowercased here like build_search_name does,
+    SQLite's LOWER() only knows ASCII.
+    """
+    parts = []
+    for name in SEARCH_NAME_FIELDS:
+        value = values.get(name, F(name))
+        if hasattr(value, "resolve_expression"):
+            parts.append(Lower(value))
+        else:
+            parts.append(Value(str(value).lower()))
+        parts.append(Value(" "))
+    return Concat(*parts[:-1], output_field=models.CharField())
+
+
+class UserQuerySet(models.QuerySet):
+    """Keeps search_name up to date in the bulk writes of its fields"""
+
+    def update(self, **kwargs):
+        if set(SEARCH_NAME_FIELDS) & kwargs.keys():
+            kwargs["search_name"] = search_name_expression(kwargs)
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        if set(SEARCH_NAME_FIELDS) & set(fields):
+            for obj in objs:
+                obj.search_name = obj.build_search_name()
+            fields = [*fields, "search_name"]
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     """Define a model manager for User model with no username field."""
 
     use_in_migrations = True
@@ -46,8 +84,24 @@ class User(AbstractUser):
     first_name = models.CharField(max_length=255)
     last_name = models.CharField(max_length=255)
     bio = models.TextField(blank=True)
+    search_name = models.CharField(max_length=1024, editable=False, default="")
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
 
     objects = UserManager()
+
+    def build_search_name(self):
+        """
+        Lowercased names and email matched by the ?user= filters. Set by
+        save(), update() and bulk_update(), profile renames write the names
+        of their user (social.signals).
+        """
+        return " ".join(getattr(self, name) for name in SEARCH_NAME_FIELDS).lower()
+
+    def save(self, *args, **kwargs):
+        self.search_name = self.build_search_name()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "search_name"}
+        super().save(*args, **kwargs)
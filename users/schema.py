@@ -0,0 +1,17 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import (
+    SimpleJWTScheme,
+    TokenObtainPairSerializerExtension,
+    TokenRefreshSerializerExtension,
+)
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    target_class = "users.authentication.CachedJWTAuthentication"
+
+
+class TokenObtainPairSchema(TokenObtainPairSerializerExtension):
+    target_class = "users.tokens.TokenObtainPairSerializer"
+
+
+class TokenRefreshSchema(TokenRefreshSerializerExtension):
+    target_class = "users.tokens.TokenRefreshSerializer"
@@ -1,6 +1,9 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework import serializers
 
+from social.models import Profile
+
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -20,8 +23,23 @@ class UserSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        """Create a new user with encrypted password and return it"""
-        return get_user_model().objects.create_user(**validated_data)
+        """Create a new user with encrypted password and its profile"""
+        user_model = get_user_model()
+        password = validated_data.pop("password")
+        user = user_model(**validated_data)
+        user.email = user_model.objects.normalize_email(user.email)
+        # Hashing is slow, keep it out of the transaction
+        user.set_password(password)
+
+        with transaction.atomic():
+            user.save()
+            Profile.objects.create(
+                user=user,
+                first_name=user.first_name,
+                last_name=user.last_name,
+                bio=user.bio,
+            )
+        return user
 
     def update(self, instance, validated_data):
         """Update a user, set the password correctly and return it"""
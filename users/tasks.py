@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from . import blacklist
+
+
+@shared_task
+def prune_outstanding_tokens() -> int:
+    return blacklist.prune()
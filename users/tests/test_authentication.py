@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+
+from social.models import Profile
+from users.authentication import _user_key
+from users.tokens import RefreshToken
+
+
+class CachedUserTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="user@example.com", password="password", first_name="User"
+        )
+        Profile.objects.create(user=cls.user, first_name="User")
+
+    def setUp(self):
+        cache.clear()
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}"
+        )
+
+    def get_profiles(self):
+        return self.client.get("/api/social/profiles/")
+
+    def cached_user(self):
+        return cache.get(_user_key(self.user.pk))
+
+    def test_caches_only_authentication_fields(self):
+        self.assertEqual(self.get_profiles().status_code, 200)
+
+        user = self.cached_user()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.profile.pk, self.user.profile.pk)
+        self.assertNotIn("password", user.__dict__)
+        self.assertNotIn("bio", user.__dict__)
+        self.assertIn("password", user.get_deferred_fields())
+
+        # Warm requests authenticate from the cache, /me loads the full user
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/api/users/me/").status_code, 200)
+
+    def test_me_reads_and_updates_fresh_user(self):
+        self.get_profiles()
+
+        response = self.client.get("/api/users/me/")
+        self.assertEqual(response.data["first_name"], "User")
+
+        response = self.client.patch("/api/users/me/", {"bio": "Hello"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(self.cached_user())
+        self.assertEqual(self.client.get("/api/users/me/").data["bio"], "Hello")
+
+    def test_logout_forgets_user(self):
+        self.get_profiles()
+
+        response = self.client.post(
+            "/api/users/logout/", {"refresh_token": str(self.refresh)}
+        )
+        self.assertEqual(response.status_code, 205)
+        self.assertIsNone(self.cached_user())
+
+    def test_password_change_forgets_user(self):
+        self.get_profiles()
+
+        self.user.set_password("changed")
+        self.user.save()
+        self.assertIsNone(self.cached_user())
+
+    def test_password_change_revokes_tokens(self):
+        with mock.patch.object(api_settings, "CHECK_REVOKE_TOKEN", True):
+            token = RefreshToken.for_user(self.user).access_token
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            self.assertEqual(self.get_profiles().status_code, 200)
+
+            # Changed outside of the API, e.g. in the admin
+            user = get_user_model().objects.get(pk=self.user.pk)
+            user.set_password("changed")
+            user.save()
+            self.assertEqual(self.get_profiles().status_code, 401)
@@ -0,0 +1,150 @@
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+from social_media_api_service.checks import check_deploy_settings
+from social.tests.utils import TEST_REDIS_URL, redis_available
+from users import blacklist
+from users.tokens import RefreshToken
+
+
+class RefreshTestsMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="user@example.com", password="password"
+        )
+
+    def setUp(self):
+        blacklist._client.cache_clear()
+        self.addCleanup(blacklist._client.cache_clear)
+        self.client = APIClient()
+
+    def refresh(self, token):
+        return self.client.post("/api/users/token/refresh/", {"refresh": str(token)})
+
+    def assertRotates(self, token):
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.data["refresh"], str(token))
+        # The rotated token is blacklisted
+        self.assertEqual(self.refresh(token).status_code, 401)
+        return response.data["refresh"]
+
+
+@override_settings(TOKEN_BLACKLIST_REDIS_URL="")
+class DatabaseBlacklistTests(RefreshTestsMixin, TestCase):
+    def test_rotation_inserts_nothing(self):
+        token = RefreshToken.for_user(self.user)
+
+        with mock.patch.object(api_settings, "BLACKLIST_AFTER_ROTATION", False):
+            # The lookup of logged out tokens, no inserts
+            with self.assertNumQueries(1):
+                self.assertEqual(self.refresh(token).status_code, 200)
+
+    def test_rotation_blacklists_in_database(self):
+        token = RefreshToken.for_user(self.user)
+
+        with mock.patch.object(api_settings, "BLACKLIST_AFTER_ROTATION", True):
+            self.assertRotates(token)
+        self.assertTrue(
+            BlacklistedToken.objects.filter(
+                token__jti=token[api_settings.JTI_CLAIM]
+            ).exists()
+        )
+
+    def test_deploy_check_warns_about_rotation(self):
+        simple_jwt = {**settings.SIMPLE_JWT, "BLACKLIST_AFTER_ROTATION": True}
+        with override_settings(SIMPLE_JWT=simple_jwt):
+            ids = [message.id for message in check_deploy_settings(None)]
+        self.assertIn("social_media_api_service.W003", ids)
+
+
+@skipUnless(redis_available(), f"Needs Redis at {TEST_REDIS_URL}")
+@override_settings(TOKEN_BLACKLIST_REDIS_URL=TEST_REDIS_URL)
+class RedisBlacklistTests(RefreshTestsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for name, value in [
+            ("KEY", "test:users:token_blacklist"),
+            ("REBUILD_LOCK_KEY", "test:users:token_blacklist:rebuilding"),
+        ]:
+            patcher = mock.patch.object(blacklist, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        rotation = mock.patch.object(api_settings, "BLACKLIST_AFTER_ROTATION", True)
+        rotation.start()
+        self.addCleanup(rotation.stop)
+        blacklist._client().delete(blacklist.KEY)
+        self.addCleanup(blacklist._client().delete, blacklist.KEY)
+
+    def test_rotation_only_in_redis(self):
+        token = RefreshToken.for_user(self.user)
+        outstanding = OutstandingToken.objects.count()
+
+        rotated = self.assertRotates(token)
+        self.assertRotates(rotated)
+
+        self.assertEqual(OutstandingToken.objects.count(), outstanding)
+        self.assertFalse(BlacklistedToken.objects.exists())
+        self.assertTrue(blacklist.contains(token[api_settings.JTI_CLAIM]))
+
+    def test_set_is_not_evictable(self):
+        # volatile-* maxmemory policies only evict keys with a TTL
+        self.assertRotates(RefreshToken.for_user(self.user))
+        self.assertEqual(blacklist._client().ttl(blacklist.KEY), -1)
+
+    def test_add_only_once(self):
+        token = RefreshToken.for_user(self.user)
+        jti = token[api_settings.JTI_CLAIM]
+
+        self.assertTrue(blacklist.add(jti, token["exp"]))
+        self.assertFalse(blacklist.add(jti, token["exp"]))
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_rebuild_from_database(self):
+        logged_out, rotated = (RefreshToken.for_user(self.user) for _ in range(2))
+        logged_out.blacklist()
+        self.assertRotates(rotated)
+
+        # Redis restarted without persistence
+        blacklist._client().delete(blacklist.KEY)
+
+        self.assertTrue(blacklist.contains(logged_out[api_settings.JTI_CLAIM]))
+        self.assertEqual(self.refresh(logged_out).status_code, 401)
+        # Rotated tokens are only recorded in Redis
+        self.assertFalse(blacklist.contains(rotated[api_settings.JTI_CLAIM]))
+
+    def test_lookup_during_rebuild_reads_database(self):
+        logged_out = RefreshToken.for_user(self.user)
+        logged_out.blacklist()
+        client = blacklist._client()
+        client.delete(blacklist.KEY)
+        # Another process is rebuilding the set
+        client.set(blacklist.REBUILD_LOCK_KEY, 1)
+        self.addCleanup(client.delete, blacklist.REBUILD_LOCK_KEY)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(blacklist.contains(logged_out[api_settings.JTI_CLAIM]))
+        self.assertFalse(blacklist.contains("unknown"))
+        self.assertFalse(client.exists(blacklist.KEY))
+
+        client.delete(blacklist.REBUILD_LOCK_KEY)
+        self.assertTrue(blacklist.contains(logged_out[api_settings.JTI_CLAIM]))
+        self.assertTrue(client.exists(blacklist.KEY))
+
+    def test_prune_drops_expired_members(self):
+        blacklist.add("expired", 1)
+        blacklist.add("valid", 2 ** 40)
+
+        blacklist.prune()
+        self.assertFalse(blacklist.contains("expired"))
+        self.assertTrue(blacklist.contains("valid"))
@@ -0,0 +1,78 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from users.benchmark import hasher_settings
+
+PBKDF2 = hasher_settings("pbkdf2", iterations=1000)
+ARGON2 = hasher_settings("argon2", time_cost=1, memory_cost=1024, parallelism=1)
+
+
+class HasherTests(TestCase):
+    def setUp(self):
+        cache.clear()  # Login throttling
+        self.client = APIClient()
+
+    def create_user(self):
+        return get_user_model().objects.create_user(
+            email="user@example.com", password="password"
+        )
+
+    def login(self, user):
+        response = self.client.post(
+            "/api/users/token/", {"email": user.email, "password": "password"}
+        )
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        return user.password
+
+    def test_configured_hasher(self):
+        with override_settings(**PBKDF2):
+            password = self.create_user().password
+        self.assertTrue(password.startswith("pbkdf2_sha256$1000$"))
+        get_user_model().objects.all().delete()
+        with override_settings(**ARGON2):
+            password = self.create_user().password
+        self.assertTrue(password.startswith("argon2$argon2id$v=19$m=1024,t=1,p=1$"))
+
+    def test_login_keeps_current_hash(self):
+        with override_settings(**PBKDF2):
+            user = self.create_user()
+            password = user.password
+            self.assertEqual(self.login(user), password)
+
+    def test_login_upgrades_cost(self):
+        with override_settings(**PBKDF2):
+            user = self.create_user()
+        with override_settings(**hasher_settings("pbkdf2", iterations=2000)):
+            self.assertTrue(self.login(user).startswith("pbkdf2_sha256$2000$"))
+
+        with override_settings(**ARGON2):
+            self.assertTrue(self.login(user).startswith("argon2$"))
+        with override_settings(**{**ARGON2, "PASSWORD_ARGON2_TIME_COST": 2}):
+            self.assertIn("m=1024,t=2,p=1$", self.login(user))
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command(
+            "benchmark_hashers",
+            pbkdf2="1000",
+            argon2="1:1024:1",
+            requests=1,
+            stdout=out,
+            stderr=StringIO(),
+        )
+        runs = json.loads(out.getvalue())["runs"]
+
+        self.assertEqual(
+            [(run["hasher"], run["register"]["statuses"]) for run in runs],
+            [("pbkdf2", [201]), ("argon2", [201])],
+        )
+        self.assertEqual([run["login"]["statuses"] for run in runs], [[200], [200]])
+        # Rolled back
+        self.assertFalse(get_user_model().objects.exists())
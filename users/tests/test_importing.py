@@ -0,0 +1,148 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError
+from django.test import TestCase
+
+from social.models import Profile
+from users import importing
+
+User = get_user_model()
+
+
+def jsonl(*emails):
+    return "".join(
+        f'{{"email": "{email}", "first_name": "{email.split("@")[0]}", "bio": "Bio"}}\n'
+        for email in emails
+    )
+
+
+class ImportUsersTests(TestCase):
+    def import_rows(self, text, file_format="jsonl", batch_size=1000):
+        rows = importing.read_rows(StringIO(text), file_format)
+        return list(importing.import_users(rows, batch_size))
+
+    def assertImported(self, *emails):
+        self.assertEqual(
+            sorted(User.objects.values_list("email", flat=True)), sorted(emails)
+        )
+        self.assertEqual(
+            sorted(Profile.objects.values_list("user__email", flat=True)),
+            sorted(emails),
+        )
+
+    def test_import_csv(self):
+        text = (
+            "email,first_name,last_name,bio,password\n"
+            "a@EXAMPLE.com,Ann,Lee,Hi,secret\n"
+            "b@example.com,Bob,,,\n"
+        )
+        self.assertEqual(self.import_rows(text, "csv"), [(2, 0)])
+
+        self.assertImported("a@example.com", "b@example.com")
+        ann = User.objects.get(email="a@example.com")
+        self.assertTrue(ann.check_password("secret"))
+        self.assertEqual(ann.search_name, "ann lee a@example.com")
+        self.assertEqual(
+            (ann.profile.first_name, ann.profile.last_name, ann.profile.bio),
+            ("Ann", "Lee", "Hi"),
+        )
+        self.assertFalse(User.objects.get(email="b@example.com").has_usable_password())
+
+    def test_skips_existing_repeated_and_empty_emails(self):
+        User.objects.create_user(email="a@example.com")
+        text = jsonl("a@example.com", "b@example.com", "b@example.com", "")
+
+        self.assertEqual(self.import_rows(text), [(1, 3)])
+        self.assertEqual(User.objects.count(), 2)
+        self.assertTrue(Profile.objects.filter(user__email="b@example.com").exists())
+
+    def test_skips_invalid_emails(self):
+        long_email = "a" * 250 + "@example.com"
+        text = jsonl("not-an-email", "b@example.com", "c@@example.com", long_email)
+
+        self.assertEqual(self.import_rows(text), [(1, 3)])
+        self.assertImported("b@example.com")
+
+    def test_keeps_hashed_passwords(self):
+        hashed = User(email="x@example.com")
+        hashed.set_password("secret")
+        text = f'{{"email": "a@example.com", "password": "{hashed.password}"}}\n'
+
+        self.import_rows(text)
+        user = User.objects.get(email="a@example.com")
+        self.assertEqual(user.password, hashed.password)
+        self.assertTrue(user.check_password("secret"))
+
+    def test_batches(self):
+        text = jsonl(*(f"{i}@example.com" for i in range(5)))
+        # One transaction per batch: the email check, the users INSERT,
+        # reading back their ids and the profiles INSERT
+        with self.assertNumQueries(3 * 6):
+            batches = self.import_rows(text, batch_size=2)
+        self.assertEqual(batches, [(2, 0), (2, 0), (1, 0)])
+        self.assertEqual(Profile.objects.count(), 5)
+
+    def test_skips_emails_registered_during_import(self):
+        bulk_create = User.objects.bulk_create
+
+        def register_during_import(users, *args, **kwargs):
+            # Registered after the email check of the second batch
+            if users[0].email == "d@example.com":
+                user = User.objects.create_user(email="e@example.com")
+                Profile.objects.create(user=user, first_name="Registered")
+            return bulk_create(users, *args, **kwargs)
+
+        text = jsonl(*(f"{name}@example.com" for name in "abcde"))
+        with mock.patch.object(
+            User.objects, "bulk_create", side_effect=register_during_import
+        ):
+            self.assertEqual(self.import_rows(text, batch_size=3), [(3, 0), (1, 1)])
+
+        self.assertImported(*(f"{name}@example.com" for name in "abcde"))
+        self.assertEqual(
+            Profile.objects.get(user__email="e@example.com").first_name, "Registered"
+        )
+
+    def test_profile_failure_rolls_back_users(self):
+        with mock.patch.object(
+            Profile.objects, "bulk_create", side_effect=IntegrityError
+        ), self.assertRaises(IntegrityError):
+            self.import_rows(jsonl("a@example.com"))
+
+        self.assertFalse(User.objects.exists())
+
+
+class ImportUsersCommandTests(TestCase):
+    def call(self, text, *args):
+        with mock.patch("sys.stdin", StringIO(text)):
+            call_command("import_users", "-", *args, stdout=StringIO())
+
+    def test_import(self):
+        self.call(jsonl("a@example.com", "b@example.com"), "--format", "jsonl")
+        self.assertEqual(Profile.objects.count(), 2)
+
+    def test_invalid_row_reports_imported_batches(self):
+        text = jsonl("a@example.com", "b@example.com", "c@example.com") + "{\n"
+
+        with self.assertRaisesMessage(CommandError, "2 users imported before"):
+            self.call(text, "--format", "jsonl", "--batch-size", "2")
+        # The rows read before the invalid line in its batch are not imported
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_database_error_reports_imported_batches(self):
+        bulk_create = Profile.objects.bulk_create
+
+        def fail_second_batch(profiles, *args, **kwargs):
+            if Profile.objects.exists():
+                raise IntegrityError("duplicate key")
+            return bulk_create(profiles, *args, **kwargs)
+
+        text = jsonl("a@example.com", "b@example.com", "c@example.com")
+        with mock.patch.object(
+            Profile.objects, "bulk_create", side_effect=fail_second_batch
+        ), self.assertRaisesMessage(CommandError, "2 users imported before"):
+            self.call(text, "--format", "jsonl", "--batch-size", "2")
+        self.assertEqual(User.objects.count(), 2)
@@ -0,0 +1,47 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from social.models import Profile
+
+REGISTER_URL = "/api/users/register/"
+
+
+class RegistrationTests(TestCase):
+    payload = {
+        "email": "user@EXAMPLE.com",
+        "password": "password",
+        "first_name": "First",
+        "last_name": "Last",
+        "bio": "Hello",
+    }
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_creates_user_and_profile(self):
+        # Email check, then both INSERTs in one transaction
+        with self.assertNumQueries(5):
+            response = self.client.post(REGISTER_URL, self.payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("password", response.data)
+
+        user = get_user_model().objects.get(pk=response.data["id"])
+        self.assertEqual(user.email, "user@example.com")
+        self.assertTrue(user.check_password("password"))
+        self.assertEqual(
+            (user.profile.first_name, user.profile.last_name, user.profile.bio),
+            ("First", "Last", "Hello"),
+        )
+
+    def test_profile_failure_rolls_back_user(self):
+        with mock.patch.object(
+            Profile.objects, "create", side_effect=IntegrityError
+        ), self.assertRaises(IntegrityError):
+            self.client.post(REGISTER_URL, self.payload)
+
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(Profile.objects.exists())
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.functions import Upper
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from social.models import Post, Profile
+from social.tests.utils import create_user
+
+User = get_user_model()
+
+
+class SearchNameTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="ann@example.com", first_name="Ann", last_name="Lee"
+        )
+
+    def search_name(self):
+        return User.objects.values_list("search_name", flat=True).get(pk=self.user.pk)
+
+    def test_save(self):
+        self.assertEqual(self.search_name(), "ann lee ann@example.com")
+
+        self.user.last_name = "Kim"
+        self.user.save(update_fields=["last_name"])
+        self.assertEqual(self.search_name(), "ann kim ann@example.com")
+
+    def test_update(self):
+        User.objects.filter(pk=self.user.pk).update(first_name="Bea")
+        self.assertEqual(self.search_name(), "bea lee ann@example.com")
+
+        User.objects.filter(pk=self.user.pk).update(
+            last_name=Upper(F("first_name")), email="BEA@example.com"
+        )
+        self.assertEqual(self.search_name(), "bea bea bea@example.com")
+
+        # Other fields keep it as it is
+        User.objects.filter(pk=self.user.pk).update(bio="Bio")
+        self.assertEqual(self.search_name(), "bea bea bea@example.com")
+
+    def test_bulk_update(self):
+        self.user.first_name = "Bea"
+        User.objects.bulk_update([self.user], ["first_name"])
+        self.assertEqual(self.search_name(), "bea lee ann@example.com")
+
+
+class ProfileRenameTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user("ann")
+        Post.objects.create(user=self.user, title="Post", description="Body")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def titles(self, name):
+        response = self.client.get(f"/api/social/posts/?user={name}")
+        return [post["title"] for post in response.json()["results"]]
+
+    def test_rename_updates_search(self):
+        self.assertEqual(self.titles("ann"), ["Post"])
+
+        response = self.client.put(
+            f"/api/social/profiles/{self.user.profile.pk}/",
+            {"first_name": "Zoë", "last_name": "Quinn", "bio": ""},
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.first_name, self.user.last_name), ("Zoë", "Quinn"))
+        self.assertEqual(self.titles("zoë quinn"), ["Post"])
+
+    def test_other_changes_leave_the_user(self):
+        profile = Profile.objects.get(user=self.user)
+        profile.bio = "Bio"
+        # Only the profile is written
+        with self.assertNumQueries(1):
+            profile.save()
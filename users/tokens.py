@@ -0,0 +1,69 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import serializers, tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from . import blacklist
+
+
+class RefreshToken(tokens.RefreshToken):
+    """RefreshToken checking the blacklist in Redis, see users.blacklist"""
+
+    def check_blacklist(self):
+        if not blacklist.enabled():
+            return super().check_blacklist()
+
+        if blacklist.contains(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        if blacklist.enabled():
+            blacklist.add(self.payload[api_settings.JTI_CLAIM], self.payload["exp"])
+        return result
+
+
+class TokenObtainPairSerializer(serializers.TokenObtainPairSerializer):
+    token_class = RefreshToken
+
+
+class TokenRefreshSerializer(serializers.TokenRefreshSerializer):
+    """
+    With the Redis blacklist, rotated refresh tokens are only blacklisted
+    in Redis, without the OutstandingToken and BlacklistedToken rows
+    simplejwt inserts on every refresh, see users.blacklist
+    """
+
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        if not (
+            blacklist.enabled()
+            and api_settings.ROTATE_REFRESH_TOKENS
+            and api_settings.BLACKLIST_AFTER_ROTATION
+        ):
+            return super().validate(attrs)
+
+        refresh = self.token_class(attrs["refresh"])
+        data = {"access": str(refresh.access_token)}
+
+        # Concurrent refreshes of the same token: only one rotates it
+        if not blacklist.add(refresh[api_settings.JTI_CLAIM], refresh["exp"]):
+            raise TokenError(_("Token is blacklisted"))
+
+        refresh.set_jti()
+        refresh.set_exp()
+        refresh.set_iat()
+        data["refresh"] = str(refresh)
+        return data
+
+
+class TokenVerifySerializer(serializers.TokenVerifySerializer):
+    def validate(self, attrs):
+        if not blacklist.enabled():
+            return super().validate(attrs)
+
+        token = tokens.UntypedToken(attrs["token"])
+        if blacklist.contains(token.get(api_settings.JTI_CLAIM)):
+            raise serializers.ValidationError("Token is blacklisted")
+        return {}
@@ -1,13 +1,13 @@
 from django.urls import path
 from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
     TokenRefreshView,
     TokenVerifyView,
 )
 from .views import (
     CreateUserView,
     ManageUserView,
-    LogoutView
+    LogoutView,
+    TokenObtainPairView,
 )
 
 
@@ -1,43 +1,33 @@
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt import views as jwt_views
+from rest_framework_simplejwt.settings import api_settings
 
+from .authentication import CachedJWTAuthentication, forget_user
 from .models import User
 from .serializers import UserSerializer, LogoutSerializer
-from social.models import Profile
+from .tokens import RefreshToken
 from social.permissions import IsLoggedIn
 
 
 class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
+    throttle_scope = "register"
 
-    def create(self, request, *args, **kwargs):
-        response = super().create(request, *args, **kwargs)
 
-        if response.status_code == status.HTTP_201_CREATED:
-            user_data = response.data
-            user_instance = User.objects.get(pk=user_data["id"])
-
-            profile_data = {
-                "first_name": request.data.get("first_name", ""),
-                "last_name": request.data.get("last_name", ""),
-                "bio": request.data.get("bio", ""),
-            }
-
-            Profile.objects.create(user=user_instance, **profile_data)
-
-        return response
+class TokenObtainPairView(jwt_views.TokenObtainPairView):
+    throttle_scope = "login"
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_classes = (JWTAuthentication,)
+    authentication_classes = (CachedJWTAuthentication,)
     permission_classes = (IsAuthenticated,)
 
     def get_object(self):
-        return self.request.user
+        # The authenticated user may be a cached partial copy
+        return User.objects.get(pk=self.request.user.pk)
 
 
 class LogoutView(generics.GenericAPIView):
@@ -53,7 +43,9 @@ class LogoutView(generics.GenericAPIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            RefreshToken(refresh_token).blacklist()
+            token = RefreshToken(refresh_token)
+            token.blacklist()
+            forget_user(token[api_settings.USER_ID_CLAIM])
 
             return Response(status=status.HTTP_205_RESET_CONTENT)
         except Exception as e: